@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+"""
+Time to download the isograph contributions (isograph_data.fetch) from a local stand-in of MPContribs with a fixed
+latency per request (see mpships.mp_fixtures), with the pages requested concurrently or one after the other
+
+    python benchmarks/bench_isograph_fetch.py [--n 5000] [--latency 0.2] [--page-size 500]
+
+No network access is needed, the results only depend on the latency and the number of pages.
+"""
+
+import argparse
+import functools
+import time
+from unittest import mock
+
+from bench_isograph_table import contributions
+from mpships import mp_fixtures
+from mpships.contribs_query import query_all_contributions
+from mpships.redox_thermo_csp.isograph_data import isograph_data
+
+
+def fixtures(n):
+    data = contributions(n)
+    columns = [{"path": "data." + ".".join(path)} for _, path, _ in isograph_data.COLUMNS]
+    return {"projects": {isograph_data.project_name: {"project": {"columns": columns}, "contributions": data}},
+            "entries": [], "materials": {}, "summary": []}
+
+
+def fetch_time(rester, page_size, max_workers):
+    mp_fixtures.install(rester, names=["mp_web"], hedge_quantile=None)
+    query = functools.partial(query_all_contributions, per_page=page_size, max_workers=max_workers)
+    try:
+        with mock.patch("mpships.redox_thermo_csp.isograph_data.query_all_contributions", query):
+            start = time.perf_counter()
+            dataset = isograph_data.fetch()
+            return time.perf_counter() - start, len(dataset["data"])
+    finally:
+        mp_fixtures.uninstall(names=["mp_web"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=5000, help="number of contributions")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request")
+    parser.add_argument("--page-size", type=int, default=500, help="contributions per page")
+    args = parser.parse_args()
+
+    with mp_fixtures.FixtureServer(fixtures(args.n), latency=args.latency, page_size=args.page_size) as server:
+        rester = mp_fixtures.HTTPRester(server.url)
+        sequential, n = fetch_time(rester, args.page_size, max_workers=1)
+        concurrent, _ = fetch_time(rester, args.page_size, max_workers=8)
+    print(f"{n} contributions, {args.latency} s per request, {args.page_size} per page")
+    print(f"  one page after the other: {sequential:6.2f} s")
+    print(f"  8 pages at the same time: {concurrent:6.2f} s")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+"""
+Memory of the isograph contributions per worker: nested JSON as returned by MPContribs vs. the table of isograph_data
+loaded from a snapshot
+
+    python benchmarks/bench_isograph_table.py [--n 5000]
+
+Each variant is measured in a fresh interpreter, the RSS is read from /proc (Linux only).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+CHILD = """
+import gc, json, sys
+sys.path.insert(0, {bench_dir!r})
+from bench_isograph_table import contributions, rss_mib
+from mpships.redox_thermo_csp.isograph_data import isograph_data
+
+n, variant, snapshot_path = {n}, {variant!r}, {snapshot_path!r}
+isograph_data.to_table(contributions(1))  # warm up pandas
+gc.collect()
+before = rss_mib()
+if variant == "nested":
+    data = contributions(n)
+else:
+    data = isograph_data.convert(isograph_data.load_snapshot(snapshot_path))
+gc.collect()
+print(json.dumps(rss_mib() - before))
+"""
+
+
+def rss_mib():
+    """resident set size of this process in MiB"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+
+def contributions(n):
+    """n made-up contributions with the structure of the redox_thermo_csp project, parsed from JSON like the
+    response of MPContribs (so that no strings are shared between the contributions)"""
+    elements = ["Sr", "Ca", "Ba", "La", "Y", "Mn", "Fe", "Co", "Cu", "Ti", "V", "Cr"]
+    entries = []
+    for i in range(n):
+        a, b = elements[i % 5], elements[5 + i % 7]
+        entries.append({"data": {
+            "phases": {"oxidized": {"composition": f"{a}{b}O3", "mpid": f"mp-{i}"},
+                       "reduced": {"composition": f"{a}{b}O2.5", "mpid": f"mp-{i + n}"}},
+            "theoretical": {"composition": f"{a}1{b}1Ox", "tolerance": {"value": 0.9 + i * 1e-6},
+                            "active": {"value": 1.0}, "elastic": {"tensors": "True", "debye": {
+                                "brownmillerite": {"value": 450.0 + i}, "perovskite": {"value": 500.0 + i}}},
+                            "ΔH": {"min": {"value": 80.0 + i * 1e-3}, "max": {"value": 160.0 + i * 1e-3}}},
+            "solution": "Dilute_Species", "availability": "Theoretical", "updated": "2018-07-20",
+        }})
+    return json.loads(json.dumps(entries))
+
+
+def measure(n, variant, snapshot_path):
+    code = CHILD.format(bench_dir=sys.path[0], n=n, variant=variant, snapshot_path=snapshot_path)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, text=True).stdout
+    return json.loads(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=5000, help="number of contributions")
+    args = parser.parse_args()
+    from mpships.redox_thermo_csp.isograph_data import isograph_data
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_path = os.path.join(tmp_dir, "snapshot.bin")
+        isograph_data.save_snapshot({"fields": [], "data": contributions(args.n), "version": "bench"}, snapshot_path)
+        nested, table = measure(args.n, "nested", snapshot_path), measure(args.n, "table", snapshot_path)
+    print(f"{args.n} contributions, RSS per worker")
+    print(f"  nested JSON: {nested:8.2f} MiB")
+    print(f"  table:       {table:8.2f} MiB")
+    print(f"  reduction:   {nested - table:8.2f} MiB ({(1 - table / nested) * 100:.0f} %)")
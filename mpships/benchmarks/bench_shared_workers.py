@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""
+Memory per worker of the isograph table with 1, 4 and 16 forked workers, each with its own copy (loaded from the
+snapshot) or with the memory-mapped columns of isograph_data.save_shared
+
+    python benchmarks/bench_shared_workers.py [--n 50000] [--workers 1 4 16]
+
+Reports the increase of the proportional set size (PSS, shared pages are divided by the number of processes that map
+them) per worker while all workers hold the table, read from /proc (Linux only).
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from bench_isograph_table import contributions
+from mpships.redox_thermo_csp.isograph_data import isograph_data
+
+
+def pss_mib():
+    """proportional set size of this process in MiB"""
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) / 1024
+
+
+def worker(mode, paths, loaded, done, results):
+    before = pss_mib()
+    if mode == "private":
+        table = isograph_data.convert(isograph_data.load_snapshot(paths["snapshot"]))["table"]
+    else:
+        table = isograph_data.load_shared(paths["shared"])["table"]
+    # touch all values like the callbacks do
+    for column in table.columns:
+        if table[column].dtype == np.float64:
+            np.nansum(table[column].to_numpy())
+        else:
+            table[column].array.codes.sum()
+    loaded.wait()  # PSS depends on how many processes map the same pages
+    results.put(pss_mib() - before)
+    done.wait()
+
+
+def measure(mode, n_workers, paths):
+    ctx = multiprocessing.get_context("fork")
+    loaded, done = ctx.Barrier(n_workers + 1), ctx.Barrier(n_workers + 1)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=worker, args=(mode, paths, loaded, done, results)) for _ in range(n_workers)]
+    for p in processes:
+        p.start()
+    loaded.wait()
+    pss = [results.get() for _ in processes]
+    done.wait()
+    for p in processes:
+        p.join()
+    return sum(pss) / len(pss)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=50000, help="number of contributions")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16], help="numbers of workers")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = {"snapshot": os.path.join(tmp_dir, "snapshot.bin"), "shared": os.path.join(tmp_dir, "shared")}
+        dataset = {"fields": [], "data": contributions(args.n), "version": "bench"}
+        isograph_data.save_snapshot(dataset, paths["snapshot"])
+        dataset = isograph_data.convert(isograph_data.load_snapshot(paths["snapshot"]))
+        isograph_data.save_shared(dataset, paths["shared"])
+        del dataset
+        isograph_data.to_table(contributions(1))  # warm up pandas before forking
+
+        print(f"{args.n} contributions, PSS per worker (MiB)")
+        print(f"{'workers':>8} {'private':>9} {'shared':>9}")
+        for n_workers in args.workers:
+            private = measure("private", n_workers, paths)
+            shared = measure("shared", n_workers, paths)
+            print(f"{n_workers:>8} {private:>9.2f} {shared:>9.2f}")
+        sys.stdout.flush()
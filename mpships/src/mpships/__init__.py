@@ -4,10 +4,38 @@ __author__ = """Ruoxi Yang"""
 __email__ = 'yangroxie@gmail.com'
 __version__ = '0.1.0'
 
+import importlib
+import os
 from pathlib import Path
-from mpships.materials_graph.materials_graph import MaterialsGraphAIO
-from mpships.ELATE_Crystal.elate_dash import ELATE
-from mpships.redox_thermo_csp.redox_thermo_csp import RedoxThermoCSPAIO
+
+# the app components are imported on first access (PEP 562), so that an app only
+# loads the dependencies of the components it uses
+_LAZY_ATTRIBUTES = {
+    "MaterialsGraphAIO": "mpships.materials_graph.materials_graph",
+    "ELATE": "mpships.ELATE_Crystal.elate_dash",
+    "RedoxThermoCSPAIO": "mpships.redox_thermo_csp.redox_thermo_csp",
+}
+
+__all__ = ["MODULE_PATH", "CACHE_DIR"] + list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
 
 MODULE_PATH = str(Path(__file__).parents[0])
+
+# directory of the files cached at runtime (entries, Debye temperatures, isograph snapshot), outside of the installed
+# package, which may not be writable. Environment variable MPSHIPS_CACHE_DIR, default $XDG_CACHE_HOME/mpships or
+# ~/.cache/mpships
+CACHE_DIR = os.environ.get("MPSHIPS_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "mpships"
+)
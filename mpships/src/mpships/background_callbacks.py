@@ -0,0 +1,41 @@
+import diskcache
+import os
+import tempfile
+import warnings
+from dash import CeleryManager, DiskcacheManager
+
+
+class background_callbacks:
+    """Shared manager for Dash background callbacks of the AIO components.
+
+    Long running callbacks (e.g. solving the theoretical isographs) are executed
+    outside of the Flask worker thread that received the request. While a job
+    is running, the browser polls for the result, so the worker is free to serve
+    other users. If the same callback output is triggered again before the job
+    has finished (e.g. while dragging a slider), Dash terminates the superseded
+    job of that output before starting the new one. Since the AIO callbacks use
+    `MATCH` ids, only jobs of the same component instance are cancelled.
+
+    Connect to Celery with the environment variable `REDIS_URL` as broker and
+    result backend if available. The Celery workers need to import the module
+    that registers the callbacks, e.g.
+    `celery -A mpships.background_callbacks:background_callbacks.celery_app worker`.
+    Otherwise, run jobs in local processes and store the results with diskcache,
+    which is only suitable for development.
+    """
+    if 'REDIS_URL' in os.environ:
+        from celery import Celery
+
+        celery_app = Celery(
+            __name__,
+            broker=os.environ["REDIS_URL"],
+            backend=os.environ["REDIS_URL"],
+            include=["mpships.redox_thermo_csp.redox_thermo_csp"],
+        )
+        manager = CeleryManager(celery_app)
+    else:
+        warnings.warn('Using DiskcacheManager - Not suitable for Production Use.')
+        celery_app = None
+        manager = DiskcacheManager(
+            diskcache.Cache(os.path.join(tempfile.gettempdir(), "mpships_background_callbacks"))
+        )
@@ -0,0 +1,44 @@
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def query_all_contributions(contribs, query, fields, sort=None, per_page=500, max_workers=8, total_count=None):
+    """
+    Query all contributions matching a query from MPContribs with the pages fetched concurrently
+
+    Instead of `query_contributions(..., paginate=True)`, which requests one page after the other, the number of
+    contributions is requested first (`get_totals`) and then all pages at the same time with a bounded thread pool.
+    The pages are put back together in order.
+
+    :param contribs:        MPContribs client, e.g. `get_rester().contribs`
+    :param query:           query as for query_contributions, e.g. {"project": "redox_thermo_csp"}
+    :param fields:          fields of the contributions to return
+    :param sort:            sort order as for query_contributions, keep the pages consistent
+    :param per_page:        number of contributions per page
+    :param max_workers:     maximum number of concurrent requests
+    :param total_count:     number of contributions if already known, skips get_totals
+    :return:                {"data": [...], "total_count": ...} like the response of query_contributions
+    """
+    if total_count is None:
+        total_count = contribs.get_totals(query=query)[0]
+    n_pages = math.ceil(total_count / per_page)
+
+    def get_page(page):
+        page_query = dict(query, _limit=per_page, page=page)
+        kwargs = {"query": page_query, "fields": fields}
+        if sort is not None:
+            kwargs["sort"] = sort
+        return contribs.query_contributions(**kwargs)["data"]
+
+    data = []
+    if n_pages:
+        with ThreadPoolExecutor(max_workers=min(max_workers, n_pages)) as executor:
+            # map returns the pages in order, the first exception is raised here
+            for page_data in executor.map(get_page, range(1, n_pages + 1)):
+                data.extend(page_data)
+    if len(data) != total_count:
+        logger.warning(f"Expected {total_count} contributions for {query}, got {len(data)}")
+    return {"data": data, "total_count": total_count}
@@ -17,6 +17,7 @@ import dash_vega_components as dvc
 import plotly.graph_objects as go
 import json
 from mpships.vega_graph_table import VegaGraphTableAIO
+from mpships.mp_client import resilient_client
 import uuid
 
 class MaterialsGraphAIO(html.Div):
@@ -104,7 +105,7 @@ class MaterialsGraphAIO(html.Div):
     def update_datatable(n_clicks, value):
         if not n_clicks:
             return no_update
-        mpr = MPRester()
+        mpr = resilient_client("mp_api", MPRester)
         docs = mpr.materials.summary.search(chemsys=value)
 
         doc_list = [_clean_dict(doc.model_dump()) for doc in docs]
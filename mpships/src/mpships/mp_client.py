@@ -0,0 +1,277 @@
+import collections
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# seconds until a call to the MP API is given up, environment variable MPSHIPS_MP_DEADLINE
+DEFAULT_DEADLINE = float(os.environ.get("MPSHIPS_MP_DEADLINE", 10))
+# path of a fixture file or URL of a fixture server used instead of the MP APIs (see mpships.mp_fixtures),
+# environment variable MPSHIPS_MP_FIXTURES
+FIXTURES = os.environ.get("MPSHIPS_MP_FIXTURES")
+# methods of the MP clients used by mpships that only read, so sending them twice is harmless (see hedging)
+READ_ONLY_METHODS = frozenset([
+    "get_entries_in_chemsys", "get_data", "query", "search", "get_project", "get_totals", "query_contributions",
+])
+
+
+class DeadlineExceeded(TimeoutError):
+    """The upstream API did not answer within the deadline"""
+
+
+class CircuitOpen(RuntimeError):
+    """The call was not sent upstream because of too many failures in a row"""
+
+
+class CircuitBreaker:
+    """
+    Closed: calls are sent upstream. After `failure_threshold` failures in a row the circuit opens and calls fail
+    immediately for `reset_timeout` seconds. Then a single trial call is let through (half-open), which closes the
+    circuit if it succeeds and opens it again otherwise.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_neutral(self):
+        """the call failed for a reason of its own (e.g. an unknown id), not of the upstream API"""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def is_upstream_failure(error):
+    """
+    True for errors of the upstream API or the network (timeouts, connection errors, 5xx responses), False for errors
+    of the call itself (e.g. an unknown mp-id or invalid arguments), which do not count for the circuit breaker
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status >= 500
+    if isinstance(error, OSError):  # e.g. requests.ConnectionError, urllib.error.URLError
+        return True
+    # MPRestError only has the status code in its message
+    return "status code 5" in str(error)
+
+
+class ResilientClient:
+    """Wrapper around a client of the MP API (e.g. `MPRester()` or `get_rester()`) that bounds the time of each call.
+
+    Attributes of the client are wrapped as well, so that it is used like the client
+    itself, e.g. `ResilientClient(MPRester()).materials.summary.search(...)`. Every
+    call of a method runs in a thread pool and is given up after `deadline` seconds
+    (DeadlineExceeded), while the thread of the call keeps running in the background.
+
+    - Hedging (opt-in): once `hedge_min_samples` calls have succeeded, a call of one
+      of the `hedge_methods` that takes longer than the `hedge_quantile` of the recent
+      latencies is sent a second time, and the first answer is used. The slower
+      attempt is not cancelled, so only list read-only methods (e.g.
+      READ_ONLY_METHODS). Off with the default `hedge_quantile=None`.
+      The latencies are kept per method, so cheap calls do not make expensive ones hedge.
+    - Circuit breaker: after `failure_threshold` failures in a row, calls are not sent
+      upstream for `reset_timeout` seconds (see CircuitBreaker). Only timeouts and
+      errors of the API or the network count (see is_upstream_failure), other errors
+      (e.g. an unknown mp-id) are raised as they are.
+    - Fallback: if a call fails, times out or the circuit is open, the most recent
+      response of a call with the same arguments is returned if there is one (the
+      last `cache_size` responses are kept). Otherwise the error is raised.
+
+    Cached responses are returned as they are, callers must not modify them.
+    """
+
+    def __init__(
+        self,
+        client,
+        deadline=None,
+        hedge_quantile=None,
+        hedge_methods=(),
+        hedge_min_samples=20,
+        failure_threshold=5,
+        reset_timeout=30.0,
+        cache_size=128,
+        max_workers=32,
+    ):
+        self._client = client
+        self._path = type(client).__name__
+        self._deadline = deadline or DEFAULT_DEADLINE
+        self._hedge_quantile = hedge_quantile
+        self._hedge_methods = frozenset(hedge_methods)
+        self._hedge_min_samples = hedge_min_samples
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._latencies = {}  # path of the method: deque of the recent latencies
+        self._cache = collections.OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mp_client")
+
+    def _view(self, client, path, deadline=None):
+        """wrapper of an attribute of the client, which shares the state of this wrapper"""
+        view = object.__new__(ResilientClient)
+        view.__dict__.update(self.__dict__)
+        view._client, view._path = client, path
+        if deadline is not None:
+            view._deadline = deadline
+        return view
+
+    def with_deadline(self, deadline):
+        """the same client with another deadline in seconds, e.g. for large queries"""
+        return self._view(self._client, self._path, deadline)
+
+    def __getattr__(self, name):
+        if name.startswith("__") or "_client" not in self.__dict__:
+            raise AttributeError(name)
+        attr = getattr(self._client, name)
+        path = f"{self._path}.{name}"
+        if isinstance(attr, (str, bytes, int, float, bool, type(None), list, tuple, dict)):
+            return attr
+        if callable(attr):
+            def call(*args, **kwargs):
+                return self._call(path, attr, args, kwargs)
+            call.__name__ = name
+            call.__doc__ = getattr(attr, "__doc__", None)
+            return call
+        return self._view(attr, path)
+
+    def __call__(self, *args, **kwargs):
+        return self._call(self._path, self._client, args, kwargs)
+
+    def _hedge_delay(self, path):
+        if self._hedge_quantile is None or path.rsplit(".", 1)[-1] not in self._hedge_methods:
+            return None
+        with self._lock:
+            latencies = list(self._latencies.get(path, ()))
+        if len(latencies) < self._hedge_min_samples:
+            return None
+        return float(np.quantile(latencies, self._hedge_quantile))
+
+    def _fallback(self, key, error):
+        with self._lock:
+            if key in self._cache:
+                logger.warning(f"{key[0]} failed ({error!r}), using the most recent response")
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        raise error
+
+    def _call(self, path, fun, args, kwargs):
+        key = (path, repr(args), repr(sorted(kwargs.items())))
+        if not self.breaker.allow():
+            return self._fallback(key, CircuitOpen(f"{path}: too many failures of the MP API"))
+
+        start = time.monotonic()
+        deadline = start + self._deadline
+        hedge_at = self._hedge_delay(path)
+        futures = [self._executor.submit(fun, *args, **kwargs)]
+        hedged = hedge_at is None
+        error = None
+        while futures:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            timeout = deadline - now if hedged else min(deadline, start + hedge_at) - now
+            done, _ = wait(futures, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                futures.remove(future)
+                if future.exception() is not None:
+                    error = future.exception()
+                    if is_upstream_failure(error):
+                        continue
+                    # the API answered, the call itself is wrong, so neither the breaker nor the fallback apply
+                    for other in futures:
+                        other.cancel()
+                    self.breaker.record_neutral()
+                    raise error
+                result = future.result()
+                for other in futures:
+                    other.cancel()
+                self.breaker.record_success()
+                with self._lock:
+                    latencies = self._latencies.setdefault(path, collections.deque(maxlen=200))
+                    latencies.append(time.monotonic() - start)
+                    self._cache[key] = result
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self._cache_size:
+                        self._cache.popitem(last=False)
+                return result
+            if futures and not hedged and time.monotonic() >= start + hedge_at:
+                hedged = True
+                futures.append(self._executor.submit(fun, *args, **kwargs))
+
+        for future in futures:
+            future.cancel()
+        self.breaker.record_failure()
+        if error is None or futures:
+            error = DeadlineExceeded(f"{path}: no response of the MP API within {self._deadline} s")
+        return self._fallback(key, error)
+
+
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_rester():
+    """get_rester() of mp_web, imported on first use so that the fixtures can be used without mp_web"""
+    from mp_web.core.utils import get_rester as mp_web_get_rester
+    return mp_web_get_rester()
+
+
+def resilient_client(name, factory, **kwargs):
+    """
+    ResilientClient shared by all callers with the same name, the client is created with factory() on first use
+    (or from FIXTURES if set) e.g. resilient_client("mp_api", MPRester)
+    Unless kwargs say otherwise, the READ_ONLY_METHODS are hedged at the 0.95 quantile of the latencies.
+    """
+    kwargs.setdefault("hedge_quantile", 0.95)
+    kwargs.setdefault("hedge_methods", READ_ONLY_METHODS)
+    with _CLIENTS_LOCK:
+        if name not in _CLIENTS:
+            if FIXTURES:
+                from mpships.mp_fixtures import stand_in
+                client = stand_in(FIXTURES)
+            else:
+                client = factory()
+            _CLIENTS[name] = ResilientClient(client, **kwargs)
+        return _CLIENTS[name]
@@ -0,0 +1,452 @@
+"""
+Local stand-in for the Materials Project and MPContribs APIs, for tests and benchmarks without network access
+
+The responses are served from fixtures, a dict (saved with monty, see save_fixtures) with
+
+    "entries":   computed entries, for get_entries_in_chemsys
+    "materials": {mp-id: {"task_id", "cif", "elasticity": {"elastic_tensor"}}}, for query and get_data
+    "summary":   summary documents of mp_api, for materials.summary.search
+    "projects":  {name: {"project": project info with "columns", "contributions": [{"data": {...}}]}}, for contribs
+
+either by a FakeRester in the same process or by a FixtureServer over HTTP (HTTPRester is its client), both with a
+fixed latency per call and a maximum page size of the contributions. The stand-in is used instead of the real clients
+of mpships.mp_client with install(), or in other processes with the environment variable MPSHIPS_MP_FIXTURES (path
+of a fixture file or URL of a fixture server):
+
+    python -m mpships.mp_fixtures serve fixtures.json.gz --port 8765 --latency 0.05 --page-size 100
+    MPSHIPS_MP_FIXTURES=http://127.0.0.1:8765 python benchmarks/...
+
+Fixtures are recorded from the real APIs with record().
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from monty.json import MontyDecoder, MontyEncoder
+from monty.serialization import dumpfn, loadfn
+
+from mpships import mp_client
+
+logger = logging.getLogger(__name__)
+
+# calls of the stand-in, also the only calls served by FixtureServer
+METHODS = [
+    "get_entries_in_chemsys",
+    "query",
+    "get_data",
+    "contribs.get_project",
+    "contribs.get_totals",
+    "contribs.query_contributions",
+    "materials.summary.search",
+]
+
+
+def load_fixtures(path):
+    """fixtures saved with save_fixtures, with the entries and structures as pymatgen objects"""
+    fixtures = loadfn(path)
+    return {key: fixtures.get(key, default) for key, default in
+            [("entries", []), ("materials", {}), ("summary", []), ("projects", {})]}
+
+
+def save_fixtures(fixtures, path):
+    """write fixtures with monty, e.g. to fixtures.json.gz"""
+    dumpfn(fixtures, path)
+
+
+def _get_path(document, path):
+    for key in path.split("."):
+        if not isinstance(document, dict) or key not in document:
+            return None
+        document = document[key]
+    return document
+
+
+def _project(document, fields):
+    """document with only the given fields, e.g. ["data.id", "data.TOx"]"""
+    if fields is None:
+        return document
+    projected = {}
+    for field in fields:
+        value = _get_path(document, field)
+        if value is None:
+            continue
+        entry = projected
+        keys = field.split(".")
+        for key in keys[:-1]:
+            entry = entry.setdefault(key, {})
+        entry[keys[-1]] = value
+    return projected
+
+
+def _chemsys(elements):
+    if isinstance(elements, str):
+        elements = elements.split("-")
+    return "-".join(sorted(elements))
+
+
+class SummaryDoc(dict):
+    """summary document, with model_dump() as the documents of mp_api"""
+
+    def model_dump(self):
+        return dict(self)
+
+
+class _Latency:
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class FakeContribs:
+    """MPContribs client (get_rester().contribs) answering from the projects of the fixtures"""
+
+    def __init__(self, projects, latency, page_size=None):
+        self._projects = projects
+        self._latency = latency
+        self.page_size = page_size
+
+    def _filter(self, query):
+        query = dict(query or {})
+        name = query.pop("project", None)
+        if name is None:
+            projects = list(self._projects.values())
+        else:
+            projects = [self._projects[name]] if name in self._projects else []
+        contributions = [c for project in projects for c in project["contributions"]]
+        # only exact matches of data fields, e.g. {"data__id__exact": "AS_500.0_..."}
+        for key, value in query.items():
+            if key.startswith("data__") and key.endswith("__exact"):
+                path = key[:-len("__exact")].replace("__", ".")
+                contributions = [c for c in contributions if _get_path(c, path) == value]
+        return contributions
+
+    def _limit(self, query):
+        limit = (query or {}).get("_limit") or self.page_size or 100
+        return min(limit, self.page_size) if self.page_size else limit
+
+    def get_project(self, name, fields=None):
+        self._latency.wait()
+        if name not in self._projects:
+            raise KeyError(f"project {name} not found")
+        return self._projects[name]["project"]
+
+    def get_totals(self, query=None):
+        self._latency.wait()
+        total_count = len(self._filter(query))
+        return total_count, math.ceil(total_count / self._limit(query))
+
+    def query_contributions(self, query=None, fields=None, sort=None, paginate=False):
+        self._latency.wait()
+        contributions = self._filter(query)
+        if sort:
+            reverse = sort.startswith("-")
+            contributions = sorted(contributions, key=lambda c: str(_get_path(c, sort.lstrip("+-"))), reverse=reverse)
+        total_count = len(contributions)
+        if not paginate:
+            limit = self._limit(query)
+            start = ((query or {}).get("page", 1) - 1) * limit
+            contributions = contributions[start:start + limit]
+        return {
+            "data": [_project(c, fields) for c in contributions],
+            "total_count": total_count,
+            "total_pages": math.ceil(total_count / self._limit(query)),
+        }
+
+
+class FakeSummary:
+    """materials.summary of MPRester of mp_api answering from the summary documents of the fixtures"""
+
+    def __init__(self, docs, latency):
+        self._docs = docs
+        self._latency = latency
+
+    def search(self, chemsys=None, material_ids=None, fields=None, **kwargs):
+        self._latency.wait()
+        docs = self._docs
+        if chemsys is not None:
+            systems = {_chemsys(c) for c in ([chemsys] if isinstance(chemsys, str) else chemsys)}
+            docs = [doc for doc in docs if _chemsys(doc.get("chemsys", "")) in systems]
+        if material_ids is not None:
+            docs = [doc for doc in docs if str(doc.get("material_id")) in set(material_ids)]
+        return [SummaryDoc(_project(doc, fields)) for doc in docs]
+
+
+class FakeRester:
+    """
+    Stand-in for get_rester() of mp_web and MPRester of mp_api answering from fixtures (see load_fixtures)
+    Every call waits `latency` seconds, contributions are returned in pages of at most `page_size`.
+    """
+
+    def __init__(self, fixtures, latency=0.0, page_size=None):
+        self.fixtures = fixtures
+        self._latency = _Latency(latency)
+        self.contribs = FakeContribs(fixtures["projects"], self._latency, page_size)
+        self.materials = SimpleNamespace(summary=FakeSummary(fixtures["summary"], self._latency))
+
+    @property
+    def calls(self):
+        """number of calls so far"""
+        return self._latency.calls
+
+    def get_entries_in_chemsys(self, elements):
+        self._latency.wait()
+        elements = set(elements.split("-") if isinstance(elements, str) else elements)
+        return [e for e in self.fixtures["entries"] if {el.symbol for el in e.composition.elements} <= elements]
+
+    def query(self, criteria, properties):
+        self._latency.wait()
+        task_ids = criteria["task_id"]
+        task_ids = task_ids["$in"] if isinstance(task_ids, dict) else [task_ids]
+        materials = self.fixtures["materials"]
+        return [
+            {prop: _get_path(materials[mpid], prop) for prop in properties}
+            for mpid in task_ids if mpid in materials
+        ]
+
+    def get_data(self, mpid):
+        self._latency.wait()
+        return [self.fixtures["materials"][mpid]] if mpid in self.fixtures["materials"] else []
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        method = self.path.strip("/")
+        if method not in METHODS:
+            self._respond(404, {"error": f"unknown method {method}"})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        fun = self.server.rester
+        for name in method.split("."):
+            fun = getattr(fun, name)
+        try:
+            result = fun(*request.get("args", []), **request.get("kwargs", {}))
+        except Exception as e:
+            self._respond(500, {"error": repr(e)})
+            return
+        self._respond(200, {"result": result})
+
+    def _respond(self, status, body):
+        body = json.dumps(body, cls=MontyEncoder).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class FixtureServer:
+    """
+    HTTP server of a FakeRester on localhost, in a background thread, e.g.
+
+        with FixtureServer(fixtures, latency=0.05, page_size=100) as server:
+            client = HTTPRester(server.url)
+    """
+
+    def __init__(self, fixtures, latency=0.0, page_size=None, host="127.0.0.1", port=0):
+        self.rester = FakeRester(fixtures, latency, page_size)
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.rester = self.rester
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mp_fixtures", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _Remote:
+
+    def __init__(self, url, prefix=""):
+        self._url = url.rstrip("/")
+        self._prefix = prefix
+
+    def _call(self, name, *args, **kwargs):
+        body = json.dumps({"args": args, "kwargs": kwargs}, cls=MontyEncoder).encode("utf-8")
+        request = urllib.request.Request(
+            f"{self._url}/{self._prefix}{name}", data=body, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return json.loads(response.read(), cls=MontyDecoder)["result"]
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"{self._prefix}{name}: {json.loads(e.read()).get('error')}") from None
+
+
+class _RemoteContribs(_Remote):
+
+    def get_project(self, name, fields=None):
+        return self._call("get_project", name, fields=fields)
+
+    def get_totals(self, query=None):
+        return tuple(self._call("get_totals", query=query))
+
+    def query_contributions(self, query=None, fields=None, sort=None, paginate=False):
+        return self._call("query_contributions", query=query, fields=fields, sort=sort, paginate=paginate)
+
+
+class _RemoteSummary(_Remote):
+
+    def search(self, chemsys=None, material_ids=None, fields=None, **kwargs):
+        docs = self._call("search", chemsys=chemsys, material_ids=material_ids, fields=fields, **kwargs)
+        return [SummaryDoc(doc) for doc in docs]
+
+
+class HTTPRester(_Remote):
+    """Client of a FixtureServer with the methods of FakeRester"""
+
+    def __init__(self, url):
+        super().__init__(url)
+        self.contribs = _RemoteContribs(url, "contribs.")
+        self.materials = SimpleNamespace(summary=_RemoteSummary(url, "materials.summary."))
+
+    def get_entries_in_chemsys(self, elements):
+        return self._call("get_entries_in_chemsys", elements)
+
+    def query(self, criteria, properties):
+        return self._call("query", criteria=criteria, properties=properties)
+
+    def get_data(self, mpid):
+        return self._call("get_data", mpid)
+
+
+def stand_in(spec):
+    """
+    HTTPRester of the FixtureServer at the URL spec, or FakeRester of the fixture file at the path spec with the
+    latency (seconds) and page size of the environment variables MPSHIPS_MP_FIXTURES_LATENCY and
+    MPSHIPS_MP_FIXTURES_PAGE_SIZE
+    """
+    if spec.startswith(("http://", "https://")):
+        return HTTPRester(spec)
+    page_size = os.environ.get("MPSHIPS_MP_FIXTURES_PAGE_SIZE")
+    return FakeRester(
+        load_fixtures(spec),
+        latency=float(os.environ.get("MPSHIPS_MP_FIXTURES_LATENCY", 0)),
+        page_size=int(page_size) if page_size else None,
+    )
+
+
+def install(client, names=("mp_web", "mp_api"), **kwargs):
+    """
+    Use client (e.g. a FakeRester) for the shared clients of mpships.mp_client with the given names, kwargs as for
+    ResilientClient
+    """
+    with mp_client._CLIENTS_LOCK:
+        for name in names:
+            mp_client._CLIENTS[name] = mp_client.ResilientClient(client, **kwargs)
+
+
+def uninstall(names=("mp_web", "mp_api")):
+    """forget the shared clients, the next call creates them again"""
+    with mp_client._CLIENTS_LOCK:
+        for name in names:
+            mp_client._CLIENTS.pop(name, None)
+
+
+def record(path, chemical_systems=(), mpids=(), summary_chemical_systems=(), projects=None):
+    """
+    Record fixtures from the Materials Project and MPContribs (needs mp_web, mp_api and network access)
+    :param path:                        fixture file to write, e.g. fixtures.json.gz
+    :param chemical_systems:            chemical systems of the entries, e.g. ["Sr-Fe-O"]
+    :param mpids:                       mp-ids of the structures and elastic tensors
+    :param summary_chemical_systems:    chemical systems of the summary documents
+    :param projects:                    {project name: query of the contributions to record, e.g. {}}
+    """
+    from mp_api.client import MPRester
+
+    mpr = mp_client.get_rester()
+    fixtures = {"entries": [], "materials": {}, "summary": [], "projects": {}}
+    seen = set()
+    for chemsys in chemical_systems:
+        for entry in mpr.get_entries_in_chemsys(chemsys.split("-")):
+            if entry.entry_id not in seen:
+                seen.add(entry.entry_id)
+                fixtures["entries"].append(entry)
+    if mpids:
+        for doc in mpr.query(criteria={"task_id": {"$in": list(mpids)}},
+                             properties=["task_id", "cif", "elasticity.elastic_tensor"]):
+            fixtures["materials"][doc["task_id"]] = {
+                "task_id": doc["task_id"],
+                "cif": doc["cif"],
+                "elasticity": {"elastic_tensor": doc["elasticity.elastic_tensor"]},
+            }
+    if summary_chemical_systems:
+        with MPRester() as mp_api:
+            for chemsys in summary_chemical_systems:
+                fixtures["summary"] += [doc.model_dump() for doc in mp_api.materials.summary.search(chemsys=chemsys)]
+    if projects:
+        from mpships.contribs_query import query_all_contributions
+
+        for name, query in projects.items():
+            project = mpr.contribs.get_project(name=name)
+            fields = [column["path"] for column in project["columns"]]
+            resp = query_all_contributions(mpr.contribs, dict(query, project=name), fields, sort="id")
+            fixtures["projects"][name] = {"project": project, "contributions": resp["data"]}
+    save_fixtures(fixtures, path)
+    return fixtures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Materials Project and MPContribs APIs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="serve a fixture file over HTTP")
+    serve.add_argument("fixtures", help="fixture file, e.g. fixtures.json.gz")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency", type=float, default=0.0, help="seconds per call")
+    serve.add_argument("--page-size", type=int, default=None, help="maximum number of contributions per page")
+    rec = subparsers.add_parser("record", help="record fixtures from the real APIs")
+    rec.add_argument("fixtures", help="fixture file to write, e.g. fixtures.json.gz")
+    rec.add_argument("--chemsys", nargs="*", default=[], help="chemical systems of the entries, e.g. Sr-Fe-O")
+    rec.add_argument("--mpids", nargs="*", default=[], help="mp-ids of the structures and elastic tensors")
+    rec.add_argument("--summary-chemsys", nargs="*", default=[], help="chemical systems of the summary documents")
+    rec.add_argument("--project", nargs="*", default=[], help="MPContribs projects, all contributions")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "serve":
+        server = FixtureServer(load_fixtures(args.fixtures), args.latency, args.page_size, args.host, args.port)
+        print(f"Serving {args.fixtures} at {server.url}")
+        try:
+            server._server.serve_forever()
+        except KeyboardInterrupt:
+            server._server.server_close()
+    else:
+        record(args.fixtures, args.chemsys, args.mpids, args.summary_chemsys, {name: {} for name in args.project})
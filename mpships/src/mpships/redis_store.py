@@ -6,6 +6,7 @@ import os
 import pandas as pd
 import plotly
 import redis
+import time
 import warnings
 import uuid
 
@@ -32,19 +33,24 @@ class redis_store:
         return hashlib.sha512(serialized_obj).hexdigest()
 
     @staticmethod
-    def save(value):
+    def _serialize(value):
         if isinstance(value, pd.DataFrame):
             buffer = io.BytesIO()
             value.to_parquet(buffer, compression='gzip')
             buffer.seek(0)
-            df_as_bytes = buffer.read()
-            hash_key = redis_store._hash(df_as_bytes)
-            type = 'pd.DataFrame'
-            serialized_value = df_as_bytes
-        else:
-            serialized_value = json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8')
-            hash_key = redis_store._hash(serialized_value)
-            type = 'json-serialized'
+            return buffer.read(), 'pd.DataFrame'
+        return json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8'), 'json-serialized'
+
+    @staticmethod
+    def _deserialize(data_type, serialized_value):
+        if data_type == b'pd.DataFrame':
+            return pd.read_parquet(io.BytesIO(serialized_value))
+        return json.loads(serialized_value)
+
+    @staticmethod
+    def save(value):
+        serialized_value, type = redis_store._serialize(value)
+        hash_key = redis_store._hash(serialized_value)
 
         redis_store.r.set(
             f'_dash_aio_components_value_{hash_key}',
@@ -56,17 +62,77 @@ class redis_store:
         )
         return hash_key
 
+    @staticmethod
+    def save_as(key, value, ex=None):
+        """Save data under the given key instead of its hash (e.g. cached results), expire after ex seconds"""
+        serialized_value, type = redis_store._serialize(value)
+        pipe = redis_store.r.pipeline()
+        pipe.set(f'_dash_aio_components_value_{key}', serialized_value, ex=ex)
+        pipe.set(f'_dash_aio_components_type_{key}', type, ex=ex)
+        pipe.execute()
+
+    @staticmethod
+    def load_key(key):
+        """Load data saved with save_as, None if there is none (or it has expired)"""
+        data_type, serialized_value = redis_store.r.mget(
+            f'_dash_aio_components_type_{key}', f'_dash_aio_components_value_{key}'
+        )
+        if serialized_value is None:
+            return None
+        return redis_store._deserialize(data_type, serialized_value)
+
+    @staticmethod
+    def lock(name, timeout=60):
+        """Lock shared by all processes connected to the same Redis, released automatically after timeout seconds"""
+        return redis_lock(redis_store.r, f'_dash_aio_components_lock_{name}', timeout)
+
     @staticmethod
     def load(hash_key):
         data_type = redis_store.r.get(f'_dash_aio_components_type_{hash_key}')
         serialized_value = redis_store.r.get(f'_dash_aio_components_value_{hash_key}')
         try:
-            if data_type == b'pd.DataFrame':
-                value = pd.read_parquet(io.BytesIO(serialized_value))
-            else:
-                value = json.loads(serialized_value)
+            value = redis_store._deserialize(data_type, serialized_value)
         except Exception as e:
             print(e)
             print(f'ERROR LOADING {data_type - hash_key}')
             raise e
         return value
+
+
+class redis_lock:
+    """Lock in Redis, held by the process that set the key with its own token (SET NX with an expiry).
+
+    Unlike `redis.lock.Lock`, it does not use Lua scripts, so that it also works
+    with FakeRedis.
+    """
+
+    def __init__(self, r, name, timeout=60, sleep=0.05):
+        self.r = r
+        self.name = name
+        self.timeout = timeout
+        self.sleep = sleep
+        self.token = uuid.uuid4().hex.encode()
+
+    def acquire(self, blocking=True, blocking_timeout=None):
+        """True if the lock was acquired, waits up to blocking_timeout seconds (forever if None) if blocking"""
+        stop = None if blocking_timeout is None else time.monotonic() + blocking_timeout
+        while True:
+            if self.r.set(self.name, self.token, nx=True, px=int(self.timeout * 1000)):
+                return True
+            if not blocking or (stop is not None and time.monotonic() >= stop):
+                return False
+            time.sleep(self.sleep)
+
+    def release(self):
+        """Release the lock if it is still held with this token (not expired and taken by another process)"""
+        with self.r.pipeline() as pipe:
+            try:
+                pipe.watch(self.name)
+                if pipe.get(self.name) == self.token:
+                    pipe.multi()
+                    pipe.delete(self.name)
+                    pipe.execute()
+                else:
+                    pipe.unwatch()
+            except redis.exceptions.WatchError:
+                pass  # changed by another process, so it is not held with this token any more
@@ -0,0 +1,96 @@
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from mpships import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+class debye_cache:
+    """Debye temperatures by mp-id, kept in memory and in a JSON file.
+
+    The file (environment variable `MPSHIPS_DEBYE_CACHE`, default `debye_temps.json`
+    in `mpships.CACHE_DIR`) maps mp-ids to Debye temperatures in K, or to null for
+    materials without elastic data, so those are not queried again either. It is
+    read on first use. New values are merged into the current file while holding a
+    lock on `<path>.lock` (fcntl.flock), so several processes can add values to it.
+    """
+    path = os.environ.get("MPSHIPS_DEBYE_CACHE", os.path.join(CACHE_DIR, "debye_temps.json"))
+
+    _temps = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _read():
+        try:
+            with open(debye_cache.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read the Debye temperatures from {debye_cache.path}: {e!r}")
+            return {}
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _file_lock():
+        """exclusive lock of the file shared by all processes, only within this process without fcntl"""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{debye_cache.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def get(mpid, default=None):
+        """Debye temperature of mpid, None if the material has no elastic data, default if it is not cached"""
+        with debye_cache._lock:
+            if debye_cache._temps is None:
+                debye_cache._temps = debye_cache._read()
+            return debye_cache._temps.get(mpid, default)
+
+    @staticmethod
+    def update(temps):
+        """add {mpid: Debye temperature or None} to the cache and the file"""
+        if not temps:
+            return
+        with debye_cache._lock:
+            try:
+                directory = os.path.dirname(os.path.abspath(debye_cache.path))
+                os.makedirs(directory, exist_ok=True)
+                # read, merge and replace while no other process does
+                with debye_cache._file_lock():
+                    merged = debye_cache._merged(temps)
+                    with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as f:
+                        json.dump(merged, f, indent=0, sort_keys=True)
+                    os.replace(f.name, debye_cache.path)
+            except OSError as e:
+                logger.warning(f"Could not write the Debye temperatures to {debye_cache.path}: {e!r}")
+                merged = debye_cache._merged(temps)
+            debye_cache._temps = merged
+
+    @staticmethod
+    def _merged(temps):
+        merged = debye_cache._read()
+        merged.update(debye_cache._temps or {})
+        merged.update(temps)
+        return merged
+
+    @staticmethod
+    def clear():
+        """forget the Debye temperatures in memory, the file is kept"""
+        with debye_cache._lock:
+            debye_cache._temps = None
@@ -0,0 +1,213 @@
+import collections
+import functools
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from monty.json import MontyEncoder
+from monty.serialization import loadfn
+from pymatgen.core.composition import Composition
+
+from mpships import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+class entry_cache:
+    """Computed entries of the Materials Project by chemical system, for the theoretical redox enthalpies.
+
+    `get_mpr().get_entries_in_chemsys` returns all entries whose elements are a
+    subset of the chemical system, so the entries of a subsystem (e.g. Sr-Fe-O) are
+    the entries of any superset (e.g. Ca-Sr-Mn-Fe-O) restricted to its elements.
+    A chemical system is therefore answered, in this order, from the entries in
+    memory (exact system or a superset), from the files in `directory` (environment
+    variable `MPSHIPS_ENTRY_CACHE_DIR`, default `entry_cache` in `mpships.CACHE_DIR`,
+    one `<A-B-O>.json.gz` per system, read with monty) and only then from the
+    Materials Project. Files older than `max_age` seconds (environment variable
+    `MPSHIPS_ENTRY_CACHE_MAX_AGE`, default 30 days) are not used.
+
+    The last `max_systems` systems queried from the Materials Project or read from
+    disk are kept in memory. Queries are sent one at a time, so that a query waiting
+    for the query of its superset is answered from memory. The entries are shared,
+    callers must not modify them.
+    """
+    directory = os.environ.get(
+        "MPSHIPS_ENTRY_CACHE_DIR", os.path.join(CACHE_DIR, "entry_cache")
+    )
+    max_age = float(os.environ.get("MPSHIPS_ENTRY_CACHE_MAX_AGE", 30 * 24 * 3600))
+    max_systems = 32
+
+    _systems = collections.OrderedDict()  # frozenset of elements: list of entries
+    _indexes = collections.OrderedDict()  # frozenset of elements: (most stable entries by formula, O2 entry)
+    _disk_index = None  # ((directory, mtime of the directory), {frozenset of elements: path of the file})
+    _lock = threading.Lock()
+    _fetch_lock = threading.Lock()
+
+    @staticmethod
+    def chemsys(elements):
+        """e.g. ["O", "Sr", "Fe", "O"] -> "Fe-O-Sr" """
+        return "-".join(sorted(set(elements)))
+
+    @staticmethod
+    def _query(elements):
+        from mpships.redox_thermo_csp.redox_utils import get_mpr
+        return get_mpr().get_entries_in_chemsys(sorted(elements))
+
+    @staticmethod
+    def _restrict(entries, elements):
+        return [entry for entry in entries if {el.symbol for el in entry.composition.elements} <= elements]
+
+    @staticmethod
+    def _remember(elements, entries):
+        with entry_cache._lock:
+            entry_cache._systems[elements] = entries
+            entry_cache._systems.move_to_end(elements)
+            while len(entry_cache._systems) > entry_cache.max_systems:
+                entry_cache._systems.popitem(last=False)
+
+    @staticmethod
+    def _from_memory(elements):
+        with entry_cache._lock:
+            if elements in entry_cache._systems:
+                entry_cache._systems.move_to_end(elements)
+                return entry_cache._systems[elements]
+            supersets = [system for system in entry_cache._systems if elements < system]
+            if not supersets:
+                return None
+            superset = min(supersets, key=len)
+            entry_cache._systems.move_to_end(superset)
+            entries = entry_cache._systems[superset]
+        return entry_cache._restrict(entries, elements)
+
+    @staticmethod
+    def _path(elements):
+        return os.path.join(entry_cache.directory, f"{entry_cache.chemsys(elements)}.json.gz")
+
+    @staticmethod
+    def _disk_systems():
+        """{elements: path} of the files in directory, only listed again when the directory has changed"""
+        key = (entry_cache.directory, os.stat(entry_cache.directory).st_mtime_ns)
+        with entry_cache._lock:
+            if entry_cache._disk_index is not None and entry_cache._disk_index[0] == key:
+                return entry_cache._disk_index[1]
+        systems = {
+            frozenset(filename[:-len(".json.gz")].split("-")): os.path.join(entry_cache.directory, filename)
+            for filename in os.listdir(entry_cache.directory)
+            if filename.endswith(".json.gz")
+        }
+        with entry_cache._lock:
+            entry_cache._disk_index = (key, systems)
+        return systems
+
+    @staticmethod
+    def _from_disk(elements):
+        if not entry_cache.directory or not os.path.isdir(entry_cache.directory):
+            return None
+        # the file of the exact system first, the directory is only searched for supersets without it
+        candidates = [(elements, entry_cache._path(elements))]
+        supersets = [(system, path) for system, path in entry_cache._disk_systems().items() if elements < system]
+        candidates += sorted(supersets, key=lambda candidate: len(candidate[0]))
+        for system, path in candidates:
+            try:
+                if time.time() - os.path.getmtime(path) >= entry_cache.max_age:
+                    continue
+                entries = loadfn(path)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.warning(f"Could not read the entries of {entry_cache.chemsys(system)} from {path}: {e!r}")
+                continue
+            entry_cache._remember(system, entries)
+            return entries if system == elements else entry_cache._restrict(entries, elements)
+        return None
+
+    @staticmethod
+    def _save(elements, entries):
+        if not entry_cache.directory:
+            return
+        path = entry_cache._path(elements)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(entry_cache.directory, exist_ok=True)
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(entries, f, cls=MontyEncoder)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write the entries of {entry_cache.chemsys(elements)} to {path}: {e!r}")
+
+    @staticmethod
+    def _fetch(elements):
+        with entry_cache._fetch_lock:
+            # another thread may have fetched the system or a superset while this one was waiting
+            entries = entry_cache._from_memory(elements)
+            if entries is None:
+                entries = entry_cache._query(elements)
+                entry_cache._remember(elements, entries)
+                entry_cache._save(elements, entries)
+        return entries
+
+    @staticmethod
+    def get_entries(elements):
+        """
+        Entries of the chemical system of the given elements, like get_mpr().get_entries_in_chemsys(elements)
+        e.g. entry_cache.get_entries(["Sr", "Fe", "O"])
+        """
+        elements = frozenset(elements)
+        entries = entry_cache._from_memory(elements)
+        if entries is None:
+            entries = entry_cache._from_disk(elements)
+        if entries is None:
+            entries = entry_cache._fetch(elements)
+        return entries
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def reduced_formula(formula):
+        """e.g. "Sr8Fe8O24" -> "SrFeO3" """
+        return Composition(formula).reduced_formula
+
+    @staticmethod
+    def _index(elements):
+        with entry_cache._lock:
+            if elements in entry_cache._indexes:
+                entry_cache._indexes.move_to_end(elements)
+                return entry_cache._indexes[elements]
+        most_stable = {}
+        oxygen = None
+        o2 = Composition("O2")
+        for entry in entry_cache.get_entries(elements):
+            formula = entry.composition.reduced_formula
+            # strictly lower energy, so that the first of equal entries is used as with a stable sort
+            if formula not in most_stable or entry.energy_per_atom < most_stable[formula].energy_per_atom:
+                most_stable[formula] = entry
+            # not the most stable oxygen phase (e.g. O8), but the most stable O2
+            if entry.composition == o2 and (oxygen is None or entry.energy_per_atom < oxygen.energy_per_atom):
+                oxygen = entry
+        index = (most_stable, oxygen)
+        with entry_cache._lock:
+            entry_cache._indexes[elements] = index
+            while len(entry_cache._indexes) > entry_cache.max_systems:
+                entry_cache._indexes.popitem(last=False)
+        return index
+
+    @staticmethod
+    def get_most_stable(elements):
+        """
+        Lowest energy entry of each reduced formula in the chemical system of the given elements, computed once per
+        chemical system, e.g. entry_cache.get_most_stable(["Sr", "Fe", "O"])["SrFeO3"]
+        """
+        return entry_cache._index(frozenset(elements))[0]
+
+    @staticmethod
+    def get_oxygen(elements):
+        """Lowest energy entry with the composition O2 (not only the reduced formula) in the chemical system, or None"""
+        return entry_cache._index(frozenset(elements))[1]
+
+    @staticmethod
+    def clear():
+        """forget the entries in memory, the files are kept"""
+        with entry_cache._lock:
+            entry_cache._systems.clear()
+            entry_cache._indexes.clear()
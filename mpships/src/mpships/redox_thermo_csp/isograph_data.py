@@ -0,0 +1,407 @@
+import argparse
+import datetime
+import gc
+import hashlib
+import json
+import logging
+import numpy as np
+import os
+import pandas as pd
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from mpships import CACHE_DIR
+from mpships.contribs_query import query_all_contributions
+from mpships.mp_client import get_rester, resilient_client
+
+logger = logging.getLogger(__name__)
+
+
+class isograph_data:
+    """Contributions of the MPContribs project `redox_thermo_csp` for the isographs tab.
+
+    The contributions are not downloaded at import, but on first use or in a
+    background thread started with `prefetch`, so that starting a worker does not
+    depend on the network. The last good copy is kept in memory. If it is older
+    than `max_age` seconds (environment variable `MPSHIPS_ISOGRAPHS_MAX_AGE`,
+    default one day), it is still returned while a new copy is downloaded in the
+    background (stale-while-revalidate). If a download fails, the last good copy
+    stays in use; without any copy, an empty dataset is returned and the download
+    is tried again on the next use.
+
+    The first copy is read from a snapshot file if available (environment variable
+    `MPSHIPS_ISOGRAPHS_SNAPSHOT`, default `isographs_snapshot.bin` in
+    `mpships.CACHE_DIR`), see `save_snapshot`. A refresh only downloads the contributions if
+    the version of the project on MPContribs differs from the version of the
+    current copy, and then updates the snapshot. Write the snapshot with
+    `python -m mpships.redox_thermo_csp.isograph_data --refresh`.
+
+    The nested JSON of the contributions is only kept until it is converted into a
+    table with one row per contribution (see `to_table`), which is what all
+    consumers read.
+
+    Several workers on one node can share one physical copy of the table: with the
+    environment variable `MPSHIPS_SHARED_DATA_DIR`, the columns are written once as
+    .npy files and every worker maps them read-only (see `save_shared`), so only
+    the categories of the string columns are kept per worker. Alternatively, load
+    the data in the master process with `preload` (gunicorn `preload_app = True`),
+    so that the workers inherit it at fork.
+    """
+    project_name = "redox_thermo_csp"
+    shared_dir = os.environ.get("MPSHIPS_SHARED_DATA_DIR")
+    fetch_deadline = 60.0
+    max_age = float(os.environ.get("MPSHIPS_ISOGRAPHS_MAX_AGE", 24 * 3600))
+    snapshot_path = os.environ.get(
+        "MPSHIPS_ISOGRAPHS_SNAPSHOT",
+        os.path.join(CACHE_DIR, "isographs_snapshot.bin"),
+    )
+
+    # snapshot file: MAGIC, newline, JSON header, newline, zlib compressed contributions as JSON lines
+    MAGIC = b"MPSHIPS_ISOGRAPHS"
+    FORMAT_VERSION = 2
+
+    # columns of the table: (column, path in the contribution data, dtype)
+    COLUMNS = [
+        ("Formula", ("phases", "oxidized", "composition"), "category"),
+        ("Oxidized mp-id", ("phases", "oxidized", "mpid"), "category"),
+        ("Oxidized Composition", ("phases", "oxidized", "composition"), "category"),
+        ("Reduced mp-id", ("phases", "reduced", "mpid"), "category"),
+        ("Reduced Composition", ("phases", "reduced", "composition"), "category"),
+        ("Theoretical Tolerance", ("theoretical", "tolerance", "value"), "float64"),
+        ("Theoretical Composition", ("theoretical", "composition"), "category"),
+        ("Theoretical ΔH Min (kJ/mol)", ("theoretical", "ΔH", "min", "value"), "float64"),
+        ("Theoretical ΔH Max (kJ/mol)", ("theoretical", "ΔH", "max", "value"), "float64"),
+        ("Solution", ("solution",), "category"),
+        ("Availability", ("availability",), "category"),
+        ("Last Updated", ("updated",), "category"),
+        ("Active", ("theoretical", "active", "value"), "float64"),
+        ("Elastic Tensors", ("theoretical", "elastic", "tensors"), "category"),
+        ("Debye Temp Brownmillerite", ("theoretical", "elastic", "debye", "brownmillerite", "value"), "float64"),
+        ("Debye Temp Perovskite", ("theoretical", "elastic", "debye", "perovskite", "value"), "float64"),
+    ]
+    # columns shown in the table of the isographs tab
+    DISPLAY_COLUMNS = [column for column, _, _ in COLUMNS[:12]]
+
+    _lock = threading.Lock()
+    _dataset = None
+    _loaded_at = None
+    _refresh_thread = None
+
+    @staticmethod
+    def data_version(project, total_count):
+        """
+        Version of the project data, changes with the columns (including their ranges) and the number of
+        contributions
+        """
+        version = json.dumps(
+            {"columns": project["columns"], "total_count": total_count}, sort_keys=True, default=str
+        )
+        return hashlib.sha1(version.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def to_table(contributions):
+        """
+        Converts the contributions into a DataFrame with one row per contribution and the columns in COLUMNS
+        Compositions, ids and other strings are categorical, numbers are float64 (nan if missing)
+        The contributions are only iterated once, so they can be decoded one by one (see load_snapshot)
+        """
+        def value(entry, path):
+            try:
+                for key in path:
+                    entry = entry[key]
+                return entry
+            except (KeyError, TypeError):
+                return None
+
+        rows = [[value(entry["data"], path) for _, path, _ in isograph_data.COLUMNS] for entry in contributions]
+        columns = {}
+        for i, (column, _, dtype) in enumerate(isograph_data.COLUMNS):
+            values = [row[i] for row in rows]
+            if dtype == "float64":
+                columns[column] = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype(np.float64)
+            else:
+                columns[column] = pd.Series([str(v) if v is not None else None for v in values], dtype="category")
+        table = pd.DataFrame(columns)
+        # the reduced phase is not known for all materials
+        table["Reduced Composition"] = table["Reduced Composition"].cat.add_categories(["-"]).fillna("-")
+        return table
+
+    @staticmethod
+    def convert(dataset):
+        """Replace the contributions of a dataset from fetch or load_snapshot by the table"""
+        return {
+            "fields": dataset["fields"],
+            "version": dataset["version"],
+            "table": isograph_data.to_table(dataset["data"]),
+        }
+
+    @staticmethod
+    def fetch(version=None):
+        """
+        Download the contributions with all columns of the project from MPContribs
+        Returns None without downloading the contributions if the project still has the given version
+        """
+        # the whole project takes longer than the callbacks, allow more time for each page
+        mpr = resilient_client("mp_web", get_rester).with_deadline(isograph_data.fetch_deadline)
+        project = mpr.contribs.get_project(name=isograph_data.project_name)
+        query = {"project": isograph_data.project_name}
+        total_count = mpr.contribs.get_totals(query=query)[0]
+        remote_version = isograph_data.data_version(project, total_count)
+        if remote_version == version:
+            return None
+        fields = [column["path"] for column in project["columns"]]
+        # the pages are requested concurrently, a stable order keeps them consistent
+        resp = query_all_contributions(mpr.contribs, query, fields, sort="id", total_count=total_count)
+        return {"fields": fields, "data": resp["data"], "version": remote_version}
+
+    @staticmethod
+    def save_snapshot(dataset, path=None):
+        """Write the dataset as compressed snapshot, the file is replaced atomically"""
+        path = path or isograph_data.snapshot_path
+        header = {
+            "format": isograph_data.FORMAT_VERSION,
+            "project": isograph_data.project_name,
+            "version": dataset["version"],
+            "fields": dataset["fields"],
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        body = zlib.compress(b"\n".join(json.dumps(entry).encode("utf-8") for entry in dataset["data"]), 9)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(isograph_data.MAGIC + b"\n")
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load_snapshot(path=None):
+        """
+        Read a snapshot written by save_snapshot, None if there is no snapshot of the current format
+        The contributions are decompressed and decoded lazily from an iterator, so that neither the decompressed
+        snapshot nor all contributions are kept at the same time
+        """
+        path = path or isograph_data.snapshot_path
+        if not os.path.exists(path) or not os.path.getsize(path):
+            return None
+        f = open(path, "rb")
+        try:
+            if f.readline() != isograph_data.MAGIC + b"\n":
+                logger.error(f"{path} is not an isograph snapshot")
+                f.close()
+                return None
+            header = json.loads(f.readline())
+        except Exception:
+            f.close()
+            raise
+        if header.get("format") != isograph_data.FORMAT_VERSION:
+            logger.warning(f"Ignoring {path} with snapshot format {header.get('format')}")
+            f.close()
+            return None
+        data = (json.loads(line) for line in isograph_data._decompressed_lines(f) if line.strip())
+        return {"fields": header["fields"], "data": data, "version": header["version"]}
+
+    @staticmethod
+    def _decompressed_lines(f, block_size=1 << 20):
+        """lines of the compressed rest of an open file, decompressed block by block, closes the file at the end"""
+        with f:
+            decompressor = zlib.decompressobj()
+            rest = b""
+            while True:
+                block = f.read(block_size)
+                chunk = decompressor.decompress(block) if block else decompressor.flush()
+                lines = (rest + chunk).split(b"\n")
+                rest = lines.pop()
+                yield from lines
+                if not block:
+                    break
+            if rest:
+                yield rest
+
+    @staticmethod
+    def save_shared(dataset, directory=None):
+        """
+        Write the table of a dataset as one .npy file per column to directory/<version> and make it the current
+        version, numbers as float64 and categorical columns as codes (with the categories in meta.json)
+        """
+        directory = directory or isograph_data.shared_dir
+        os.makedirs(directory, exist_ok=True)
+        version_dir = os.path.join(directory, dataset["version"])
+        if not os.path.exists(version_dir):
+            table = dataset["table"]
+            tmp_dir = tempfile.mkdtemp(dir=directory, prefix=".tmp_")
+            meta = {"version": dataset["version"], "fields": dataset["fields"], "columns": []}
+            for i, column in enumerate(table.columns):
+                if isinstance(table[column].dtype, pd.CategoricalDtype):
+                    values = table[column].array.codes
+                    categories = [str(c) for c in table[column].cat.categories]
+                else:
+                    values, categories = table[column].to_numpy(dtype=np.float64), None
+                np.save(os.path.join(tmp_dir, f"{i}.npy"), values)
+                meta["columns"].append({"name": column, "categories": categories})
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump(meta, f)
+            try:
+                os.rename(tmp_dir, version_dir)
+            except OSError:  # written by another worker in the meantime
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        current = os.path.join(directory, f".current.{os.getpid()}")
+        with open(current, "w") as f:
+            f.write(dataset["version"])
+        os.replace(current, os.path.join(directory, "current"))
+
+    @staticmethod
+    def load_shared(directory=None):
+        """
+        Read the current version written by save_shared, None if there is none
+        The arrays of the table are read-only memory maps of the files, shared by all processes on the node
+        """
+        directory = directory or isograph_data.shared_dir
+        try:
+            with open(os.path.join(directory, "current")) as f:
+                version_dir = os.path.join(directory, f.read().strip())
+            with open(os.path.join(version_dir, "meta.json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        columns = {}
+        for i, column in enumerate(meta["columns"]):
+            values = np.load(os.path.join(version_dir, f"{i}.npy"), mmap_mode="r")
+            if column["categories"] is not None:
+                values = pd.Categorical.from_codes(values, categories=column["categories"], validate=False)
+            columns[column["name"]] = values
+        table = pd.DataFrame(columns, copy=False)
+        return {"fields": meta["fields"], "version": meta["version"], "table": table}
+
+    @staticmethod
+    def share(dataset):
+        """With shared_dir, write the table with save_shared and return the memory-mapped dataset instead"""
+        if not isograph_data.shared_dir:
+            return dataset
+        try:
+            isograph_data.save_shared(dataset)
+            return isograph_data.load_shared() or dataset
+        except OSError as e:
+            logger.warning(f"Failed to share the isograph data in {isograph_data.shared_dir}: {e}")
+            return dataset
+
+    @staticmethod
+    def refresh():
+        """
+        Update the last good copy if the version on MPContribs has changed, keep it if the download fails
+        Without a copy in memory, read the shared copy of another worker or the snapshot first
+        """
+        if isograph_data._dataset is None:
+            dataset = None
+            if isograph_data.shared_dir:
+                try:
+                    dataset = isograph_data.load_shared()
+                except (OSError, ValueError) as e:
+                    logger.error(f"Failed to read the shared isograph data in {isograph_data.shared_dir}: {e}")
+            if dataset is None:
+                try:
+                    dataset = isograph_data.load_snapshot()
+                except (OSError, ValueError) as e:
+                    logger.error(f"Failed to read {isograph_data.snapshot_path}: {e}")
+                if dataset is not None:
+                    dataset = isograph_data.share(isograph_data.convert(dataset))
+            if dataset is not None:
+                with isograph_data._lock:
+                    isograph_data._dataset = dataset
+                # the age of the snapshot is unknown, check the version on the next use
+                return True
+
+        current = isograph_data._dataset
+        try:
+            dataset = isograph_data.fetch(version=current["version"] if current else None)
+        except Exception as e:
+            logger.error(f"Failed to load the contributions of {isograph_data.project_name}: {e}")
+            return False
+        if dataset is not None:
+            try:
+                isograph_data.save_snapshot(dataset)
+            except OSError as e:
+                logger.warning(f"Failed to write {isograph_data.snapshot_path}: {e}")
+            dataset = isograph_data.share(isograph_data.convert(dataset))
+        with isograph_data._lock:
+            if dataset is not None:
+                isograph_data._dataset = dataset
+            isograph_data._loaded_at = time.monotonic()
+        return True
+
+    @staticmethod
+    def prefetch():
+        """Start downloading in a background thread unless a download is already running, returns the thread"""
+        with isograph_data._lock:
+            thread = isograph_data._refresh_thread
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(
+                    target=isograph_data.refresh, name="isograph_data_refresh", daemon=True
+                )
+                isograph_data._refresh_thread = thread
+                thread.start()
+        return thread
+
+    @staticmethod
+    def preload():
+        """
+        Load the data in the master process before the workers are forked (e.g. gunicorn `preload_app = True`)
+        Objects that exist at this point are moved out of the garbage collector, so that collections in the workers
+        do not write to (and thereby copy) the inherited pages
+        """
+        isograph_data.get()
+        gc.freeze()
+
+    @staticmethod
+    def _after_fork():
+        # locks and threads are not inherited in a usable state by forked workers
+        isograph_data._lock = threading.Lock()
+        isograph_data._refresh_thread = None
+
+    @staticmethod
+    def is_stale():
+        loaded_at = isograph_data._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > isograph_data.max_age
+
+    @staticmethod
+    def get():
+        """
+        Returns the contributions as {"fields": [...], "version": ..., "table": DataFrame} (see to_table)
+        Waits for the first copy only, later refreshes happen in the background
+        """
+        if isograph_data._dataset is None:
+            isograph_data.prefetch().join()
+        elif isograph_data.is_stale():
+            isograph_data.prefetch()
+        dataset = isograph_data._dataset
+        if dataset is None:
+            return {"fields": [], "version": None, "table": isograph_data.to_table([])}
+        return dataset
+
+    @staticmethod
+    def table():
+        """Table of the contributions, see to_table"""
+        return isograph_data.get()["table"]
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=isograph_data._after_fork)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot of the isograph contributions")
+    parser.add_argument("--refresh", action="store_true", help="download the contributions and write the snapshot")
+    parser.add_argument("--path", default=None, help=f"snapshot file (default {isograph_data.snapshot_path})")
+    args = parser.parse_args()
+    if args.path:
+        isograph_data.snapshot_path = args.path
+    if args.refresh:
+        isograph_data.save_snapshot(isograph_data.fetch())
+    snapshot = isograph_data.load_snapshot()
+    if snapshot is None:
+        print(f"No snapshot at {isograph_data.snapshot_path}")
+    else:
+        n = sum(1 for _ in snapshot["data"])
+        print(f"{isograph_data.snapshot_path}: {n} contributions, version {snapshot['version']}")
@@ -0,0 +1,122 @@
+import functools
+import re
+
+import pymatgen.core.periodic_table as ptable
+
+# runs of capital letter and following characters ("Sr0.5", "Ox") and of element symbols and stoichiometries
+_CHUNK = re.compile(r"[^A-Z]+|[A-Z][^A-Z]*")
+_TOKEN = re.compile(r"([A-Za-z]+)([^A-Za-z]*)")
+
+
+def _species_table():
+    sites, charges = {}, {}
+    for element in ptable.Element:
+        # rare earth metals: lanthanoids and actinoids
+        rare_earth = element.is_lanthanoid or element.is_actinoid
+        if element.is_alkaline or element.is_alkali or rare_earth:
+            sites[element.symbol] = "A"
+        elif element.is_transition_metal:
+            sites[element.symbol] = "B"
+        # charges of the A site species for find_active
+        if element.is_alkali:
+            charges[element.symbol] = 1
+        elif element.is_alkaline:
+            charges[element.symbol] = 2
+        elif element.is_lanthanoid:
+            charges[element.symbol] = 3
+    charges["Bi"] = 3
+    charges["Ce"] = 4
+    return sites, charges
+
+
+# site ("A" or "B") of the species of perovskites, charge of the species on the A site, built once at import
+SITES, A_SITE_CHARGES = _species_table()
+
+
+def _scaled_formula(tokens, factor, oxygen):
+    formula = ""
+    for symbol, number in tokens:
+        try:
+            formula += symbol + str(int(float(number) * factor))
+        except ValueError:
+            formula += symbol + number
+    return formula.split("O")[0] + oxygen
+
+
+class ParsedComposition:
+    """
+    Composition of a perovskite solid solution (A_1 A_2)(B_1 B_2)Ox, e.g. "Ca0.3Sr0.7Mn0.5Fe0.5Ox", parsed once
+    (see parse_composition) and shared by the helpers of redox_utils, therefore immutable
+
+    compstr:            composition as given
+    canonical:          with stoichiometries of 1 added, "SrFeOx" -> "Sr1Fe1Ox"
+    display:            with stoichiometries of 1 removed, "Sr1Fe1Ox" -> "SrFeOx"
+    a_site, b_site:     up to two (species, stoichiometry) per site, i.e. (("Fe", 0.6), ("Mn", 0.4))
+    chemical_system:    species of both sites and "O"
+    key:                all species but O with their stoichiometries, sorted, the same for equal compositions
+                        ("Sr0.5Ca0.5Fe1Ox", "Ca0.50Sr0.5FeO3")
+    perovskite:         formula of the perovskite with 8 formula units, "Sr8Fe8O24"
+    brownmillerite:     formula of the brownmillerite with 32 formula units, "Sr32Fe32O80"
+    """
+    __slots__ = ("compstr", "canonical", "display", "a_site", "b_site", "chemical_system", "key",
+                 "perovskite", "brownmillerite")
+
+    def __init__(self, compstr):
+        chunks = _CHUNK.findall("".join(str(compstr).split()))
+        canonical = "".join(c + "1" if c[-1].isalpha() and c[-1] != "x" else c for c in chunks)
+        tokens = _TOKEN.findall(canonical)
+
+        sites = {"A": [], "B": []}
+        for symbol, number in tokens:
+            site = SITES.get(symbol)
+            if site is None or len(sites[site]) == 2:
+                continue
+            try:
+                sites[site].append((symbol, float(number)))
+            except ValueError:
+                pass
+        species = sites["A"] + sites["B"]
+
+        key = []
+        for symbol, number in tokens:
+            if symbol in ("O", "Ox"):
+                break
+            try:
+                key.append((symbol, float(number)))
+            except ValueError:
+                pass
+
+        setattr_ = super().__setattr__
+        setattr_("compstr", compstr)
+        setattr_("canonical", canonical)
+        setattr_("display", "".join(
+            symbol + (str(x) if x != 1 else "") for symbol, x in species
+        ) + "Ox")
+        setattr_("a_site", tuple(sites["A"]))
+        setattr_("b_site", tuple(sites["B"]))
+        setattr_("chemical_system", tuple(symbol for symbol, _ in species) + ("O",))
+        setattr_("key", tuple(sorted(key)))
+        setattr_("perovskite", _scaled_formula(tokens, 8, "O24"))
+        setattr_("brownmillerite", _scaled_formula(tokens, 32, "O80"))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.compstr!r})"
+
+    @property
+    def sites(self):
+        """am_1, am_2, tm_1, tm_2 as (species, stoichiometry) or None"""
+        a_site = self.a_site + (None, None)
+        b_site = self.b_site + (None, None)
+        return a_site[0], a_site[1], b_site[0], b_site[1]
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_composition(compstr):
+    """ParsedComposition of compstr, the same object for repeated calls"""
+    return ParsedComposition(compstr)
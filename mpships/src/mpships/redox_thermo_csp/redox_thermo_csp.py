@@ -5,18 +5,23 @@ import dash
 import dash_ag_grid as dag
 import logging
 import numpy as np
-import pandas as pd
 import plotly.graph_objects as go
 import warnings
 import os.path
 import uuid
-from dash import callback, dcc, html, MATCH, Patch
-from dash.dependencies import Input, Output
+from dash import callback, clientside_callback, ctx, dcc, html, MATCH, Patch
+from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 from monty.serialization import loadfn
+from mpships.background_callbacks import background_callbacks
+from mpships.contribs_query import query_all_contributions
+from mpships.mp_client import resilient_client
+from mpships.result_cache import result_cache
 from mpships.redox_thermo_csp.redox_views import InitData as ID
 from mpships.redox_thermo_csp.redox_views import Isographs as Iso
 from mpships.redox_thermo_csp.redox_views import energy_analysis
+from mpships.redox_thermo_csp.redox_views import compare_isographs
+from mpships.redox_thermo_csp.isograph_data import isograph_data
 from mp_web.core.utils import (
     get_rester,
     get_tooltip,
@@ -38,16 +43,37 @@ ISOGRAPHS_TOOLTIPS = {
     "Ellingham": "Shows ΔG0 as a function of the temperature T (in K) with fixed non-stoichiometry δ. The gray isobar line can be adjusted to account for different oxygen partial pressures according to ΔG(pO2) = ΔG0 - 1/2 * RT * ln(pO2). If ΔG0 is below the isobar line, the reduction occurs spontaneously.",
 }
 
-# get isograph data immediately from MPContribs
-mpr = get_rester()
-project = mpr.contribs.get_project(name="redox_thermo_csp")
-fields = [column["path"] for column in project["columns"]]
-isographs_contributions_resp = mpr.contribs.query_contributions(
-    query={
-        "project": "redox_thermo_csp",
-    },
-    fields=fields,
-)
+# plot types of the isographs in the order of the figure numbers used in get_figure
+ISOGRAPH_PLOTTYPES = ["isotherm", "isobar", "isoredox", "dH", "dS", "ellingham"]
+
+# axes of the isographs for the comparison of several materials, in the order of ISOGRAPH_PLOTTYPES
+ISOGRAPH_AXES = [
+    ({"type": "log", "title": "p<sub>O2</sub> (bar)"}, {"title": "δ"}),
+    ({"title": "T (K)"}, {"title": "δ"}),
+    ({"title": "T (K)"}, {"type": "log", "title": "p<sub>O2</sub> (bar)"}),
+    ({"title": "δ"}, {"title": "ΔH<sub>O</sub> (kJ/mol)"}),
+    ({"title": "δ"}, {"title": "ΔS<sub>O</sub> (J/mol\u22C5K)"}),
+    ({"title": "T (K)"}, {"title": "ΔG<sub>O</sub> (kJ/mol)"}),
+]
+
+# material selected when the isographs tab is opened
+DEFAULT_COMPOSITION = "Sr1Fe1Ox"
+
+# initial slider values of the isographs as arguments of get_figure, in the order of ISOGRAPH_PLOTTYPES
+ISOGRAPH_DEFAULTS = [
+    {"constant": 1000, "rng": [-5, 1]},
+    {"constant": 0, "rng": [700, 1400]},
+    {"constant": 0.3, "rng": [700, 1400]},
+    {"constant": 500},
+    {"constant": 500},
+    {"constant": 0, "rng": [400, 1500], "delta": 0.3},
+]
+
+# initial slider values of the energy analysis tab
+ENERGY_DEFAULTS = {"process_type": "AS", "t_ox": 500, "t_red": 900, "p_ox": -6, "p_red": -0.67778070526}
+
+# start downloading the isograph data from MPContribs without blocking the import
+isograph_data.prefetch()
 
 class RedoxThermoCSPAIO(html.Div):
 
@@ -77,6 +103,11 @@ class RedoxThermoCSPAIO(html.Div):
             "aio": aio,
             "subcomponents": "energy_analysis_tab",
         }
+        energy_analysis_content = lambda aio: {
+            "component": "RedoxThermoCSPAIO",
+            "aio": aio,
+            "subcomponents": "energy_analysis_content",
+        }
         tabs = lambda aio: {
             "component": "RedoxThermoCSPAIO",
             "aio": aio,
@@ -87,6 +118,11 @@ class RedoxThermoCSPAIO(html.Div):
             "aio": aio,
             "subcomponents": "isographs_data_table",
         }
+        compare_toggle = lambda aio: {
+            "component": "RedoxThermoCSPAIO",
+            "aio": aio,
+            "subcomponents": "compare_toggle",
+        }
         temp_slider = lambda aio: {
             "component": "RedoxThermoCSPAIO",
             "aio": aio,
@@ -277,25 +313,7 @@ class RedoxThermoCSPAIO(html.Div):
         # layout
         ##########################
 
-        self.how_to_cite = ctl.MessageContainer(
-            [
-                ctl.MessageHeader("How to Cite"),
-                ctl.MessageBody(
-                    dcc.Markdown(
-                        """
-                            Please cite these publications if this data is useful for your work.
-                            * [Perovskite Materials Design for Two-step Solar thermochemical Redox Cycles](https://doi.org/10.13140/RG.2.2.17964.92800)
-                            * [Materials design of perovskite solid solutions for thermochemical applications](https://doi.org/10.1039/C9EE00085B)
-                            * [Redox behavior of solid solutions in the SrFe1-xCuxO3-δ system for application in thermochemical oxygen storage and air separation] (https://doi.org/10.1002/ente.201800554)
-                            * [Redox thermodynamics and phase composition in the system SrFeO3−δ — SrMnO3−δ.](https://doi.org/10.1016/j.ssi.2017.06.014)
-                            * [Statistical thermodynamics of non-stoichiometric ceria and ceria zirconia solid solutions](https://doi.org/10.1039/c6cp03158g)
-                            * [Formation of Na0.9Mo6O17 in a Solid-Phase Process. Transformations of a Hydrated Soldium Molybdenum Bronze, Na0.23(H2O)0.78MoO3, with Heat Treatments in a Nitrogen Atmosphere](https://doi.org/10.1246/bcsj.64.161)
-                        """
-                    )
-                ),
-            ],
-            kind="info",
-        )
+        self.how_to_cite = self.get_how_to_cite()
 
         tabs = dcc.Tabs(
             [
@@ -309,10 +327,10 @@ class RedoxThermoCSPAIO(html.Div):
                     value="isographs",
                 ),
                 dcc.Tab(
-                    
+                    # built by load_energy_analysis when the tab is selected for the first time
                     children=[
                         html.Br(),
-                        self.get_energy_analysis_layout(aio),
+                        ctl.Loading(html.Div(id=self.ids.energy_analysis_content(aio))),
                     ],
                     label="Energy Analysis",
                     id=self.ids.energy_analysis_tab(aio),
@@ -324,74 +342,57 @@ class RedoxThermoCSPAIO(html.Div):
         )
         super().__init__(children=[tabs], **kwargs)
 
+    @staticmethod
+    def get_how_to_cite():
+        """message with the publications to cite"""
+        return ctl.MessageContainer(
+            [
+                ctl.MessageHeader("How to Cite"),
+                ctl.MessageBody(
+                    dcc.Markdown(
+                        """
+                            Please cite these publications if this data is useful for your work.
+                            * [Perovskite Materials Design for Two-step Solar thermochemical Redox Cycles](https://doi.org/10.13140/RG.2.2.17964.92800)
+                            * [Materials design of perovskite solid solutions for thermochemical applications](https://doi.org/10.1039/C9EE00085B)
+                            * [Redox behavior of solid solutions in the SrFe1-xCuxO3-δ system for application in thermochemical oxygen storage and air separation] (https://doi.org/10.1002/ente.201800554)
+                            * [Redox thermodynamics and phase composition in the system SrFeO3−δ — SrMnO3−δ.](https://doi.org/10.1016/j.ssi.2017.06.014)
+                            * [Statistical thermodynamics of non-stoichiometric ceria and ceria zirconia solid solutions](https://doi.org/10.1039/c6cp03158g)
+                            * [Formation of Na0.9Mo6O17 in a Solid-Phase Process. Transformations of a Hydrated Soldium Molybdenum Bronze, Na0.23(H2O)0.78MoO3, with Heat Treatments in a Nitrogen Atmosphere](https://doi.org/10.1246/bcsj.64.161)
+                        """
+                    )
+                ),
+            ],
+            kind="info",
+        )
+
     def get_isographs_layout(self, aio):
         """create layout for the isographs tab with the Dash AGGrid"""
 
-        # lists of data for DataFrame
-        formula = []
-        oxidized_mpid = []
-        oxidized_composition = []
-        reduced_mpid = []
-        reduced_composition = []
-        theoretical_tolerance = []
-        theoretical_composition = []
-        theoretical_delta_H_min = []
-        theoretical_delta_H_max = []
-        solution = []
-        availability = []
-        updated = []
-
-        # organize MpContribs data into lists for DataFrame
-        for entry in isographs_contributions_resp['data']:
-            formula.append(entry['data']['phases']['oxidized']['composition'])
-            oxidized_mpid.append(entry['data']['phases']['oxidized']['mpid'])
-            oxidized_composition.append(entry['data']['phases']['oxidized']['composition'])
-            reduced_mpid.append(entry['data']['phases']['reduced']['mpid'])
-            try:
-                reduced_composition.append(entry['data']['phases']['reduced']['composition'])
-            except:
-                reduced_composition.append('-')
-            theoretical_tolerance.append(entry['data']['theoretical']['tolerance']['value'])
-            theoretical_composition.append(entry['data']['theoretical']['composition'])
-            theoretical_delta_H_min.append(entry['data']['theoretical']['ΔH']['min']['value'])
-            theoretical_delta_H_max.append(entry['data']['theoretical']['ΔH']['max']['value'])
-            solution.append(entry['data']['solution'])
-            availability.append(entry['data']['availability'])
-            updated.append(entry['data']['updated'])
-
-        data = {"Formula": formula,
-            "Oxidized mp-id": oxidized_mpid,
-            "Oxidized Composition": oxidized_composition,
-            "Reduced mp-id": reduced_mpid,
-            "Reduced Composition": reduced_composition,
-            "Theoretical Tolerance": theoretical_tolerance,
-            "Theoretical Composition": theoretical_composition,
-            "Theoretical ΔH Min (kJ/mol)": theoretical_delta_H_min,
-            "Theoretical ΔH Max (kJ/mol)": theoretical_delta_H_max,
-            "Solution": solution,
-            "Availability": availability,
-            "Last Updated": updated
-            }
-
-        df = pd.DataFrame(data)
+        column_defs, row_data, selected_rows = get_isographs_grid_data()
 
         isographs_data_table = html.Div(
             [
-                dag.AgGrid(
-                    id=self.ids.isographs_data_table(aio),
-                    columnDefs=[
+                dcc.Checklist(
+                    id=self.ids.compare_toggle(aio),
+                    options=[
                         {
-                            "field": x,
+                            "label": " Compare materials (select several rows)",
+                            "value": "compare",
                         }
-                        for x in df.columns
                     ],
-                    rowData=df.to_dict("records"),
+                    value=[],
+                    style={"padding-bottom": "12px"},
+                ),
+                dag.AgGrid(
+                    id=self.ids.isographs_data_table(aio),
+                    columnDefs=column_defs,
+                    rowData=row_data,
                     className="ag-theme-quartz",
                     columnSize="autoSize",
                     dashGridOptions={
                         "rowSelection": "single",
                     },
-                    selectedRows=df[df["Theoretical Composition"] == "Sr1Fe1Ox"].to_dict("records")
+                    selectedRows=selected_rows
                 ),
             ]
         )
@@ -404,7 +405,9 @@ class RedoxThermoCSPAIO(html.Div):
                         tooltip_label=ctl.H3(plot_title),
                         tooltip_text=ISOGRAPHS_TOOLTIPS[plot_title],
                     ),
-                    dcc.Graph(id=plot_id, figure=plot),
+                    # isographs are computed by background callbacks, keep the
+                    # spinner on the graph instead of blocking the page
+                    ctl.Loading(dcc.Graph(id=plot_id, figure=plot)),
                 ]
                 + [
                     ctl.Container(
@@ -460,13 +463,13 @@ class RedoxThermoCSPAIO(html.Div):
 
         # sliders components for all the graphs
         temp_slider = get_slider(
-            id=self.ids.temp_slider(aio), min=500, max=1800, value=1000
+            id=self.ids.temp_slider(aio), min=500, max=1800, value=ISOGRAPH_DEFAULTS[0]["constant"]
         )
         pressure_range = dcc.RangeSlider(
             id=self.ids.pressure_range(aio),
             min=-7,
             max=3,
-            value=[-5, 1],
+            value=ISOGRAPH_DEFAULTS[0]["rng"],
             marks={i: "{}".format(10**i) for i in range(-7, 4, 2)},
             tooltip={"always_visible": False, "transform": "powerOfTen"},
         )
@@ -479,12 +482,12 @@ class RedoxThermoCSPAIO(html.Div):
             id=self.ids.pressure_slider(aio),
             min=-7,
             max=4,
-            value=0,
+            value=ISOGRAPH_DEFAULTS[1]["constant"],
             marks={i: "{}".format(10**i) for i in range(-7, 5, 2)},
             tooltip={"always_visible": False, "transform": "powerOfTen"},
         )
         temp_range_slider = get_slider(
-            id=self.ids.temp_range_slider(aio), min=500, max=1800, value=[700, 1400]
+            id=self.ids.temp_range_slider(aio), min=500, max=1800, value=ISOGRAPH_DEFAULTS[1]["rng"]
         )
         fig_1_sliders = [
             {"label": "Pressure (bar)", "component": pressure_slider},
@@ -492,10 +495,10 @@ class RedoxThermoCSPAIO(html.Div):
         ]
 
         redox_slider = get_slider(
-            id=self.ids.redox_slider(aio), min=0, max=0.5, value=0.3
+            id=self.ids.redox_slider(aio), min=0, max=0.5, value=ISOGRAPH_DEFAULTS[2]["constant"]
         )
         redox_temp_range_slider = get_slider(
-            id=self.ids.redox_temp_range(aio), min=500, max=1800, value=[700, 1400]
+            id=self.ids.redox_temp_range(aio), min=500, max=1800, value=ISOGRAPH_DEFAULTS[2]["rng"]
         )
         fig_2_sliders = [
             {"label": "Redox δ", "component": redox_slider},
@@ -503,23 +506,23 @@ class RedoxThermoCSPAIO(html.Div):
         ]
 
         dH_temp_slider = get_slider(
-            id=self.ids.dH_temp_slider(aio), min=100, max=2000, value=500
+            id=self.ids.dH_temp_slider(aio), min=100, max=2000, value=ISOGRAPH_DEFAULTS[3]["constant"]
         )
         fig_3_sliders = [{"label": "Redox δ", "component": dH_temp_slider}]
 
         dS_temp_slider = get_slider(
-            id=self.ids.dS_temp_slider(aio), min=100, max=2000, value=500
+            id=self.ids.dS_temp_slider(aio), min=100, max=2000, value=ISOGRAPH_DEFAULTS[4]["constant"]
         )
         fig_4_sliders = [{"label": "Temperature (K)", "component": dS_temp_slider}]
 
         elling_redox_slider = get_slider(
-            id=self.ids.elling_redox_slider(aio), min=0, max=0.5, value=0.3
+            id=self.ids.elling_redox_slider(aio), min=0, max=0.5, value=ISOGRAPH_DEFAULTS[5]["delta"]
         )
         elling_temp_range = get_slider(
-            id=self.ids.elling_temp_range(aio), min=200, max=2000, value=[400, 1500]
+            id=self.ids.elling_temp_range(aio), min=200, max=2000, value=ISOGRAPH_DEFAULTS[5]["rng"]
         )
         elling_pressure_slider = get_slider(
-            id=self.ids.elling_pressure_slider(aio), min=-20, max=10, value=0
+            id=self.ids.elling_pressure_slider(aio), min=-20, max=10, value=ISOGRAPH_DEFAULTS[5]["constant"]
         )
         fig_5_sliders = [
             {"label": "Redox δ", "component": elling_redox_slider},
@@ -666,15 +669,16 @@ class RedoxThermoCSPAIO(html.Div):
             ],
         )
 
-    def get_energy_analysis_layout(self, aio):
+    @classmethod
+    def get_energy_analysis_layout(cls, aio):
         # create the layout that will appear in the "energy_analysis_tab"
         enera_fig = enera_fig_gen(en_dat=query_mp_contribs_energy_analysis())
         t_ox_slider = dcc.Slider(
-                id=self.ids.t_ox_slider(aio),
+                id=cls.ids.t_ox_slider(aio),
                 min=350,
                 max=800,
                 step=None,
-                value=500,
+                value=ENERGY_DEFAULTS["t_ox"],
                 tooltip={"always_visible": False},
                 marks={
                     350: "350",
@@ -687,11 +691,11 @@ class RedoxThermoCSPAIO(html.Div):
                 }
             )
         t_red_slider = dcc.Slider(
-            id=self.ids.t_red_slider(aio),
+            id=cls.ids.t_red_slider(aio),
             min=600,
             max=1400,
             step=None,
-            value=900,
+            value=ENERGY_DEFAULTS["t_red"],
             tooltip={"always_visible": False},
             marks={
                 600: "600",
@@ -705,11 +709,11 @@ class RedoxThermoCSPAIO(html.Div):
             },
         )
         p_ox_slider = dcc.Slider(
-            id=self.ids.p_ox_slider(aio),
+            id=cls.ids.p_ox_slider(aio),
             min=-20,
             max=-3,
             step=None,
-            value=-6,
+            value=ENERGY_DEFAULTS["p_ox"],
             tooltip={"always_visible": False},
             marks={
                 -20: "10⁻²⁰",
@@ -724,11 +728,11 @@ class RedoxThermoCSPAIO(html.Div):
             },
         )
         p_red_slider = dcc.Slider(
-            id=self.ids.p_red_slider(aio),
+            id=cls.ids.p_red_slider(aio),
             min=-8,
             max=0,
             step=None,
-            value=-0.67778070526,
+            value=ENERGY_DEFAULTS["p_red"],
             tooltip={"always_visible": False},
             marks={
                 -8: "10⁻⁸",
@@ -766,7 +770,7 @@ class RedoxThermoCSPAIO(html.Div):
                                             t_ox_slider,
                                             html.Br(),
                                             html.B(
-                                                id=self.ids.text_p_ox(aio), 
+                                                id=cls.ids.text_p_ox(aio), 
                                                 children="Oxidation Partial Pressure of Oxygen (bar)", 
                                                 style={"font-size": "20px"}
                                             ),
@@ -804,7 +808,7 @@ class RedoxThermoCSPAIO(html.Div):
                                                 style={"font-size": "20px"},
                                             ),
                                             dcc.Slider(
-                                                id=self.ids.h_rec_solid(aio),
+                                                id=cls.ids.h_rec_solid(aio),
                                                 min=0,
                                                 max=0.99,
                                                 value=0.6,
@@ -822,7 +826,7 @@ class RedoxThermoCSPAIO(html.Div):
                                                     ctl.Column(
                                                         [
                                                             dcc.Checklist(
-                                                                id=self.ids.mech_env(
+                                                                id=cls.ids.mech_env(
                                                                     aio
                                                                 ),
                                                                 options=[
@@ -843,7 +847,7 @@ class RedoxThermoCSPAIO(html.Div):
                                                         [
                                                             html.B("or define "),
                                                             dcc.Input(
-                                                                id=self.ids.pump_ener(
+                                                                id=cls.ids.pump_ener(
                                                                     aio
                                                                 ),
                                                                 type="number",
@@ -868,7 +872,7 @@ class RedoxThermoCSPAIO(html.Div):
                                                         style={"font-size": "20px"},
                                                     ),
                                                     dcc.Slider(
-                                                        id=self.ids.w_feed(aio),
+                                                        id=cls.ids.w_feed(aio),
                                                         min=5,
                                                         max=600,
                                                         value=200,
@@ -888,7 +892,7 @@ class RedoxThermoCSPAIO(html.Div):
                                                         style={"font-size": "20px"},
                                                     ),
                                                     dcc.Slider(
-                                                        id=self.ids.w_hrec(aio),
+                                                        id=cls.ids.w_hrec(aio),
                                                         min=0,
                                                         max=0.99,
                                                         value=0.8,
@@ -923,7 +927,7 @@ class RedoxThermoCSPAIO(html.Div):
                                         html.Div(
                                             [
                                                 dcc.Dropdown(
-                                                    id=self.ids.process(aio),
+                                                    id=cls.ids.process(aio),
                                                     options=[
                                                         {
                                                             "label": "Air Separation / Oxygen pumping / Oxygen storage",
@@ -938,7 +942,7 @@ class RedoxThermoCSPAIO(html.Div):
                                                             "value": "CS",
                                                         },
                                                     ],
-                                                    value="AS",
+                                                    value=ENERGY_DEFAULTS["process_type"],
                                                 )
                                             ]
                                         )
@@ -950,14 +954,14 @@ class RedoxThermoCSPAIO(html.Div):
                     ]
                 ),
                 html.Div(
-                    id=self.ids.variable_input(aio), children=contents
+                    id=cls.ids.variable_input(aio), children=contents
                 ),
                 html.Br(),
                 ctl.Box(
                     [
                         html.Div(
                             ctl.Loading(
-                                dcc.Graph(id=self.ids.enera_graph(aio), figure=enera_fig)
+                                dcc.Graph(id=cls.ids.enera_graph(aio), figure=enera_fig)
                                 )
                         ),
                         html.Br(),
@@ -965,7 +969,7 @@ class RedoxThermoCSPAIO(html.Div):
                             [
                                 html.B(children="Parameters to display"),
                                 dcc.Dropdown(
-                                    id=self.ids.param_disp(aio),
+                                    id=cls.ids.param_disp(aio),
                                     options=[
                                         {
                                             "label": "kJ/mol redox material",
@@ -1025,7 +1029,7 @@ class RedoxThermoCSPAIO(html.Div):
                             children=[
                                 html.B("Max number of materials to display"),
                                 dcc.Slider(
-                                    id=self.ids.no_disp(aio),
+                                    id=cls.ids.no_disp(aio),
                                     min=1,
                                     max=250,
                                     step=1,
@@ -1072,13 +1076,24 @@ class RedoxThermoCSPAIO(html.Div):
                         ]
                     )
                 ),
-                self.how_to_cite,
+                cls.get_how_to_cite(),
             ]
         )
         return layout
     
     #TODO see where a legend would look good for the isographs
 
+    @callback(
+        Output(ids.energy_analysis_content(MATCH), "children"),
+        Input(ids.tabs(MATCH), "value"),
+        State(ids.energy_analysis_content(MATCH), "children"),
+    )
+    def load_energy_analysis(tab, children):
+        """build the energy analysis tab when it is selected for the first time"""
+        if tab != "energy" or children:
+            raise PreventUpdate
+        return RedoxThermoCSPAIO.get_energy_analysis_layout(ctx.outputs_list["id"]["aio"])
+
     ######################
     # Isographs Callbacks
     ######################
@@ -1092,11 +1107,35 @@ class RedoxThermoCSPAIO(html.Div):
         newFilter['quickFilterText'] = filter_value
         return newFilter
 
+    @callback(
+        Output(ids.isographs_data_table(MATCH), "dashGridOptions", allow_duplicate=True),
+        Output(ids.isographs_data_table(MATCH), "selectedRows", allow_duplicate=True),
+        Input(ids.compare_toggle(MATCH), "value"),
+        State(ids.isographs_data_table(MATCH), "selectedRows"),
+        prevent_initial_call=True,
+    )
+    def toggle_compare(compare, row):
+        """allow selecting several rows in the comparison mode, keep only the first one when leaving it"""
+        newOptions = Patch()
+        if compare == ["compare"]:
+            newOptions["rowSelection"] = "multiple"
+            return newOptions, dash.no_update
+        newOptions["rowSelection"] = "single"
+        if row and len(row) > 1:
+            return newOptions, row[:1]
+        return newOptions, dash.no_update
+
     @callback(
         Output(ids.isograph_information(MATCH), "children"),
         Input(ids.isographs_data_table(MATCH), "selectedRows")
     )
     def isograph_information_text(row):
+        if not row:
+            raise PreventUpdate
+        if len(row) > 1:
+            return "Comparing Isographs for " + ", ".join(
+                unicodeify(r['Oxidized Composition']) for r in row
+            )
         return f"Showing Isographs for {unicodeify(row[0]['Oxidized Composition'])}"
 
     @callback(
@@ -1104,16 +1143,28 @@ class RedoxThermoCSPAIO(html.Div):
         Input(ids.isographs_data_table(MATCH), "selectedRows"),
         Input(ids.temp_slider(MATCH), "value"),
         Input(ids.pressure_range(MATCH), "value"),
+        State(ids.isotherm(MATCH), "figure"),
+        background=True,
+        manager=background_callbacks.manager,
+        interval=250,
     )
-    def update_fig_0(row, temp_slider, pressure_range):
-        compstr = row[0]["Theoretical Composition"]
-        theo_data = reformat_isograph_data(compstr)
-        return get_figure(
+    def update_fig_0(row, temp_slider, pressure_range, figure):
+        if not row:
+            raise PreventUpdate
+        if len(row) > 1:
+            return get_comparison_figure(
+                figure_number=0,
+                compstrs=[r["Theoretical Composition"] for r in row],
+                constant=temp_slider,
+                rng=pressure_range,
+                current=figure,
+            )
+        return isograph_figure(
             figure_number=0,
-            theo_data=theo_data,
-            compstr=compstr,
+            compstr=row[0]["Theoretical Composition"],
             constant=temp_slider,
             rng=pressure_range,
+            current=figure,
         )
 
     @callback(
@@ -1121,16 +1172,28 @@ class RedoxThermoCSPAIO(html.Div):
         Input(ids.isographs_data_table(MATCH), "selectedRows"),
         Input(ids.pressure_slider(MATCH), "value"),
         Input(ids.temp_range_slider(MATCH), "value"),
+        State(ids.isobar(MATCH), "figure"),
+        background=True,
+        manager=background_callbacks.manager,
+        interval=250,
     )
-    def update_fig_1(row, pressure_slider, temp_range_slider):
-        compstr = row[0]["Theoretical Composition"]
-        theo_data = reformat_isograph_data(compstr)
-        return get_figure(
+    def update_fig_1(row, pressure_slider, temp_range_slider, figure):
+        if not row:
+            raise PreventUpdate
+        if len(row) > 1:
+            return get_comparison_figure(
+                figure_number=1,
+                compstrs=[r["Theoretical Composition"] for r in row],
+                constant=pressure_slider,
+                rng=temp_range_slider,
+                current=figure,
+            )
+        return isograph_figure(
             figure_number=1,
-            theo_data=theo_data,
-            compstr=compstr,
+            compstr=row[0]["Theoretical Composition"],
             constant=pressure_slider,
             rng=temp_range_slider,
+            current=figure,
         )
 
     @callback(
@@ -1138,46 +1201,80 @@ class RedoxThermoCSPAIO(html.Div):
         Input(ids.isographs_data_table(MATCH), "selectedRows"),
         Input(ids.redox_slider(MATCH), "value"),
         Input(ids.redox_temp_range(MATCH), "value"),
+        State(ids.isoredox(MATCH), "figure"),
+        background=True,
+        manager=background_callbacks.manager,
+        interval=250,
     )
-    def update_fig_2(row, redox_slider, redox_temp_range):
-        compstr = row[0]["Theoretical Composition"]
-        theo_data = reformat_isograph_data(compstr)
-        return get_figure(
+    def update_fig_2(row, redox_slider, redox_temp_range, figure):
+        if not row:
+            raise PreventUpdate
+        if len(row) > 1:
+            return get_comparison_figure(
+                figure_number=2,
+                compstrs=[r["Theoretical Composition"] for r in row],
+                constant=redox_slider,
+                rng=redox_temp_range,
+                current=figure,
+            )
+        return isograph_figure(
             figure_number=2,
-            theo_data=theo_data,
-            compstr=compstr,
+            compstr=row[0]["Theoretical Composition"],
             constant=redox_slider,
             rng=redox_temp_range,
+            current=figure,
         )
 
     @callback(
         Output(ids.enthalpy(MATCH), "figure"),
             Input(ids.isographs_data_table(MATCH), "selectedRows"),
             Input(ids.dH_temp_slider(MATCH), "value"),
+            State(ids.enthalpy(MATCH), "figure"),
+        background=True,
+        manager=background_callbacks.manager,
+        interval=250,
     )
-    def update_fig_3(row, dH_temp_slider):
-        compstr = row[0]["Theoretical Composition"]
-        theo_data = reformat_isograph_data(compstr)
-        return get_figure(
+    def update_fig_3(row, dH_temp_slider, figure):
+        if not row:
+            raise PreventUpdate
+        if len(row) > 1:
+            return get_comparison_figure(
+                figure_number=3,
+                compstrs=[r["Theoretical Composition"] for r in row],
+                constant=dH_temp_slider,
+                current=figure,
+            )
+        return isograph_figure(
             figure_number=3,
-            theo_data=theo_data,
-            compstr=compstr,
+            compstr=row[0]["Theoretical Composition"],
             constant=dH_temp_slider,
+            current=figure,
         )
 
     @callback(
         Output(ids.entropy(MATCH), "figure"),
         Input(ids.isographs_data_table(MATCH), "selectedRows"),
         Input(ids.dS_temp_slider(MATCH), "value"),
+        State(ids.entropy(MATCH), "figure"),
+        background=True,
+        manager=background_callbacks.manager,
+        interval=250,
     )
-    def update_fig_4(row, dS_temp_slider):
-        compstr = row[0]["Theoretical Composition"]
-        theo_data = reformat_isograph_data(compstr)
-        return get_figure(
+    def update_fig_4(row, dS_temp_slider, figure):
+        if not row:
+            raise PreventUpdate
+        if len(row) > 1:
+            return get_comparison_figure(
+                figure_number=4,
+                compstrs=[r["Theoretical Composition"] for r in row],
+                constant=dS_temp_slider,
+                current=figure,
+            )
+        return isograph_figure(
             figure_number=4,
-            theo_data=theo_data,
-            compstr=compstr,
+            compstr=row[0]["Theoretical Composition"],
             constant=dS_temp_slider,
+            current=figure,
         )
 
     @callback(
@@ -1185,26 +1282,69 @@ class RedoxThermoCSPAIO(html.Div):
         Input(ids.isographs_data_table(MATCH), "selectedRows"),
         Input(ids.elling_redox_slider(MATCH), "value"),
         Input(ids.elling_temp_range(MATCH), "value"),
-        Input(ids.elling_pressure_slider(MATCH), "value"),
-        
+        # the ΔG° curves do not depend on the pressure, moving the isobar line is handled in the browser
+        State(ids.elling_pressure_slider(MATCH), "value"),
+        State(ids.ellingham(MATCH), "figure"),
+        background=True,
+        manager=background_callbacks.manager,
+        interval=250,
     )
     def update_fig_5(
         row,
         elling_redox_slider,
         elling_temp_range,
         elling_pressure_slider,
+        figure,
     ):
-        compstr = row[0]["Theoretical Composition"]
-        theo_data = reformat_isograph_data(compstr)
-        return get_figure(
+        if not row:
+            raise PreventUpdate
+        if len(row) > 1:
+            return get_comparison_figure(
+                figure_number=5,
+                compstrs=[r["Theoretical Composition"] for r in row],
+                constant=elling_pressure_slider,
+                rng=elling_temp_range,
+                delta=elling_redox_slider,
+                current=figure,
+            )
+        return isograph_figure(
             figure_number=5,
-            theo_data=theo_data,
-            compstr=compstr,
+            compstr=row[0]["Theoretical Composition"],
             constant=elling_pressure_slider,
             rng=elling_temp_range,
             delta=elling_redox_slider,
+            current=figure,
         )
 
+    # isobar line of the Ellingham diagram: ΔG(pO2) = -1/2 * R * T * ln(pO2), same as isobar_line_elling
+    # also applied to new figures of update_fig_5, which are computed with the pressure at the start of its job
+    clientside_callback(
+        """
+        function(elling_pressure_slider, figure) {
+            const i = (figure && figure.data) ? figure.data.findIndex(trace => trace.name === "isobar line") : -1;
+            if (i < 0 || !Array.isArray(figure.data[i].x)) {
+                return window.dash_clientside.no_update;
+            }
+            const R = 8.314462618;
+            const iso = elling_pressure_slider * Math.LN10;
+            const y = figure.data[i].x.map(t => -R * iso * t / 2 / 1000);
+            const current = figure.data[i].y;
+            if (Array.isArray(current) && current.length === y.length &&
+                    current.every((v, j) => Math.abs(v - y[j]) <= 1e-9 * Math.max(1, Math.abs(y[j])))) {
+                return window.dash_clientside.no_update;
+            }
+            const isobar_line = Object.assign({}, figure.data[i], {y: y});
+            const data = figure.data.slice();
+            data[i] = isobar_line;
+            return Object.assign({}, figure, {data: data});
+        }
+        """,
+        Output(ids.ellingham(MATCH), "figure", allow_duplicate=True),
+        Input(ids.elling_pressure_slider(MATCH), "value"),
+        Input(ids.ellingham(MATCH), "figure"),
+        prevent_initial_call=True,
+    )
+
     ###########################
     # Energy Analysis Callbacks
     ###########################
@@ -1568,6 +1708,7 @@ def enera_fig_gen(
 
     return fig
 
+@result_cache.cached("energy_analysis")
 def query_mp_contribs_energy_analysis(
     process_type="AS",
     t_ox=500,
@@ -1589,9 +1730,10 @@ def query_mp_contribs_energy_analysis(
     db_id += str(float(p_red)) + "_"
     db_id += str(data_source) + "_"
     db_id += str(float(enth_steps))
-    mpr = get_rester()
-    # Fetch contribution-level data
-    contributions_resp = mpr.contribs.query_contributions(
+    mpr = resilient_client("mp_web", get_rester)
+    # Fetch contribution-level data, with the pages requested concurrently
+    contributions_resp = query_all_contributions(
+        mpr.contribs,
         query={"project": "redox_thermo_csp_energy", "data__id__exact": db_id},
         fields=[
             "data.prodstr",
@@ -1614,9 +1756,9 @@ def query_mp_contribs_energy_analysis(
             "data.gProdKgRed",
             "data.delta2",
         ],
-        paginate=True,
+        sort="id",  # the pages are requested concurrently, a stable order keeps them consistent
     )
-    if contributions_resp:
+    if contributions_resp["data"]:
 
     # reformat MPContribs data to work with Josua Vieten's original code
         data = [
@@ -1681,7 +1823,77 @@ def query_mp_contribs_energy_analysis(
 # Method for creating the isographs
 ####################################
 
-def get_figure(figure_number, theo_data, compstr, constant=None, rng=None, delta=None):
+# column definitions, rows and default selection of the isographs table by version of the isograph data
+_ISOGRAPHS_GRID_DATA = {}
+
+
+def get_isographs_grid_data():
+    """
+    Column definitions, rows and default selection of the isographs table, computed once per version of the
+    isograph data and shared by all instances of RedoxThermoCSPAIO (do not modify)
+    """
+    dataset = isograph_data.get()
+    grid_data = _ISOGRAPHS_GRID_DATA.get(dataset["version"])
+    if grid_data is None:
+        df = dataset["table"][isograph_data.DISPLAY_COLUMNS]
+        grid_data = (
+            [{"field": x} for x in df.columns],
+            df.to_dict("records"),
+            df[df["Theoretical Composition"] == DEFAULT_COMPOSITION].to_dict("records"),
+        )
+        _ISOGRAPHS_GRID_DATA.clear()
+        _ISOGRAPHS_GRID_DATA[dataset["version"]] = grid_data
+    return grid_data
+
+
+def selection_changed():
+    """True if an isographs callback was triggered by selecting another material instead of moving a slider"""
+    return not ctx.triggered_id or ctx.triggered_id["subcomponents"] == "isographs_data_table"
+
+
+def can_patch(current, compstrs, n_traces):
+    """
+    True if the current figure in the browser (State of the figure) shows the given materials with n_traces traces,
+    so that its traces can be patched. The materials are recorded in layout.meta of the figures, because a background
+    job can be superseded by a later one, so the trigger of the callback alone does not tell what the figure shows
+    """
+    if not current or selection_changed():
+        return False
+    meta = (current.get("layout") or {}).get("meta") or {}
+    return meta.get("compstrs") == list(compstrs) and len(current.get("data") or []) == n_traces
+
+
+def isograph_figure(figure_number, compstr, constant=None, rng=None, delta=None, current=None):
+    """
+    Isograph of a single material, see get_figure. If the current figure shows the same material (see can_patch), only
+    a patch of its traces is returned.
+    Figures and patches are cached for the version of the isograph data (see result_cache), patches only for a few
+    minutes since there is one for every position of the sliders. A cached patch is returned in its JSON form, which
+    Dash applies like the Patch itself. Identical calls in all workers are computed once (see result_cache.compute)
+    """
+    if can_patch(current, [compstr], 4 if figure_number == 5 else 3):
+        return _isograph_patch(figure_number, compstr, constant=constant, rng=rng, delta=delta)
+    return _cached_isograph_figure(figure_number, compstr, constant=constant, rng=rng, delta=delta)
+
+
+@result_cache.cached("isograph_patch", version=lambda: isograph_data.get()["version"], ttl=300)
+def _isograph_patch(figure_number, compstr, constant=None, rng=None, delta=None):
+    theo_data = reformat_isograph_data(compstr)
+    return get_figure(figure_number, theo_data, compstr, constant=constant, rng=rng, delta=delta, patch=True)
+
+
+@result_cache.cached("isograph_figure", version=lambda: isograph_data.get()["version"])
+def _cached_isograph_figure(figure_number, compstr, constant=None, rng=None, delta=None):
+    theo_data = reformat_isograph_data(compstr)
+    return get_figure(figure_number, theo_data, compstr, constant=constant, rng=rng, delta=delta)
+
+
+def get_figure(figure_number, theo_data, compstr, constant=None, rng=None, delta=None, patch=False):
+    """
+    Creates the isograph with the given figure number (see ISOGRAPH_PLOTTYPES)
+    If patch is True, the selected material is the same as in the current figure, so only the x and y values of the
+    traces (and the y range for dH and dS) are sent to the browser instead of a complete figure
+    """
     def get_isograph_data(theo_data, _EXP_DATA, compstr, plottype, constant, rng, delt):
         try:
             pars = ID.init_isographs(theo_data, _EXP_DATA, compstr=compstr)[1]
@@ -1730,8 +1942,31 @@ def get_figure(figure_number, theo_data, compstr, constant=None, rng=None, delta
         return data
 
     def format_plot(fig):
-        """make a few aesthetic changes to all the plots"""
-        fig.update_layout(margin={"t": 10}, font=dict(size=16))
+        """make a few aesthetic changes to all the plots, and record the material for patches (see can_patch)"""
+        fig.update_layout(margin={"t": 10}, font=dict(size=16), meta={"compstrs": [compstr]})
+
+    def figure_patch(isodat_input):
+        """
+        partial update of the traces in figure_data. Only the x values of the isobar line of the Ellingham diagram
+        are sent, its y values are computed in the browser at the current pressure
+        """
+        fig_patch = Patch()
+        for i in range(3):
+            fig_patch["data"][i]["x"] = isodat_input[i]["x"]
+            fig_patch["data"][i]["y"] = isodat_input[i]["y"]
+        if figure_number == 5:
+            fig_patch["data"][3]["x"] = isodat_input[3]["x"]
+        if figure_number in (3, 4):
+            fig_patch["layout"]["yaxis"]["range"] = isodat_input[3]
+        return fig_patch
+
+    if patch:
+        isodat = get_isograph_data(
+            theo_data, _EXP_DATA, compstr, ISOGRAPH_PLOTTYPES[figure_number], constant, rng, delta
+        )
+        # the same material without data shows the "no data" message, which cannot be patched
+        if isodat:
+            return figure_patch(isodat)
 
     if figure_number == 0:
         isodat_0 = get_isograph_data(
@@ -1897,85 +2132,106 @@ def get_figure(figure_number, theo_data, compstr, constant=None, rng=None, delta
             return get_no_data_message()
         return fig_5
     
+def get_comparison_figure(figure_number, compstrs, constant=None, rng=None, delta=None, current=None):
+    """
+    Creates the isograph with the given figure number (see ISOGRAPH_PLOTTYPES) for several materials, which are
+    calculated together in one vectorized pass (see compare_isographs)
+    If the current figure shows the same materials (see can_patch), only the x and y values of the traces (and the y
+    range for dH and dS) are sent to the browser instead of a complete figure. Materials without data are skipped,
+    and then a complete figure is sent.
+    """
+    plottype = ISOGRAPH_PLOTTYPES[figure_number]
+    pars_list, plotted = [], []
+    for compstr in compstrs:
+        try:
+            pars_list.append(
+                ID.init_isographs(reformat_isograph_data(compstr), _EXP_DATA, compstr=compstr)[1]
+            )
+            plotted.append(compstr)
+        except (ValueError, PreventUpdate):
+            warnings.warn(f"No isograph data for {compstr}")
+    if not pars_list:
+        return get_no_data_message()
+
+    payload, x_val = Iso(plotted[0], plottype, constant, rng).prepare_limits()
+    traces, y_range = compare_isographs(plottype, pars_list, payload, x_val, delt=delta)
+
+    # the traces of a patch are written by position, so the figure must show the same materials
+    if plotted == list(compstrs) and can_patch(current, compstrs, len(traces)):
+        fig_patch = Patch()
+        for i, trace in enumerate(traces):
+            fig_patch["data"][i]["x"] = trace["x"]
+            if trace["name"] == "isobar line":  # y at the current pressure is computed in the browser
+                continue
+            fig_patch["data"][i]["y"] = trace["y"]
+        if y_range:
+            fig_patch["layout"]["yaxis"]["range"] = y_range
+        return fig_patch
+
+    fig = go.Figure(
+        data=[
+            go.Scatter(
+                x=trace["x"],
+                y=trace["y"],
+                mode="lines",
+                name=trace["name"],
+                line=trace["line"],
+                showlegend=trace["name"] != "isobar line",
+            )
+            for trace in traces
+        ]
+    )
+    xaxis, yaxis = ISOGRAPH_AXES[figure_number]
+    fig.update_xaxes(linecolor="rgb(0,0,0)", gridcolor="rgb(210,210,210)", **xaxis)
+    fig.update_yaxes(linecolor="rgb(0,0,0)", gridcolor="rgb(210,210,210)", range=y_range, **yaxis)
+    fig.update_layout(
+        margin={"t": 10}, font=dict(size=16), legend=dict(orientation="h", y=-0.2), meta={"compstrs": plotted}
+    )
+    return fig
+
 def reformat_isograph_data(compstr):
     """for use in isographs callbacks to get the isographs data into the correct format for 
     use in other methods"""
-    if not isographs_contributions_resp["data"]:
-        logger.error(f"Failed to load contribution for {compstr}")
-        raise PreventUpdate
+    table = isograph_data.table()
     # find the data for the row the user clicked on
-    for entry in isographs_contributions_resp["data"]:
-        if entry["data"]["theoretical"]["composition"] == compstr:
-            requested_data = entry
-    if not requested_data:
+    rows = table[table["Theoretical Composition"] == compstr]
+    if rows.empty:
         logger.error(f"Failed to load contribution for {compstr}")
         raise PreventUpdate
+    requested_data = rows.iloc[-1]
     # get the contribs data back into the original json format that works with 
     # all the functions in 'redox_views.py'
     theo_data = {
         "collection": [
             {
                 "data": {
-                    "tolerance_factor": requested_data["data"][
-                        "theoretical"
-                    ]["tolerance"]["value"],
-                    "solid_solution": requested_data["data"][
-                        "solution"
-                    ],
+                    "tolerance_factor": float(requested_data["Theoretical Tolerance"]),
+                    "solid_solution": requested_data["Solution"],
                     "oxidized_phase": {
                         "crystal-structure": [],
-                        "composition": requested_data["data"][
-                            "phases"
-                        ]["oxidized"]["composition"],
+                        "composition": requested_data["Oxidized Composition"],
                     },
                     "reduced_phase": {
-                        "closest_MP": requested_data["data"][
-                            "phases"
-                        ]["reduced"]["mpid"],
-                        "composition": requested_data["data"][
-                            "phases"
-                        ]["reduced"]["composition"],
+                        "closest_MP": requested_data["Reduced mp-id"],
+                        "composition": requested_data["Reduced Composition"],
                     },
                 },
-                "_id": requested_data["data"]["phases"]["oxidized"][
-                    "mpid"
-                ],
+                "_id": requested_data["Oxidized mp-id"],
                 "pars": {
-                    "theo_compstr": requested_data["data"][
-                        "theoretical"
-                    ]["composition"],
+                    "theo_compstr": requested_data["Theoretical Composition"],
                     "act_mat": [
                         [],
-                        requested_data["data"]["theoretical"][
-                            "active"
-                        ]["value"],
+                        float(requested_data["Active"]),
                     ],
                     "elastic": {
-                        "Elastic tensors available": requested_data[
-                            "data"
-                        ]["theoretical"]["elastic"]["tensors"]
-                        != "False",
-                        "Debye temp brownmillerite": requested_data[
-                            "data"
-                        ]["theoretical"]["elastic"]["debye"]["brownmillerite"][
-                            "value"
-                        ],
-                        "Debye temp perovskite": requested_data[
-                            "data"
-                        ]["theoretical"]["elastic"]["debye"]["perovskite"]["value"],
+                        "Elastic tensors available": requested_data["Elastic Tensors"] != "False",
+                        "Debye temp brownmillerite": float(requested_data["Debye Temp Brownmillerite"]),
+                        "Debye temp perovskite": float(requested_data["Debye Temp Perovskite"]),
                     },
-                    "data_availability": requested_data["data"][
-                        "availability"
-                    ],
-                    "last_updated": requested_data["data"][
-                        "updated"
-                    ],
-                    "dh_min": requested_data["data"]["theoretical"][
-                        "ΔH"
-                    ]["min"]["value"],
-                    "dh_max": requested_data["data"]["theoretical"][
-                        "ΔH"
-                    ]["max"]["value"],
+                    "data_availability": requested_data["Availability"],
+                    "last_updated": requested_data["Last Updated"],
+                    "dh_min": float(requested_data["Theoretical ΔH Min (kJ/mol)"]),
+                    "dh_max": float(requested_data["Theoretical ΔH Max (kJ/mol)"]),
                 },
             }
         ]
@@ -1,32 +1,42 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
-import re
 import pandas as pd
 import numpy as np
-from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor
 from pymatgen.core import Structure
-import pymatgen.core.periodic_table as ptable
-from pymatgen.core.composition import Composition
-from pymatgen.analysis.elasticity import *
+from pymatgen.analysis.elasticity import ElasticTensor
 from pymatgen.analysis.reaction_calculator import ComputedReaction
 from pymatgen.core.units import FloatWithUnit
-from scipy.constants import pi, R
+from scipy.constants import N_A, R, eV, pi
 from scipy.optimize import brentq
 from scipy.integrate import quad
-from mp_web.core.utils import get_rester
-mpr = get_rester()
+from scipy.special import expit
+from mpships.mp_client import get_rester, resilient_client
+from mpships.redox_thermo_csp.debye_cache import debye_cache
+from mpships.redox_thermo_csp.entry_cache import entry_cache
+from mpships.redox_thermo_csp.redox_composition import A_SITE_CHARGES, parse_composition
+from mpships.redox_thermo_csp.unstable_registry import unstable_registry
+
+
+# marks mp-ids without cached Debye temperature
+_NOT_CACHED = object()
+
+
+def get_mpr():
+    """
+    MPRester of mp_web with deadlines and fallback to cached responses (see mpships.mp_client), created on first use
+    instead of at import so that the module can be imported offline
+    """
+    return resilient_client("mp_web", get_rester)
+
 
 def remove_comp_one(compstr):
-    compspl = split_comp(compstr=compstr)
-    compstr_rem = ""
-    for i in range(len(compspl)):
-        if compspl[i]:
-            if float(compspl[i][1]) != 1:
-                compstr_rem = compstr_rem + str(compspl[i][0]) + str(compspl[i][1])
-            else:
-                compstr_rem = compstr_rem + str(compspl[i][0])
-    compstr_rem = compstr_rem + "Ox"
-    return compstr_rem
+    """
+    Removes stoichiometries of 1 from compstr ("Sr1Fe1Ox" -> "SrFeOx")
+    :param compstr:  composition as a string
+    :return:         composition without stoichiometries of 1
+    """
+    return parse_composition(compstr).display
 
 
 def add_comp_one(compstr):
@@ -35,17 +45,7 @@ def add_comp_one(compstr):
     :param compstr:  composition as a string
     :return:         compositon with stoichiometries of 1 added
     """
-    sample = re.sub(r"([A-Z])", r" \1", compstr).split()
-    sample = [''.join(g) for _, g in groupby(str(sample), str.isalpha)]
-    samp_new = ""
-    for k in range(len(sample)):
-        spl_samp = re.sub(r"([A-Z])", r" \1", sample[k]).split()
-        for l in range(len(spl_samp)):
-            if spl_samp[l][-1].isalpha() and spl_samp[l][-1] != "x":
-                spl_samp[l] = spl_samp[l] + "1"
-            samp_new += spl_samp[l]
-
-    return samp_new
+    return parse_composition(compstr).canonical
 
 
 def rootfind(a, b, args, funciso_here):
@@ -351,6 +351,159 @@ def entr_con_mixed(temp, p_o2_l, dh_1, dh_2, act):
     return entr_con_1 + entr_con_2
 
 
+###############################################################################
+# vectorized versions of the model functions above
+# the parameters of several materials are column vectors (shape (n, 1)), which
+# broadcast against the x values of the isographs (shape (1, m) or (n, m))
+###############################################################################
+
+def bisect_vec(fun, lo, hi, xtol=1e-12, maxiter=200):
+    """
+    Vectorized bisection, finds the roots of fun for all elements at once
+    :param fun:     function of an array, returns an array of the same shape
+    :param lo:      lower limits (array)
+    :param hi:      upper limits (array)
+    :return:        roots, nan where fun(lo) and fun(hi) have the same sign
+    """
+    lo, hi = np.broadcast_arrays(np.asarray(lo, dtype=float), np.asarray(hi, dtype=float))
+    lo, hi = lo.copy(), hi.copy()
+    with np.errstate(all="ignore"):
+        f_lo = fun(lo)
+        valid = np.sign(f_lo) != np.sign(fun(hi))
+        for _ in range(maxiter):
+            mid = (lo + hi) / 2
+            if np.all((hi - lo) < xtol):
+                break
+            f_mid = fun(mid)
+            same_sign = np.sign(f_mid) == np.sign(f_lo)
+            lo = np.where(same_sign, mid, lo)
+            f_lo = np.where(same_sign, f_mid, f_lo)
+            hi = np.where(same_sign, hi, mid)
+    return np.where(valid, (lo + hi) / 2, np.nan)
+
+
+def rootfind_vec(fun, shape, a=1e-10, b=0.5 - 1e-10):
+    """vectorized version of rootfind, returns nan if no solution can be found"""
+    solutioniso = bisect_vec(fun, np.full(shape, 0.01), np.full(shape, 0.49))  # works for most cases
+    missing = np.isnan(solutioniso)
+    if np.any(missing):  # starting values a,b for cases where 0.01/0.49 are not sign changing
+        solutioniso = np.where(missing, bisect_vec(fun, np.full(shape, a), np.full(shape, b)), solutioniso)
+    return solutioniso
+
+
+def s_th_o_vec(temp):
+    """vectorized version of s_th_o"""
+    temp = np.asarray(temp, dtype=float)
+    shomdat = np.select(
+        [temp[..., None] < 700, temp[..., None] < 2000],
+        [[31.32234, -20.23531, 57.86644, -36.50624, -0.007374, -8.903471, 246.7945],
+         [30.03235, 8.772972, -3.988133, 0.788313, -0.741599, -11.32468, 236.1663]],
+        [20.91111, 10.72071, -2.020498, 0.146449, 9.245722, 5.337651, 237.6185])
+    temp_frac = temp / 1000.
+    szero = shomdat[..., 0] * np.log(temp_frac)
+    szero += shomdat[..., 1] * temp_frac
+    szero += 0.5 * shomdat[..., 2] * temp_frac**2
+    szero += shomdat[..., 3]/3. * temp_frac**3
+    szero -= shomdat[..., 4] / (2 * temp_frac**2)
+    szero += shomdat[..., 6]
+    return 0.5 * szero
+
+
+def dh_ds_vec(delta, s_th, p):
+    """
+    vectorized version of dh_ds for experimental fit parameters of several materials
+    :param p:   dict of column vectors, see redox_views.stack_pars
+    """
+    d_delta = delta - p['delta_0']
+    dh = enth_arctan(d_delta, p['enth_a'], p['enth_b'], p['enth_c'], p['enth_d']) * 1000.
+    with np.errstate(all="ignore"):
+        ds_solid_solution = entr_mixed(delta - p['ent_c'], p['ent_a'], p['ent_b'], p['ent_c'], p['act'],
+                                       [p['fe_a'], p['fe_b'], p['fe_c'], p['fe_d']])
+        ds_dilute = entr_dilute_spec(delta - p['ent_c'], p['ent_a'], p['ent_b'], p['ent_c'], s_th)
+    return dh, np.where(p['solid_solution'], ds_solid_solution, ds_dilute)
+
+
+def delta_fun_vec(stho, temp, p_o2_l, dh, d_max):
+    """vectorized version of delta_fun, written as a logistic function to avoid overflows"""
+    log_common = stho*d_max/R - p_o2_l*d_max/2. - dh*d_max/(R*temp)
+    return d_max * expit(log_common)
+
+
+def delta_mix_vec(temp, p_o2_l, dh_1, dh_2, act):
+    """vectorized version of delta_mix"""
+    stho = s_th_o_vec(temp)
+    return delta_fun_vec(stho, temp, p_o2_l, dh_1, (act / 2)) + \
+        delta_fun_vec(stho, temp, p_o2_l, dh_2, ((1 - act) / 2))
+
+
+def p_o2_l_calc_vec(delta, dh_1, dh_2, temp, act):
+    """
+    vectorized version of p_o2_calc
+    :return:    natural logarithm of p_O2
+    """
+    shape = np.broadcast_shapes(np.shape(delta), np.shape(dh_1), np.shape(temp))
+    # delta decreases with increasing p_O2
+    return bisect_vec(lambda p_o2_l: delta_mix_vec(temp, p_o2_l, dh_1, dh_2, act) - delta,
+                      np.full(shape, -300.), np.full(shape, 300.))
+
+
+def d_h_num_dev_calc_vec(delta, dh_1, dh_2, temp, act):
+    """vectorized version of d_h_num_dev_calc"""
+    return -((0.5 * p_o2_l_calc_vec(delta, dh_1, dh_2, temp, act)) - (
+        0.5 * p_o2_l_calc_vec(delta, dh_1, dh_2, temp + 0.01, act))) / (
+        (1 / (R * temp)) - (1 / (R * (temp + 0.01))))
+
+
+def entr_con_mixed_vec(temp, p_o2_l, dh_1, dh_2, act):
+    """vectorized version of entr_con_mixed"""
+    a = 2
+    stho = s_th_o_vec(temp)
+
+    # fix reversed orders
+    dh_1, dh_2 = np.minimum(dh_1, dh_2), np.maximum(dh_1, dh_2)
+
+    # avoiding errors due to division by zero
+    delta_max_1 = np.where(act == 0, 1E-10, act * 0.5)
+    delta_max_2 = np.where(act == 1, 0.5 - 1E-10, 0.5 - (act * 0.5))
+
+    delta_1 = delta_fun_vec(stho, temp, p_o2_l, dh_1, (act / 2))
+    delta_2 = delta_fun_vec(stho, temp, p_o2_l, dh_2, ((1 - act) / 2))
+
+    with np.errstate(all="ignore"):
+        entr_con_1 = (1 / delta_max_1) * (a / 2) * R * (np.log(delta_max_1 - delta_1) - np.log(delta_1)) * (
+            delta_1 / (delta_1 + delta_2))
+        entr_con_2 = (1 / delta_max_2) * (a / 2) * R * (np.log(delta_max_2 - delta_2) - np.log(delta_2)) * (
+            delta_2 / (delta_1 + delta_2))
+
+    return np.where(delta_1 > 0., entr_con_1, 0.) + np.where(delta_2 > 0., entr_con_2, 0.)
+
+
+# Gauss-Legendre nodes and weights on [0, 1] for the Debye integral
+_DEBYE_NODES, _DEBYE_WEIGHTS = np.polynomial.legendre.leggauss(40)
+_DEBYE_NODES, _DEBYE_WEIGHTS = (_DEBYE_NODES + 1) / 2, _DEBYE_WEIGHTS / 2
+
+
+def vib_ent_vec(temp, t_d_perov, t_d_brownm):
+    """vectorized version of vib_ent"""
+
+    def s_int(temp, t_d):
+        y = np.asarray(t_d / temp, dtype=float)
+        x = y[..., None] * _DEBYE_NODES
+        integral_y = y * np.sum(_DEBYE_WEIGHTS * x ** 3 / np.expm1(x), axis=-1)
+        d = integral_y * (3 / (y ** 3))
+        return R * (-3 * np.log(1 - np.exp(-y)) + 4 * d)
+
+    return 2 * s_int(temp, t_d_perov) - (2 * s_int(temp, t_d_brownm))
+
+
+def d_s_fundamental_vec(delta, dh_1, dh_2, temp, act, t_d_perov, t_d_brownm):
+    """vectorized version of d_s_fundamental"""
+    p_o_2_l = p_o2_l_calc_vec(delta=delta, dh_1=dh_1, dh_2=dh_2, temp=temp, act=act)
+    entr_con = entr_con_mixed_vec(temp=temp, p_o2_l=p_o_2_l, dh_1=dh_1, dh_2=dh_2, act=act)
+    entr_vib = vib_ent_vec(temp=temp, t_d_perov=t_d_perov, t_d_brownm=t_d_brownm)
+    return s_th_o_vec(temp) + entr_con + entr_vib
+
+
 def get_mpids_comps_perov_brownm(compstr):
 
     compstr = compstr.split("O")[0] + "Ox"
@@ -379,29 +532,19 @@ def split_comp(compstr):
     i.e. ("Fe", 0.6)
     """
 
-    am_1, am_2, tm_1, tm_2 = None, None, None, None
-
-    compstr_spl = [''.join(g) for _, g in groupby(str(compstr), str.isalpha)]
+    # lists, the parsed composition is shared
+    return tuple(list(species) if species else None for species in parse_composition(compstr).sites)
 
-    for l in range(len(compstr_spl)):
-        try:
-            if ptable.Element(compstr_spl[l]).is_alkaline or ptable.Element(
-                    compstr_spl[l]).is_alkali or ptable.Element(compstr_spl[l]).is_rare_earth_metal:
-                if am_1 is None:
-                    am_1 = [compstr_spl[l], float(compstr_spl[l + 1])]
-                elif am_2 is None:
-                    am_2 = [compstr_spl[l], float(compstr_spl[l + 1])]
-            if ptable.Element(compstr_spl[l]).is_transition_metal and not (
-                ptable.Element(compstr_spl[l]).is_rare_earth_metal):
-                if tm_1 is None:
-                    tm_1 = [compstr_spl[l], float(compstr_spl[l + 1])]
-                elif tm_2 is None:
-                    tm_2 = [compstr_spl[l], float(compstr_spl[l + 1])]
-        # stoichiometries raise ValueErrors in pymatgen .is_alkaline etc., ignore these errors and skip that entry
-        except ValueError:
-            pass
 
-    return am_1, am_2, tm_1, tm_2
+def most_stable_entry(chem_sys, formula):
+    """
+    Lowest energy entry with the reduced formula of formula in the chemical system (see entry_cache), IndexError if
+    there is none
+    """
+    try:
+        return entry_cache.get_most_stable(chem_sys)[entry_cache.reduced_formula(formula)]
+    except KeyError:
+        raise IndexError(f"No entry of {formula} in {'-'.join(chem_sys)}") from None
 
 
 def find_structures(compstr):
@@ -418,67 +561,106 @@ def find_structures(compstr):
 
     perovskite_data = None
     brownmillerite_data = None
-    comp_spl = split_comp(compstr=compstr)
-    chem_sys = ""
-    for i in range(len(comp_spl)):
-        if comp_spl[i] is not None:
-            chem_sys = chem_sys + comp_spl[i][0] + "-"
-    chem_sys = chem_sys + "O"
-    chem_sys = chem_sys.split("-")
-
-    all_entries = mpr.get_entries_in_chemsys(chem_sys)
-
-    # This method simply gets the lowest energy entry for all entries with the same composition.
-    def get_most_stable_entry(formula):
-        relevant_entries = [entry for entry in all_entries if
-            entry.composition.reduced_formula == Composition(formula).reduced_formula]
-        relevant_entries = sorted(relevant_entries, key=lambda e: e.energy_per_atom)
-        return relevant_entries[0]
-
-    formula_spl = [''.join(g) for _, g in groupby(str(compstr), str.isalpha)]
-    perov_formula = []
-    for k in range(len(formula_spl)):
-        try:
-            perov_formula += str(int(float(formula_spl[k]) * 8))
-        except ValueError:
-            perov_formula += str(formula_spl[k])
-    perovskite = "".join(perov_formula)
-    perovskite = str(perovskite).split("O")[0] + "O24"
+    parsed = parse_composition(compstr)
+    chem_sys = list(parsed.chemical_system)
+
+    perovskite = parsed.perovskite
     try:
-        perovskite_data = get_most_stable_entry(perovskite)
+        perovskite_data = most_stable_entry(chem_sys, perovskite)
     except IndexError:
         pass
 
-    brownm_formula = []
-    for k in range(len(formula_spl)):
-        try:
-            brownm_formula += str(int(float(formula_spl[k]) * 32))
-        except ValueError:
-            brownm_formula += str(formula_spl[k])
-    brownm_formula = "".join(brownm_formula)
-    brownmillerite = str(brownm_formula).split("O")[0] + "O80"
+    brownmillerite = parsed.brownmillerite
     try:
-        brownmillerite_data = get_most_stable_entry(brownmillerite)
+        brownmillerite_data = most_stable_entry(chem_sys, brownmillerite)
     except IndexError:
         pass
 
     return perovskite, perovskite_data, brownmillerite, brownmillerite_data
 
 
-def get_debye_temp(mpid):
+def debye_temp_from_data(cif, elastic_tensor):
     """
-    Calculates the debye temperature from eleastic tensors on the Materials Project
+    Calculates the debye temperature from the structure as CIF and the elastic tensor in Voigt notation
     Credits: Joseph Montoya
     """
-    np.seterr(over="ignore") # ignore overflow in double scalars
-    data = mpr.get_data(mpid)[0]
-    struct = Structure.from_str(data['cif'], fmt='cif')
-    c_ij = ElasticTensor.from_voigt(data['elasticity']['elastic_tensor'])
-    td = c_ij.debye_temperature(struct)
+    struct = Structure.from_str(cif, fmt='cif')
+    c_ij = ElasticTensor.from_voigt(elastic_tensor)
+    with np.errstate(over="ignore"):  # ignore overflow in double scalars
+        td = c_ij.debye_temperature(struct)
+
+    return float(td)
+
+
+def get_debye_temp(mpid):
+    """
+    Calculates the debye temperature from eleastic tensors on the Materials Project, cached by mp-id (see
+    debye_cache)
+    """
+    td = debye_cache.get(mpid, default=_NOT_CACHED)
+    if td is None:
+        raise ValueError(f"No elastic data for {mpid} on the Materials Project")
+    if td is _NOT_CACHED:
+        data = get_mpr().get_data(mpid)[0]
+        td = debye_temp_from_data(data['cif'], data['elasticity']['elastic_tensor'])
+        debye_cache.update({mpid: td})
 
     return td
 
 
+def _debye_temp_or_none(cif, elastic_tensor):
+    try:
+        return debye_temp_from_data(cif, elastic_tensor)
+    except Exception:
+        return None
+
+
+def get_debye_temps(mpids, max_workers=None, batch_size=200, executor=None):
+    """
+    Debye temperatures of many materials, see get_debye_temp
+    The structures and elastic tensors of all materials that are not cached are queried in batches of batch_size
+    mp-ids instead of one query per material, and the Debye temperatures are computed in parallel on a process pool
+    (or the given executor). Materials returned without elastic data (or whose Debye temperature cannot be computed)
+    are cached as None. mp-ids missing from the response (e.g. deprecated or a truncated response) are None in the
+    result, but not cached, so they are queried again next time.
+    :return:    {mpid: Debye temperature in K or None}
+    """
+    temps = {}
+    missing = []
+    for mpid in dict.fromkeys(mpids):
+        td = debye_cache.get(mpid, default=_NOT_CACHED)
+        if td is _NOT_CACHED:
+            missing.append(mpid)
+        else:
+            temps[mpid] = td
+
+    data = {}
+    computed = {}  # cached, with None for the materials without elastic data
+    mpr = get_mpr().with_deadline(60.0)
+    for i in range(0, len(missing), batch_size):
+        docs = mpr.query(
+            criteria={"task_id": {"$in": missing[i:i + batch_size]}},
+            properties=["task_id", "cif", "elasticity.elastic_tensor"],
+        )
+        for doc in docs:
+            tensor = doc.get("elasticity.elastic_tensor") or (doc.get("elasticity") or {}).get("elastic_tensor")
+            if doc.get("cif") and tensor:
+                data[doc["task_id"]] = (doc["cif"], tensor)
+            else:
+                computed[doc["task_id"]] = None
+
+    if len(data) > 1 and executor is None:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            computed.update(zip(data, pool.map(_debye_temp_or_none, *zip(*data.values()))))
+    elif data:
+        map_fun = executor.map if executor is not None else map
+        computed.update(zip(data, map_fun(_debye_temp_or_none, *zip(*data.values()))))
+    debye_cache.update(computed)
+    temps.update({mpid: computed.get(mpid) for mpid in missing})
+
+    return temps
+
+
 def vib_ent(temp, t_d_perov, t_d_brownm):
     """
     Vibrational entropy based on the Debye model
@@ -528,17 +710,7 @@ def find_endmembers(compstr):
     a_conc:                     concentration of the A species A_1
     b_conc:                     concentration of the A species A_2
     """
-    am_1 = split_comp(compstr)[0]
-    if split_comp(compstr)[1]:
-        am_2 = split_comp(compstr)[1]
-    else:
-        am_2 = None
-
-    tm_1 = split_comp(compstr)[2]
-    if split_comp(compstr)[3]:
-        tm_2 = split_comp(compstr)[3]
-    else:
-        tm_2 = None
+    am_1, am_2, tm_1, tm_2 = parse_composition(compstr).sites
 
     endmember_1a = am_1[0] + "1" + tm_1[0] + "1" + "O"
     if am_2:
@@ -610,6 +782,9 @@ def redenth_act(compstr):
     dh_min = None
     dh_max = None
 
+    # query the entries of the whole chemical system once, the endmembers are subsystems of it (see entry_cache)
+    entry_cache.get_entries(parse_composition(compstr).chemical_system)
+
     # calculate redox enthalpies of endmembers
     try:
         dhs = calc_dh_endm(compstr)
@@ -655,6 +830,17 @@ def redenth_act(compstr):
     return theo_solid_solution, dh_min, dh_max, conc_act
 
 
+# more reducible B site species last, by the charge on the B sites
+REDUCIBILITY_ORDERS = {
+    # experimentally well-established order of A2+B4+O3 perovskite reducibility: Ti - Mn - Fe - Co - Cu
+    4: ["Ti", "Mn", "Fe", "Co", "Cu"],
+    # order of binary oxide reducibility according to Materials Project (A2O3 -> AO + O2)
+    3: ["Sc", "Ti", "V", "Cr", "Fe", "Mn", "Cu", "Co", "Ni", "Ag"],  # changed Ni<->Ag order according to DFT results
+    # order of binary oxide reducibility according to Materials Project (A2O3 -> AO + O2)
+    5: ["Ta", "Nb", "W", "Mo", "V", "Cr"],
+}
+
+
 def find_active(mat_comp):
     """
     Finds the more redox-active species in a perovskite solid solution
@@ -676,33 +862,11 @@ def find_active(mat_comp):
 
     for i in range(2):
         if mat_comp[i]:
-            if ptable.Element(mat_comp[i][0]).is_alkali:
-                charge_sum += mat_comp[i][1]
-            elif ptable.Element(mat_comp[i][0]).is_alkaline:
-                charge_sum += 2 * mat_comp[i][1]
-            elif (ptable.Element(mat_comp[i][0]).is_lanthanoid or (
-                    mat_comp[i][0] == "Bi")) and mat_comp[i][0] != "Ce":
-                charge_sum += 3 * mat_comp[i][1]
-            elif mat_comp[i][0] == "Ce":
-                charge_sum += 4 * mat_comp[i][1]
-            else:
+            if mat_comp[i][0] not in A_SITE_CHARGES:
                 raise ValueError("Charge of A site species unknown.")
+            charge_sum += A_SITE_CHARGES[mat_comp[i][0]] * mat_comp[i][1]
 
-    red_order = None
-    # charge on B sites 4+
-    # experimentally well-established order of A2+B4+O3 perovskite reducibility: Ti - Mn - Fe - Co - Cu
-    if round((6 - charge_sum), 2) == 4:
-        red_order = ["Ti", "Mn", "Fe", "Co", "Cu"]
-
-    # charge on B sites 3+
-    # order of binary oxide reducibility according to Materials Project (A2O3 -> AO + O2)
-    if round((6 - charge_sum), 2) == 3:
-        red_order = ["Sc", "Ti", "V", "Cr", "Fe", "Mn", "Cu", "Co", "Ni", "Ag"] # changed Ni<->Ag order according to DFT results
-
-    # charge on B sites 5+
-    # order of binary oxide reducibility according to Materials Project (A2O3 -> AO + O2)
-    if round((6 - charge_sum), 2) == 5:
-        red_order = ["Ta", "Nb", "W", "Mo", "V", "Cr"]
+    red_order = REDUCIBILITY_ORDERS.get(round((6 - charge_sum), 2))
 
     act_a = None
     if red_order:
@@ -724,6 +888,47 @@ def find_active(mat_comp):
     return act_a[0], act_a[1]
 
 
+def find_active_column(compstrs):
+    """
+    find_active for a whole column of compositions at once, for batch screening
+    :param compstrs:    compositions as a list or a pandas Series, e.g. ["Sr1Fe1Ox", "Ca0.5Sr0.5Mn0.5Fe0.5Ox"]
+    :return:            DataFrame with the index of compstrs and the columns "Active Species" (more redox-active
+                        species) and "Active" (its stoichiometry), missing where find_active raises a ValueError
+    """
+    compstrs = pd.Series(compstrs, dtype=object)
+    parsed = [parse_composition(compstr).sites for compstr in compstrs]
+    species = [np.array([s[i][0] if s[i] else None for s in parsed], dtype=object) for i in range(4)]
+    stoich = [np.array([s[i][1] if s[i] else 0.0 for s in parsed], dtype=float) for i in range(4)]
+
+    # NaN for unknown A site species, 0 for empty sites
+    charge_sum = 0
+    for i in range(2):
+        charges = np.array([A_SITE_CHARGES.get(spec, np.nan) if spec else 0 for spec in species[i]], dtype=float)
+        charge_sum = charge_sum + charges * stoich[i]
+    b_charge = np.round(6 - charge_sum, 2)
+
+    act_spec = np.full(len(compstrs), None, dtype=object)
+    act = np.full(len(compstrs), np.nan)
+    for charge, red_order in REDUCIBILITY_ORDERS.items():
+        rank = {spec: i for i, spec in enumerate(red_order)}
+        rank_1 = np.array([rank.get(spec, np.nan) for spec in species[2]], dtype=float)
+        rank_2 = np.array([rank.get(spec, np.nan) for spec in species[3]], dtype=float)
+        rows = (b_charge == charge) & ~np.isnan(rank_1)
+        # the second B species if it is more reducible, but not the most reducible one
+        second = rows & (rank_2 > rank_1) & (rank_2 < len(red_order) - 1)
+        first = rows & ~second
+        act_spec[first], act[first] = species[2][first], stoich[2][first]
+        act_spec[second], act[second] = species[3][second], stoich[3][second]
+
+        # correct bug for the most reducible species
+        most_reducible = np.any([spec == red_order[-1] for spec in species], axis=0)
+        corrected = rows & (act_spec == red_order[-2]) & most_reducible
+        act_spec[corrected] = red_order[-1]
+        act[corrected] = 1 - act[corrected]
+
+    return pd.DataFrame({"Active Species": act_spec, "Active": act}, index=compstrs.index)
+
+
 def find_theo_redenth(compstr):
     """
     Finds theoretical redox enthalpies from the Materials Project from perovskite to brownmillerite
@@ -735,54 +940,16 @@ def find_theo_redenth(compstr):
     :return:
     red_enth:  redox enthalpy in kJ/mol O
     """
-    compstr_perovskite = compstr.split("O")[0] + "O3"
-
-    comp_spl = split_comp(compstr)
-    chem_sys = ""
-    for i in range(len(comp_spl)):
-        if comp_spl[i] is not None:
-            chem_sys = chem_sys + comp_spl[i][0] + "-"
-    chem_sys = chem_sys + "O"
-    chem_sys = chem_sys.split("-")
-
-    all_entries = mpr.get_entries_in_chemsys(chem_sys)
+    parsed = parse_composition(compstr)
+    chem_sys = list(parsed.chemical_system)
 
-    # This method simply gets the lowest energy entry for all entries with the same composition.
-    def get_most_stable_entry(formula):
-        relevant_entries = [entry for entry in all_entries if
-        entry.composition.reduced_formula == Composition(formula).reduced_formula]
-        relevant_entries = sorted(relevant_entries, key=lambda e: e.energy_per_atom)
-        return relevant_entries[0]
-
-    formula_spl = [''.join(g) for _, g in groupby(str(compstr), str.isalpha)]
-    perov_formula = []
-    for k in range(len(formula_spl)):
-        try:
-            perov_formula += str(int(float(formula_spl[k]) * 8))
-        except ValueError:
-            perov_formula += str(formula_spl[k])
-    perov_formula = "".join(perov_formula)
-    perov_formula = str(perov_formula).split("O")[0] + "O24"
-    perovskite = get_most_stable_entry(perov_formula)
-
-    brownm_formula = []
-    for k in range(len(formula_spl)):
-        try:
-            brownm_formula += str(int(float(formula_spl[k]) * 32))
-        except ValueError:
-            brownm_formula += str(formula_spl[k])
-    brownm_formula = "".join(brownm_formula)
-    brownm_formula = str(brownm_formula).split("O")[0] + "O80"
-    brownmillerite = get_most_stable_entry(brownm_formula)
+    perovskite = most_stable_entry(chem_sys, parsed.perovskite)
+    brownmillerite = most_stable_entry(chem_sys, parsed.brownmillerite)
 
     # for oxygen: do not use the most stable phase O8 but the most stable O2 phase
-    def get_oxygen():
-        relevant_entries = [entry for entry in all_entries if
-        entry.composition == Composition("O2")]
-        relevant_entries = sorted(relevant_entries, key=lambda e: e.energy_per_atom)
-        return relevant_entries[0]
-
-    oxygen = get_oxygen()
+    oxygen = entry_cache.get_oxygen(chem_sys)
+    if oxygen is None:
+        raise IndexError(f"No O2 entry in {'-'.join(chem_sys)}")
 
     reaction = ComputedReaction([perovskite], [brownmillerite, oxygen])
     energy = FloatWithUnit(reaction.calculated_reaction_energy, "eV atom^-1")
@@ -800,55 +967,60 @@ def find_theo_redenth(compstr):
     return ener
 
 
+# ABO3 -> 1/2 A2B2O5 + 1/4 O2: atoms per formula unit of ABO3 of each phase, times its coefficient
+REDOX_ATOMS = {"perovskite": -5, "brownmillerite": 0.5 * 9, "O2": 0.25 * 2}
+# mol of O released per formula unit of ABO3
+REDOX_OXYGEN = 0.5
+# eV per formula unit -> J/mol
+EV_TO_J_MOL = eV * N_A
+
+
+def lowest_energies(compstrs):
+    """
+    Lowest energies per atom of the perovskite, brownmillerite and O2 of each composition, from the same entries as
+    find_theo_redenth (see entry_cache)
+    :param compstrs:    compositions as a list or a pandas Series, e.g. ["Sr1Fe1Ox", "Ca0.5Sr0.5Mn0.5Fe0.5Ox"]
+    :return:            DataFrame with the index of compstrs and the columns "perovskite", "brownmillerite" and "O2"
+                        in eV/atom, NaN where there is no entry
+    """
+    compstrs = pd.Series(compstrs, dtype=object)
+    energies = {}
+    for compstr in compstrs.unique():
+        parsed = parse_composition(compstr)
+        most_stable = entry_cache.get_most_stable(parsed.chemical_system)
+        oxygen = entry_cache.get_oxygen(parsed.chemical_system)
+        row = [most_stable.get(entry_cache.reduced_formula(formula))
+               for formula in [parsed.perovskite, parsed.brownmillerite]] + [oxygen]
+        energies[compstr] = [entry.energy_per_atom if entry is not None else np.nan for entry in row]
+    return pd.DataFrame(
+        [energies[compstr] for compstr in compstrs], index=compstrs.index, columns=list(REDOX_ATOMS), dtype=float
+    )
+
+
+def find_theo_redenth_column(compstrs, energies=None):
+    """
+    find_theo_redenth for a whole column of compositions at once, for batch screening
+    The redox enthalpy follows from the lowest energies per atom with fixed coefficients, ABO3 -> 1/2 A2B2O5 + 1/4 O2,
+    instead of balancing a reaction for each composition
+    :param compstrs:    compositions as a list or a pandas Series, e.g. ["Sr1Fe1Ox", "Ca0.5Sr0.5Mn0.5Fe0.5Ox"]
+    :param energies:    table of lowest_energies for compstrs, queried if None
+    :return:            redox enthalpies in J/mol O as a pandas Series with the index of compstrs, NaN where an entry
+                        is missing
+    """
+    if energies is None:
+        energies = lowest_energies(compstrs)
+    coefficients = np.array(list(REDOX_ATOMS.values()))
+    red_enth = energies[list(REDOX_ATOMS)].to_numpy(dtype=float) @ coefficients / REDOX_OXYGEN * EV_TO_J_MOL
+    return pd.Series(red_enth, index=energies.index)
+
+
 def unstable_phases(compstr):
     """
-    hard-coded list of unstable phases
+    True if compstr is one of the unstable phases in unstable_phases.json (see unstable_registry)
     phases are considered unstable for reasons listed in the documentation
     these phases shall not appear in the energy analysis
     """
-    unstable_list = ["Na0.5K0.5Mo1O",
-                    "Mg1Co1O",
-                    "Sm1Ag1O",
-                    "Na0.625K0.375Mo0.75V0.25O",
-                    "Na0.875K0.125Mo0.125V0.875O",
-                    "Rb1Mo1O",
-                    "Na0.875K0.125V1O",
-                    "Na0.75K0.25Mo0.375V0.625O",
-                    "Eu1Ag1O",
-                    "Na0.875K0.125V0.875Cr0.125O",
-                    "Na0.5K0.5W0.25Mo0.75O",
-                    "Na0.5K0.5Mo0.875V0.125O",
-                    "Na1Mo1O",
-                    "Mg1Ti1O",
-                    "Na0.5K0.5W0.5Mo0.5O",
-                    "Na1V1O",
-                    "K1V1O",
-                    "Sm1Cu1O",
-                    "Na0.75K0.25Mo0.5V0.5O",
-                    "Sm1Ti1O",
-                    "Na0.5K0.5W0.125Mo0.875O",
-                    "Eu1Ti1O",
-                    "Na0.625K0.375Mo0.625V0.375O",
-                    "Rb1V1O",
-                    "Mg1Mn1O",
-                    "Na0.5K0.5W0.875Mo0.125O",
-                    "Na0.875K0.125V0.75Cr0.25O",
-                    "K1Mo1O",
-                    "Na0.5K0.5W0.375Mo0.625O",
-                    "Na0.875K0.125Mo0.25V0.75O",
-                    "Na0.5K0.5W0.625Mo0.375O",
-                    "Mg1Fe1O",
-                    "Na0.5K0.5W0.75Mo0.25O",
-                    "Mg1Cu1O",
-                    "Eu1Cu1O",
-                    "Na0.625K0.375Mo0.875V0.125O"]
-
-    if compstr.split("O")[0] in str(unstable_list):
-        unstable = True
-    else:
-        unstable = False
-
-    return unstable
+    return unstable_registry.contains(compstr)
 
 
 def mechanical_envelope(p_red):
@@ -1121,7 +1293,15 @@ def energy_on_the_fly(process, resdict, pump_ener, w_feed, h_rec, h_rec_steam, c
         result_val_delta_redox = np.empty(2)
         result_val_mass_change = np.empty(2)
 
-        for rd in resdict[0]['energy_analysis']:
+        rows = resdict[0]['energy_analysis']
+        # remove data of unstable compounds, as flagged in the data or in unstable_phases.json
+        if rem_unstable:
+            invalid = np.array([bool(rd['unstable']) for rd in rows], dtype=bool)
+            invalid |= unstable_registry.flag([rd['compstr'] for rd in rows])
+        else:
+            invalid = np.zeros(len(rows), dtype=bool)
+
+        for rd, invalid_val in zip(rows, invalid.tolist()):
             chemical_energy = rd['Chemical Energy'] * 1000
             energy_sensible = rd['Sensible Energy']
             t_ox = rd['T_ox']
@@ -1139,7 +1319,6 @@ def energy_on_the_fly(process, resdict, pump_ener, w_feed, h_rec, h_rec_steam, c
             compstr = rd['compstr']
             prodstr = rd['prodstr']
             prodstr_alt = rd['prodstr_alt']
-            unstable = rd['unstable']
 
             # chemical energy stored in products
             if process == "Water Splitting":
@@ -1213,10 +1392,6 @@ def energy_on_the_fly(process, resdict, pump_ener, w_feed, h_rec, h_rec_steam, c
             mass_change_i = float(mass_redox_i)
             compdisp = remove_comp_one(compstr=compstr)
 
-            invalid_val = False  # remove data of unstable compounds
-            if rem_unstable and unstable:
-                invalid_val = True
-
             # append new values to result and add compositions
             if (ener_i[0] < 0) or invalid_val: # sort out negative values, heat input is always positive
                 ener_i[0] = float('inf')
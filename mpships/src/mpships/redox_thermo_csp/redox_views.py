@@ -17,7 +17,13 @@ from mpships.redox_thermo_csp.redox_utils import (
     isobar_line_elling,
     funciso_redox_theo, 
     d_h_num_dev_calc, 
-    d_s_fundamental)
+    d_s_fundamental,
+    rootfind_vec,
+    s_th_o_vec,
+    dh_ds_vec,
+    d_h_num_dev_calc_vec,
+    d_s_fundamental_vec)
+from scipy.constants import R
 
 
 class InitData:
@@ -47,8 +53,7 @@ class InitData:
             for entry in theo_data:  # find matching entries
                 if compstr:
                     # reformat user input so the compstr always contains compositions of 1 ("SrFeOx" -> "Sr1Fe1Ox")
-                    compstr_1 = add_comp_one(compstr).replace("[", "").replace("]", "").replace(",", "").replace("'",
-                                                                                                                 "")
+                    compstr_1 = add_comp_one(compstr)
                     if (entry["pars"]["theo_compstr"] == compstr) or (entry["pars"]["theo_compstr"] == compstr_1):
                         chosen_entry = entry
                         break
@@ -115,14 +120,63 @@ class InitData:
         return InitData.all_float_dict(data), InitData.all_float_dict(pars)
 
 
+def adaptive_sampling(fun, x_min, x_max, budget=25, n_coarse=9, tol=1e-3, log_y=False):
+    """
+    Samples a curve y = fun(x) between x_min and x_max with at most "budget" function calls
+    Starts with n_coarse equidistant points and then keeps bisecting the segment where the curve bends the most,
+    weighted by the change in y (e.g. delta) over that segment. Steep and curved parts of the curve are therefore
+    resolved, while flat or straight regions keep only a few points. Stops early if no segment bends more than tol.
+    :param fun:         function of x returning y, or None if no solution can be found
+    :param log_y:       measure changes in y on a logarithmic scale (e.g. for pressures)
+    :return:            x and y values as lists sorted by x
+    """
+    x = list(np.linspace(x_min, x_max, num=min(n_coarse, budget)))
+    y = [fun(xv) for xv in x]
+
+    while len(x) < budget:
+        # normalized coordinates, segments with a missing y value are not refined
+        y_arr = np.array([np.nan if yv is None else yv for yv in y], dtype=float)
+        if log_y:
+            y_arr = np.log10(np.where(y_arr > 0, y_arr, np.nan))
+        if np.all(np.isnan(y_arr)):
+            break
+        y_span = (np.nanmax(y_arr) - np.nanmin(y_arr)) or 1
+        x_norm = (np.array(x, dtype=float) - x_min) / ((x_max - x_min) or 1)
+        y_norm = (y_arr - np.nanmin(y_arr)) / y_span
+        d_x, d_y = np.diff(x_norm), np.diff(y_norm)
+        length = np.hypot(d_x, d_y)
+
+        # turning angle at each point between its two neighbouring segments
+        angle = np.zeros(len(x))
+        cos_angle = (d_x[:-1] * d_x[1:] + d_y[:-1] * d_y[1:]) / np.maximum(length[:-1] * length[1:], 1e-12)
+        angle[1:-1] = np.nan_to_num(np.arccos(np.clip(cos_angle, -1, 1)))
+
+        priority = np.nan_to_num(length * (angle[:-1] + angle[1:]) / np.pi)
+        priority[d_x < 1e-3] = 0  # do not refine below 0.1 % of the x range
+        i = int(np.argmax(priority))
+        if priority[i] < tol:
+            break
+        x_mid = (x[i] + x[i + 1]) / 2
+        x.insert(i + 1, x_mid)
+        y.insert(i + 1, fun(x_mid))
+
+    return x, y
+
+
 class Isographs:
-    def __init__(self, compstr, plottype, iso, rng, a=1e-10, b=0.5 - 1e-10):
+    def __init__(self, compstr, plottype, iso, rng, a=1e-10, b=0.5 - 1e-10, n_points=100, theo_budget=25):
+        """
+        :param n_points:        number of x values for the experimental data
+        :param theo_budget:     maximum number of x values (solver calls) for the theoretical data, see adaptive_sampling
+        """
         self.compstr = compstr
         self.plottype = plottype
         self.iso = iso
         self.rng = rng
         self.a = a
         self.b = b
+        self.n_points = n_points
+        self.theo_budget = theo_budget
 
     def prepare_limits(self):
         """Prepares x values and limits for the plots"""
@@ -132,17 +186,17 @@ class Isographs:
         payload['rng'] = self.rng
 
         if self.plottype == "isotherm":  # pressure on the x-axis
-            x_val = np.log(np.logspace(payload['rng'][0], payload['rng'][1], num=100))
+            x_val = np.log(np.logspace(payload['rng'][0], payload['rng'][1], num=self.n_points))
         elif self.plottype == "dH" or self.plottype == "dS":  # dH or dS, delta on the x-axis
-            x_val = np.linspace(0.01, 0.49, num=100)
+            x_val = np.linspace(0.01, 0.49, num=self.n_points)
         else:  # temperature on the x-axis
-            x_val = np.linspace(payload['rng'][0], payload['rng'][1], num=100)
+            x_val = np.linspace(payload['rng'][0], payload['rng'][1], num=self.n_points)
 
         return payload, x_val
 
     def isographs(self, pars, payload, x_val):
         a, b = self.a, self.b  # limiting values for non-stoichiometry delta in brentq
-        resiso, resiso_theo = [], []
+        resiso = []
         if pars['experimental_data_available']:  # only execute this if experimental data is available
             for xv in x_val:  # calculate experimental data
                 try:
@@ -178,30 +232,32 @@ class Isographs:
         else:
             res_fit, res_interp = None, None  # don't plot any experimental data if it is not available
 
-        try:  # calculate theoretical data
-            for xv in x_val[::4]:  # use less data points for theoretical graphs to improve speed
-                if self.plottype == "isotherm":
-                    args_theo = (xv, payload['iso'], pars, pars['td_perov'], pars['td_brownm'], \
-                                 pars["dh_min"]*1000, pars["dh_max"]*1000, pars["act_mat"])
-                else:
-                    args_theo = (payload['iso'], xv, pars, pars['td_perov'], pars['td_brownm'], \
-                                 pars["dh_min"]*1000, pars["dh_max"]*1000, pars["act_mat"])
+        def theo_point(xv):  # calculate theoretical data
+            if self.plottype == "isotherm":
+                args_theo = (xv, payload['iso'], pars, pars['td_perov'], pars['td_brownm'], \
+                             pars["dh_min"]*1000, pars["dh_max"]*1000, pars["act_mat"])
+            else:
+                args_theo = (payload['iso'], xv, pars, pars['td_perov'], pars['td_brownm'], \
+                             pars["dh_min"]*1000, pars["dh_max"]*1000, pars["act_mat"])
+            try:
                 if self.plottype == "isoredox":
                     try:
                         solutioniso_theo = brentq(funciso_redox_theo, -300, 300, args=args_theo)
                     except ValueError:
                         solutioniso_theo = brentq(funciso_redox_theo, -100, 100, args=args_theo)
-                    resiso_theo.append(np.exp(solutioniso_theo))
-                else:
-                    solutioniso_theo = rootfind(a, b, args_theo, funciso_theo)
-                    resiso_theo.append(solutioniso_theo)
-        except ValueError:  # if brentq function finds no zero point due to plot out of range
-            resiso_theo.append(None)
+                    return np.exp(solutioniso_theo)
+                return rootfind(a, b, args_theo, funciso_theo)
+            except ValueError:  # if brentq function finds no zero point due to plot out of range
+                return None
+
+        # use less data points for theoretical graphs to improve speed, placed where the curve changes
+        x_theo, resiso_theo = adaptive_sampling(theo_point, x_val[0], x_val[-1], budget=self.theo_budget,
+                                                log_y=(self.plottype == "isoredox"))
         if self.plottype == "isotherm":
             x = list(np.exp(x_val))
+            x_theo = list(np.exp(x_theo))
         else:
             x = list(x_val)
-        x_theo = x[::4]
         x_exp = None
         if pars['experimental_data_available']:
             x_exp = x
@@ -214,7 +270,7 @@ class Isographs:
         return response
 
     def enthalpy_entropy(self, pars, payload, x_val):
-        resiso, resiso_theo = [], []
+        resiso = []
         if pars['experimental_data_available']:  # only execute this if experimental data is available
             for xv in x_val:  # calculate experimental data
                 try:
@@ -242,38 +298,37 @@ class Isographs:
         else:
             res_fit, res_interp = None, None  # don't plot any experimental data if it is not available
 
-        try:  # calculate theoretical data
-            for xv in x_val[::4]:  # use less data points for theoretical graphs to improve speed
-                args_theo = (payload['iso'], xv, pars, pars['td_perov'], pars['td_brownm'], \
-                             pars["dh_min"]*1000, pars["dh_max"]*1000, pars["act_mat"])
+        def theo_point(xv):  # calculate theoretical data
+            try:
                 if self.plottype == "dH":
-                    solutioniso_theo = d_h_num_dev_calc(delta=xv, dh_1=pars["dh_min"]*1000, dh_2=pars["dh_max"]*1000,
-                                                        temp=payload['iso'], act=pars["act_mat"]) / 1000
-                else:
-                    solutioniso_theo = d_s_fundamental(delta=xv, dh_1=pars["dh_min"]*1000, dh_2=pars["dh_max"]*1000,
-                                                       temp=payload['iso'],
-                                                       act=pars["act_mat"], t_d_perov=pars['td_perov'],
-                                                       t_d_brownm=pars['td_brownm'])
-                resiso_theo.append(solutioniso_theo)
-        except ValueError:  # if brentq function finds no zero point due to plot out of range
-            resiso_theo.append(None)
+                    return d_h_num_dev_calc(delta=xv, dh_1=pars["dh_min"]*1000, dh_2=pars["dh_max"]*1000,
+                                            temp=payload['iso'], act=pars["act_mat"]) / 1000
+                return d_s_fundamental(delta=xv, dh_1=pars["dh_min"]*1000, dh_2=pars["dh_max"]*1000,
+                                       temp=payload['iso'],
+                                       act=pars["act_mat"], t_d_perov=pars['td_perov'],
+                                       t_d_brownm=pars['td_brownm'])
+            except ValueError:  # if brentq function finds no zero point due to plot out of range
+                return None
+
+        # use less data points for theoretical graphs to improve speed, placed where the curve changes
+        x_theo, resiso_theo = adaptive_sampling(theo_point, x_val[0], x_val[-1], budget=self.theo_budget)
 
         x = list(x_val)
-        x_theo = x[::4]
         x_exp = None
         if pars['experimental_data_available']:
             x_exp = x
 
         # limiting values for the plot,
-        y_max = max(np.append(resiso, resiso_theo)) * 1.2
+        y_all = [y for y in list(resiso) + list(resiso_theo) if y is not None]
+        y_max = max(y_all) * 1.2
         if self.plottype == "dH":
-            if max(np.append(resiso, resiso_theo)) > (pars["dh_max"]*1000 * 0.0015):
+            if max(y_all) > (pars["dh_max"]*1000 * 0.0015):
                 y_max = pars["dh_max"]*1000 * 0.0015
         else:
-            if max(np.append(resiso, resiso_theo)) > 250:
+            if max(y_all) > 250:
                 y_max = 250
-        if self.plottype == "dH" and min(np.append(resiso, resiso_theo)) > -10:
-            y_min = min(np.append(resiso, resiso_theo)) * 0.8
+        if self.plottype == "dH" and min(y_all) > -10:
+            y_min = min(y_all) * 0.8
         else:
             y_min = -10
         response = [{'x': x_exp, 'y': res_fit, 'name': "exp_fit", 'line': {'color': 'rgb(5,103,166)', 'width': 2.5}},
@@ -286,7 +341,7 @@ class Isographs:
 
     def ellingham(self, pars, payload, x_val, delt):
         iso = np.log(10 ** payload['iso'])
-        resiso, resiso_theo, ellingiso = [], [], []
+        resiso, ellingiso = [], []
         if pars['experimental_data_available']:  # only execute this if experimental data is available
             for xv in x_val:  # calculate experimental data
                 try:
@@ -294,8 +349,6 @@ class Isographs:
                     args = (iso, xv, pars, s_th)
                     solutioniso = (dh_ds(delt, args[-1], args[-2])[0] - dh_ds(delt, args[-1], args[-2])[1] * xv) / 1000
                     resiso.append(solutioniso)
-                    ellingiso_i = isobar_line_elling(args[0], xv) / 1000
-                    ellingiso.append(ellingiso_i)
                 except ValueError:  # if brentq function finds no zero point due to plot out of range
                     resiso.append(None)
 
@@ -313,26 +366,29 @@ class Isographs:
         else:
             res_fit, res_interp = None, None  # don't plot any experimental data if it is not available
 
-        try:  # calculate theoretical data
-            for xv in x_val[::4]:  # use less data points for theoretical graphs to improve speed
+        def theo_point(xv):  # calculate theoretical data
+            try:
                 dh = d_h_num_dev_calc(delta=delt, dh_1=pars["dh_min"]*1000, dh_2=pars["dh_max"]*1000, temp=xv,
                                       act=pars["act_mat"])
                 ds = d_s_fundamental(delta=delt, dh_1=pars["dh_min"]*1000, dh_2=pars["dh_max"]*1000, temp=xv,
                                      act=pars["act_mat"], t_d_perov=pars['td_perov'], t_d_brownm=pars['td_brownm'])
-                solutioniso_theo = (dh - ds * xv) / 1000
-                resiso_theo.append(solutioniso_theo)
-        except ValueError:  # if brentq function finds no zero point due to plot out of range
-            resiso_theo.append(None)
+                return (dh - ds * xv) / 1000
+            except ValueError:  # if brentq function finds no zero point due to plot out of range
+                return None
+
+        # use less data points for theoretical graphs to improve speed, placed where the curve changes
+        x_theo, resiso_theo = adaptive_sampling(theo_point, x_val[0], x_val[-1], budget=self.theo_budget)
 
         x = list(x_val)
-        x_theo = x[::4]
         if pars['experimental_data_available']:
             x_exp = x
         else:
             x_exp = None
-            for xv in x_theo:
-                ellingiso_i = isobar_line_elling(iso, xv) / 1000
-                ellingiso.append(ellingiso_i)
+        # the isobar line does not depend on the material, it is only evaluated on the x values of its own trace
+        # so that it can be redrawn in the browser for other pressures (see RedoxThermoCSPAIO)
+        for xv in x_theo:
+            ellingiso_i = isobar_line_elling(iso, xv) / 1000
+            ellingiso.append(ellingiso_i)
         response = [{'x': x_exp, 'y': res_fit, 'name': 'exp_fit', 'line': {'color': 'rgb(5,103,166)', 'width': 2.5}},
                     {'x': x_exp, 'y': res_interp, 'name': 'exp_interp', \
                      'line': {'color': 'rgb(5,103,166)', 'width': 2.5, 'dash': 'dot'}},
@@ -343,6 +399,138 @@ class Isographs:
         return response
 
 
+def stack_pars(pars_list):
+    """
+    Stacks the parameters of several materials (as returned by InitData.init_isographs) into column vectors for the
+    vectorized model functions in redox_utils, missing experimental fit parameters are nan
+    """
+    def column(get):
+        values = []
+        for pars in pars_list:
+            try:
+                values.append(float(get(pars)))
+            except (KeyError, TypeError, ValueError):
+                values.append(np.nan)
+        return np.array(values)[:, None]
+
+    stacked = {
+        'dh_min': column(lambda p: p["dh_min"] * 1000),
+        'dh_max': column(lambda p: p["dh_max"] * 1000),
+        'act': column(lambda p: p["act_mat"][-1] if type(p["act_mat"]) == list else p["act_mat"]),
+        'td_perov': column(lambda p: p['td_perov']),
+        'td_brownm': column(lambda p: p['td_brownm']),
+        'exp': np.array([bool(p['experimental_data_available']) for p in pars_list])[:, None],
+        'solid_solution': np.array([p.get('fit_type_entr') == "Solid_Solution" for p in pars_list])[:, None],
+        'delta_0': column(lambda p: p['delta_0']),
+        'delta_min': column(lambda p: p['delta_min']),
+        'delta_max': column(lambda p: p['delta_max']),
+    }
+    for c in 'abcd':
+        stacked['enth_' + c] = column(lambda p: p['fit_param_enth'][c])
+        stacked['fe_' + c] = column(lambda p: p['fit_param_fe'][c])
+    for c in 'abc':
+        stacked['ent_' + c] = column(lambda p: p['fit_par_ent'][c])
+    return stacked
+
+
+# colors of the materials in the comparison mode
+COMPARISON_COLORS = ['rgb(217,64,41)', 'rgb(5,103,166)', 'rgb(44,160,44)', 'rgb(148,103,189)', 'rgb(255,127,14)',
+                     'rgb(140,86,75)', 'rgb(227,119,194)', 'rgb(23,190,207)', 'rgb(188,189,34)', 'rgb(127,127,127)']
+
+
+def compare_isographs(plottype, pars_list, payload, x_val, delt=None):
+    """
+    Calculates one type of isograph for several materials at once on the same x values
+    The model functions are evaluated for all materials and x values in one vectorized pass, with the parameters of
+    the materials as column vectors (see stack_pars)
+    :param plottype:    "isotherm", "isobar", "isoredox", "dH", "dS" or "ellingham" (see Isographs)
+    :param pars_list:   list of parameters as returned by InitData.init_isographs, one per material
+    :param payload:     payload as returned by Isographs.prepare_limits
+    :param x_val:       x values as returned by Isographs.prepare_limits
+    :param delt:        non-stoichiometry delta, only for the Ellingham diagram
+    :return:
+    traces:             list of traces (x, y, name, line), theoretical and experimental data for each material
+    y_range:            limits of the y axis for dH and dS, otherwise None
+    """
+    p = stack_pars(pars_list)
+    x = np.asarray(x_val, dtype=float)[None, :]
+    shape = (len(pars_list), x.shape[1])
+    iso = payload['iso']
+
+    def theo_dh_ds(delta, temp):
+        dh = d_h_num_dev_calc_vec(delta, p['dh_min'], p['dh_max'], temp, p['act'])
+        ds = d_s_fundamental_vec(delta, p['dh_min'], p['dh_max'], temp, p['act'], p['td_perov'], p['td_brownm'])
+        return dh, ds
+
+    def exp_dh_ds(delta, temp):
+        return dh_ds_vec(delta, s_th_o_vec(temp), p)
+
+    def result(dh_ds_fun):
+        """result of the isograph and the delta values to compare with the experimentally covered range"""
+        if plottype in ("isotherm", "isobar"):
+            p_o2_l, temp = (x, iso) if plottype == "isotherm" else (iso, x)
+
+            def funciso(delta):
+                dh, ds = dh_ds_fun(delta, temp)
+                return dh - temp*ds + R*p_o2_l*temp/2
+            delta = rootfind_vec(funciso, shape)
+            return delta, delta
+        if plottype == "isoredox":
+            dh, ds = dh_ds_fun(np.full(shape, float(iso)), x)
+            p_o2_l = -2 * (dh - x*ds) / (R*x)
+            return np.exp(np.where(np.abs(p_o2_l) <= 300, p_o2_l, np.nan)), np.full(shape, float(iso))
+        if plottype in ("dH", "dS"):
+            dh, ds = dh_ds_fun(np.broadcast_to(x, shape), float(iso))
+            return (dh / 1000 if plottype == "dH" else ds), np.broadcast_to(x, shape)
+        # Ellingham diagram
+        dh, ds = dh_ds_fun(np.full(shape, float(delt)), x)
+        return (dh - ds*x) / 1000, np.full(shape, float(delt))
+
+    res_theo = result(theo_dh_ds)[0]
+    res_exp, delta_exp = np.full(shape, np.nan), np.full(shape, np.nan)
+    if np.any(p['exp']):
+        res_exp, delta_exp = result(exp_dh_ds)
+        res_exp = np.where(p['exp'], res_exp, np.nan)
+    with np.errstate(invalid="ignore"):
+        in_range = (p['delta_min'] < delta_exp) & (delta_exp < p['delta_max'])
+    res_fit, res_interp = np.where(in_range, res_exp, np.nan), np.where(in_range, np.nan, res_exp)
+
+    def to_list(values):
+        return [None if np.isnan(v) else float(v) for v in values]
+
+    x_disp = list(np.exp(x_val)) if plottype == "isotherm" else list(x_val)
+    traces = []
+    for m, pars in enumerate(pars_list):
+        color = COMPARISON_COLORS[m % len(COMPARISON_COLORS)]
+        traces.append({'x': x_disp, 'y': to_list(res_theo[m]), 'name': pars['compstr_disp'] + " (theo)",
+                       'line': {'color': color, 'width': 2.5}})
+        if p['exp'][m, 0]:
+            traces.append({'x': x_disp, 'y': to_list(res_fit[m]), 'name': pars['compstr_disp'] + " (exp)",
+                           'line': {'color': color, 'width': 2.5, 'dash': 'dash'}})
+            traces.append({'x': x_disp, 'y': to_list(res_interp[m]), 'name': pars['compstr_disp'] + " (exp interp)",
+                           'line': {'color': color, 'width': 2.5, 'dash': 'dot'}})
+
+    if plottype == "ellingham":
+        traces.append({'x': x_disp, 'y': list(isobar_line_elling(np.log(10 ** iso), x[0]) / 1000),
+                       'name': 'isobar line', 'line': {'color': 'rgb(100,100,100)', 'width': 2.5}})
+
+    y_range = None
+    if plottype in ("dH", "dS"):
+        y_all = np.concatenate([res_theo[~np.isnan(res_theo)], res_exp[~np.isnan(res_exp)]])
+        y_max = max(y_all) * 1.2 if len(y_all) else 250
+        if plottype == "dH":
+            if len(y_all) and max(y_all) > (np.nanmax(p["dh_max"]) * 0.0015):
+                y_max = np.nanmax(p["dh_max"]) * 0.0015
+        elif len(y_all) and max(y_all) > 250:
+            y_max = 250
+        y_min = -10
+        if plottype == "dH" and len(y_all) and min(y_all) > -10:
+            y_min = min(y_all) * 0.8
+        y_range = [float(y_min), float(y_max)]
+
+    return traces, y_range
+
+
 def energy_analysis(en_dat, payload):
     # parameters for the database ID
     payload['data_source'] = "Theo" if payload['data_source'] == "Theoretical" else "Exp"
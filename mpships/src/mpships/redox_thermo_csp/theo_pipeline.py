@@ -0,0 +1,282 @@
+"""
+Batch pipeline for the theoretical redox parameters of new perovskite compositions
+
+    python -m mpships.redox_thermo_csp.theo_pipeline compositions.txt --checkpoint-dir theo_run [--workers 8]
+
+compositions.txt contains one composition per line in the format of the isographs ("Sr1Fe1Ox",
+"Ca0.5Sr0.5Mn0.5Fe0.5Ox"), the contributions are written to theo_run/contributions.json.
+
+With --queue, the chunks of compositions are computed by the workers of a work queue in Redis (see
+mpships.work_queue) on any number of nodes, started with `python -m mpships.work_queue worker --queue <name>`.
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from mpships.redox_thermo_csp.entry_cache import entry_cache
+from mpships.redox_thermo_csp.isograph_data import isograph_data
+from mpships.redox_thermo_csp.redox_utils import (
+    get_debye_temps,
+    get_mpids_comps_perov_brownm,
+    redenth_act,
+    split_comp,
+)
+from mpships.work_queue import TaskFailed, work_queue
+
+logger = logging.getLogger(__name__)
+
+# column of the checkpoints with the error message of compositions that could not be computed
+ERROR = "Error"
+
+
+def chemical_system(compstr):
+    """elements of a composition, e.g. "Ca0.5Sr0.5Mn0.5Fe0.5Ox" -> frozenset({"Ca", "Sr", "Mn", "Fe", "O"})"""
+    return frozenset([species[0] for species in split_comp(compstr) if species is not None] + ["O"])
+
+
+def group_by_chemical_system(systems):
+    """
+    Groups the compositions by chemical systems that are not part of another one, the entries of all compositions of
+    a group are found in the entries of its chemical system (see entry_cache)
+    :param systems: {composition: chemical system}
+    :return:        {chemical system: [compositions]}
+    """
+    groups = {}
+    for system in sorted(set(systems.values()), key=len, reverse=True):
+        if not any(system <= other for other in groups):
+            groups[system] = []
+    for compstr, system in systems.items():
+        groups[next(other for other in groups if system <= other)].append(compstr)
+    return groups
+
+
+def theo_parameters(compstr):
+    """
+    Redox enthalpies, redox-active species and Materials Project ids of one composition, as a row with the columns of
+    isograph_data.COLUMNS (without the Debye temperatures)
+    """
+    _, dh_min, dh_max, conc_act = redenth_act(compstr)
+    mpid_p, mpid_b = get_mpids_comps_perov_brownm(compstr)
+    return {
+        "Formula": compstr.split("O")[0] + "O3",
+        "Oxidized mp-id": mpid_p if mpid_p != "None" else None,
+        "Oxidized Composition": compstr.split("O")[0] + "O3",
+        "Reduced mp-id": mpid_b if mpid_b != "None" else None,
+        "Reduced Composition": compstr.split("O")[0] + "O2.5",
+        "Theoretical Composition": compstr,
+        # kJ/mol as in the contributions
+        "Theoretical ΔH Min (kJ/mol)": dh_min / 1000 if dh_min is not None else None,
+        "Theoretical ΔH Max (kJ/mol)": dh_max / 1000 if dh_max is not None else None,
+        "Solution": "Dilute_Species",
+        "Availability": "Theoretical",
+        "Last Updated": datetime.date.today().isoformat(),
+        "Active": conc_act,
+    }
+
+
+def _init_worker(entry_cache_directory):
+    entry_cache.directory = entry_cache_directory
+
+
+def _theo_parameters_chunk(compstrs):
+    rows = []
+    for compstr in compstrs:
+        try:
+            rows.append(theo_parameters(compstr))
+        except Exception as e:
+            rows.append({"Theoretical Composition": compstr, ERROR: repr(e)})
+    return rows
+
+
+def load_checkpoints(checkpoint_dir, pattern="part-*.parquet"):
+    """all rows written to the checkpoint files so far, None if there are none"""
+    paths = sorted(glob.glob(os.path.join(checkpoint_dir, pattern)))
+    if not paths:
+        return None
+    return pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+
+
+def _save_checkpoint(rows, path):
+    # all values as strings or floats so that the parts have the same schema
+    columns = [column for column, _, _ in isograph_data.COLUMNS] + [ERROR]
+    df = pd.DataFrame(rows).reindex(columns=columns)
+    for column, _, dtype in isograph_data.COLUMNS:
+        if dtype == "float64":
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(np.float64)
+        else:
+            df[column] = df[column].astype(object).where(df[column].notna(), None)
+    df[ERROR] = df[ERROR].astype(object).where(df[ERROR].notna(), None)
+    _write_parquet(df, path)
+
+
+def _write_parquet(df, path):
+    # written completely or not at all, an interrupted run must not leave a truncated checkpoint
+    tmp_path = f"{path}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _debye_temps(checkpoint_dir, **kwargs):
+    """
+    Rows of the checkpoints and the Debye temperatures {mp-id: temperature} of their mp-ids, the temperatures that are
+    not in the checkpoints yet are computed (kwargs of get_debye_temps) and written to checkpoint_dir/debye-*.parquet
+    """
+    rows = load_checkpoints(checkpoint_dir)
+    if rows is None:
+        rows = pd.DataFrame(columns=[column for column, _, _ in isograph_data.COLUMNS] + [ERROR])
+    debye = load_checkpoints(checkpoint_dir, "debye-*.parquet")
+    known = dict(zip(debye["mpid"], debye["debye"])) if debye is not None else {}
+    mpids = {mpid for column in ["Oxidized mp-id", "Reduced mp-id"] for mpid in rows[column].dropna()}
+    todo_mpids = sorted(mpids - set(known))
+    if todo_mpids:
+        try:
+            temps_by_mpid = get_debye_temps(todo_mpids, **kwargs)
+        except Exception as e:
+            # not written to the checkpoints, so they are tried again when the pipeline is run again
+            logger.warning(f"Could not get the Debye temperatures: {e!r}")
+        else:
+            temps = [temps_by_mpid.get(mpid) for mpid in todo_mpids]
+            n_debye = len(glob.glob(os.path.join(checkpoint_dir, "debye-*.parquet")))
+            df = pd.DataFrame({"mpid": todo_mpids, "debye": pd.array(temps, dtype="float64")})
+            _write_parquet(df, os.path.join(checkpoint_dir, f"debye-{n_debye:05d}.parquet"))
+            known.update(zip(todo_mpids, temps))
+    return rows, known
+
+
+def to_record(row):
+    """contribution {"data": {...}} in the shape of the redox_thermo_csp project from a row of the checkpoints"""
+    data = {}
+    for column, path, dtype in isograph_data.COLUMNS:
+        value = row.get(column)
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            continue
+        entry = data
+        for key in path[:-1]:
+            entry = entry.setdefault(key, {})
+        entry[path[-1]] = float(value) if dtype == "float64" else value
+    return {"data": data}
+
+
+def _run_chunks(chunks, queue, checkpoint_dir, n_parts):
+    """computes the chunks with the workers of the work queue and writes them to the checkpoints as they finish"""
+    job_id = queue.submit(_theo_parameters_chunk, [(chunk,) for chunk in chunks])
+    chunk_by_task = dict(zip(queue.tasks(job_id), chunks))
+    for i, task_id in enumerate(queue.as_completed(job_id)):
+        try:
+            rows = queue.result(task_id)
+        except TaskFailed as e:
+            # written as errors, which are tried again when the pipeline is run again
+            logger.warning(f"Chunk {task_id} of job {job_id} failed: {e}")
+            rows = [{"Theoretical Composition": compstr, ERROR: str(e)} for compstr in chunk_by_task[task_id]]
+        _save_checkpoint(rows, os.path.join(checkpoint_dir, f"part-{n_parts + i:05d}.parquet"))
+
+
+def run(compositions, checkpoint_dir, max_workers=None, chunk_size=20, queue=None):
+    """
+    Computes the theoretical redox parameters of many compositions on a process pool
+
+    - Compositions are deduplicated. The entries of each chemical system that is not part of another one are queried
+      once before the workers start (see entry_cache), so the workers read them from disk instead of querying the
+      Materials Project for each composition.
+    - Every finished chunk of compositions is written to checkpoint_dir/part-*.parquet, and the Debye temperatures to
+      checkpoint_dir/debye-*.parquet. Compositions (unless they failed) and mp-ids found there are not computed
+      again, so an interrupted run continues where it stopped.
+    - Debye temperatures are computed once per mp-id, with one query for many mp-ids (see get_debye_temps).
+
+    :param compositions:    compositions in the format "Sr1Fe1Ox", "Ca0.5Sr0.5Mn0.5Fe0.5Ox"
+    :param checkpoint_dir:  directory of the checkpoints
+    :param max_workers:     number of processes, default number of CPUs
+    :param chunk_size:      number of compositions per task and checkpoint
+    :param queue:           work_queue whose workers compute the chunks instead of the process pool, which is then
+                            only started for the Debye temperatures. The workers query the entries themselves.
+    :return:                (records in the shape of the contributions as for isograph_data.to_table,
+                            {composition: error} of the compositions that could not be computed)
+    """
+    compstrs = list(dict.fromkeys(c.strip() for c in compositions if c.strip()))
+    if not compstrs:
+        return [], {}
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    done = load_checkpoints(checkpoint_dir)
+    # compositions that failed are tried again
+    done_compstrs = set(done.loc[done[ERROR].isna(), "Theoretical Composition"]) if done is not None else set()
+    todo = [compstr for compstr in compstrs if compstr not in done_compstrs]
+    logger.info(f"{len(compstrs)} compositions, {len(compstrs) - len(todo)} from the checkpoints")
+
+    systems, failed = {}, []
+    for compstr in todo:
+        try:
+            systems[compstr] = chemical_system(compstr)
+        except Exception as e:
+            failed.append({"Theoretical Composition": compstr, ERROR: repr(e)})
+    n_parts = len(glob.glob(os.path.join(checkpoint_dir, "part-*.parquet")))
+    if failed:
+        _save_checkpoint(failed, os.path.join(checkpoint_dir, f"part-{n_parts:05d}.parquet"))
+        n_parts += 1
+
+    chunks = []
+    for system, group in group_by_chemical_system(systems).items():
+        try:
+            entry_cache.get_entries(system)
+        except Exception as e:
+            logger.warning(f"Could not query the entries of {entry_cache.chemsys(system)}: {e!r}")
+        chunks += [group[i:i + chunk_size] for i in range(0, len(group), chunk_size)]
+
+    if queue is not None:
+        # the process pool is only started by get_debye_temps, if there are Debye temperatures to compute
+        _run_chunks(chunks, queue, checkpoint_dir, n_parts)
+        rows, known = _debye_temps(checkpoint_dir, max_workers=max_workers)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(entry_cache.directory,)
+        ) as executor:
+            futures = [executor.submit(_theo_parameters_chunk, chunk) for chunk in chunks]
+            for i, future in enumerate(as_completed(futures)):
+                _save_checkpoint(future.result(), os.path.join(checkpoint_dir, f"part-{n_parts + i:05d}.parquet"))
+                logger.info(f"{i + 1} of {len(futures)} chunks done")
+            rows, known = _debye_temps(checkpoint_dir, executor=executor)
+
+    rows = rows.drop_duplicates("Theoretical Composition", keep="last").set_index("Theoretical Composition", drop=False)
+    records, errors = [], {}
+    for compstr in compstrs:
+        if compstr not in rows.index:
+            errors[compstr] = "Not computed"
+            continue
+        row = rows.loc[compstr].to_dict()
+        if isinstance(row.get(ERROR), str):  # NaN in parts without errors
+            errors[compstr] = row[ERROR]
+            continue
+        t_perov, t_brownm = known.get(row["Oxidized mp-id"]), known.get(row["Reduced mp-id"])
+        available = not (t_perov is None or t_brownm is None or np.isnan(t_perov) or np.isnan(t_brownm))
+        row["Elastic Tensors"] = str(available)
+        row["Debye Temp Perovskite"] = t_perov if available else None
+        row["Debye Temp Brownmillerite"] = t_brownm if available else None
+        records.append(to_record(row))
+    return records, errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Theoretical redox parameters of new perovskite compositions")
+    parser.add_argument("compositions", help="file with one composition per line, e.g. Sr1Fe1Ox")
+    parser.add_argument("--checkpoint-dir", required=True, help="directory of the checkpoints and the results")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default number of CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=20, help="compositions per task and checkpoint")
+    parser.add_argument("--queue", default=None, help="name of a work queue whose workers compute the chunks")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    with open(args.compositions) as f:
+        records, errors = run(f, args.checkpoint_dir, max_workers=args.workers, chunk_size=args.chunk_size,
+                              queue=work_queue(args.queue) if args.queue else None)
+    with open(os.path.join(args.checkpoint_dir, "contributions.json"), "w") as f:
+        json.dump(records, f, ensure_ascii=False)
+    for compstr, error in errors.items():
+        print(f"{compstr}: {error}")
+    print(f"{len(records)} contributions written to {os.path.join(args.checkpoint_dir, 'contributions.json')}")
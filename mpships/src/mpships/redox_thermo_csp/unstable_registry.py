@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from mpships.redox_thermo_csp.redox_composition import parse_composition
+
+
+class unstable_registry:
+    """Compositions which are potentially unstable for chemical reasons and are removed from the energy analysis.
+
+    The compositions are read on first use from the JSON list in `path` (environment
+    variable `MPSHIPS_UNSTABLE_PHASES`, default `unstable_phases.json` next to this
+    module) and kept as a set of the keys of their parsed compositions (see
+    ParsedComposition.key), so that "Mg1Co1O", "Mg1Co1Ox" and "MgCoO3" are the same
+    phase and a composition only matches a whole entry. More compositions can be
+    added at runtime with `add`.
+    """
+    path = os.environ.get(
+        "MPSHIPS_UNSTABLE_PHASES", os.path.join(os.path.dirname(__file__), "unstable_phases.json")
+    )
+
+    _keys = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _get_keys():
+        with unstable_registry._lock:
+            if unstable_registry._keys is None:
+                with open(unstable_registry.path) as f:
+                    unstable_registry._keys = {parse_composition(compstr).key for compstr in json.load(f)}
+            return unstable_registry._keys
+
+    @staticmethod
+    def add(*compstrs):
+        """add compositions to the unstable phases of this process, the file is not changed"""
+        keys = {parse_composition(compstr).key for compstr in compstrs}
+        unstable_registry._get_keys()
+        with unstable_registry._lock:
+            unstable_registry._keys = unstable_registry._keys | keys
+
+    @staticmethod
+    def contains(compstr):
+        """True if compstr is an unstable phase"""
+        return parse_composition(compstr).key in unstable_registry._get_keys()
+
+    @staticmethod
+    def flag(compstrs):
+        """
+        unstable phases in a column of compositions
+        :param compstrs:    compositions as a list or a pandas Series
+        :return:            boolean numpy array, True for the unstable phases
+        """
+        compstrs = pd.Series(compstrs, dtype=object)
+        keys = unstable_registry._get_keys()
+        # each distinct composition is parsed and looked up once
+        codes, unique = pd.factorize(compstrs)
+        flags = [parse_composition(compstr).key in keys for compstr in unique]
+        # missing compositions have the code -1, the False appended last
+        return np.array(flags + [False], dtype=bool)[codes]
+
+    @staticmethod
+    def clear():
+        """forget the added compositions, the file is read again on next use"""
+        with unstable_registry._lock:
+            unstable_registry._keys = None
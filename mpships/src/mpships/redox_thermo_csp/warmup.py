@@ -0,0 +1,137 @@
+"""
+Warm-up of the default views of the RedoxThermoCSP app
+
+Computes the isographs of the default material with the initial slider values and the energy analysis datasets of
+the initial settings, so that they are in the result cache (see mpships.result_cache) before the first page load.
+
+Run it once after deploying (with the same REDIS_URL as the app):
+
+    python -m mpships.redox_thermo_csp.warmup
+
+or in every gunicorn worker, in the background after the worker has started, with gunicorn.conf.py:
+
+    from mpships.redox_thermo_csp.warmup import post_worker_init
+
+To precompute the isographs of all materials, submit the views as tasks of a work queue (see mpships.work_queue),
+which are computed by its workers on any number of nodes into the shared result cache:
+
+    python -m mpships.redox_thermo_csp.warmup --all-materials --queue warmup
+    python -m mpships.work_queue worker --queue warmup
+"""
+
+import argparse
+import logging
+import threading
+import time
+
+from mpships.redox_thermo_csp.isograph_data import isograph_data
+from mpships.redox_thermo_csp.redox_thermo_csp import (
+    DEFAULT_COMPOSITION,
+    ENERGY_DEFAULTS,
+    ISOGRAPH_DEFAULTS,
+    isograph_figure,
+    query_mp_contribs_energy_analysis,
+)
+from mpships.work_queue import TaskFailed, work_queue
+
+logger = logging.getLogger(__name__)
+
+# views that are warmed up by name, so that they can be run as tasks of a work queue
+VIEWS = {
+    "isograph_figure": isograph_figure,
+    "energy_analysis": query_mp_contribs_energy_analysis,
+}
+
+
+def energy_analysis_settings():
+    """arguments of query_mp_contribs_energy_analysis for the initial energy analysis views"""
+    p_red = 10 ** ENERGY_DEFAULTS["p_red"]
+    if round(p_red, 2) == 0.21:  # as in update_enera
+        p_red = 0.21
+    return [
+        {},  # figure of get_energy_analysis_layout
+        {
+            "process_type": ENERGY_DEFAULTS["process_type"],
+            "t_ox": ENERGY_DEFAULTS["t_ox"],
+            "t_red": ENERGY_DEFAULTS["t_red"],
+            "p_ox": 10 ** ENERGY_DEFAULTS["p_ox"],
+            "p_red": p_red,
+            "data_source": "Theo",
+            "enth_steps": 20,
+        },
+    ]
+
+
+def views(version, all_materials=False):
+    """
+    (name in VIEWS, arguments) of the views to warm up
+    The isographs of the default material (or of all materials) are only warmed up if there is isograph data.
+    """
+    compstrs = [DEFAULT_COMPOSITION]
+    if all_materials:
+        compstrs = isograph_data.table()["Theoretical Composition"].dropna().unique().tolist()
+    isographs = [
+        ("isograph_figure", dict(figure_number=i, compstr=compstr, **defaults))
+        for compstr in compstrs
+        for i, defaults in enumerate(ISOGRAPH_DEFAULTS)
+        if version is not None
+    ]
+    return isographs + [("energy_analysis", settings) for settings in energy_analysis_settings()]
+
+
+def warm_up_view(name, kwargs, version=None):
+    """
+    Compute one view into the result cache, task of the work queue
+    The version of the isograph data is only passed so that the tasks of new data have new ids.
+    """
+    VIEWS[name](**kwargs)
+    return True
+
+
+def warm_up(queue=None, all_materials=False):
+    """
+    Compute and cache the default views, returns the number of views that could not be computed
+    Waits for the isograph data, as figures are only cached for a version of the data
+
+    :param queue:           work_queue whose workers compute the views instead of this process
+    :param all_materials:   isographs of all materials instead of the default material
+    """
+    start = time.perf_counter()
+    dataset = isograph_data.get()
+    version = dataset["version"]
+    if version is None:
+        logger.warning("No isograph data available, the isographs are not warmed up")
+    todo = views(version, all_materials=all_materials)
+    failed = 0
+    if queue is not None:
+        job_id = queue.submit(warm_up_view, [(name, kwargs, version) for name, kwargs in todo])
+        for task_id in queue.as_completed(job_id):
+            try:
+                queue.result(task_id)
+            except TaskFailed as e:
+                failed += 1
+                logger.warning(f"Warm-up task {task_id} failed: {e}")
+    else:
+        for name, kwargs in todo:
+            try:
+                warm_up_view(name, kwargs)
+            except Exception as e:
+                failed += 1
+                logger.warning(f"Warm-up of {name}({kwargs}) failed: {e!r}")
+    logger.info(f"Warmed up {len(todo) - failed} of {len(todo)} views in {time.perf_counter() - start:.1f} s")
+    return failed
+
+
+def post_worker_init(worker):
+    """gunicorn server hook, warms up in a background thread so that the worker can serve requests right away"""
+    threading.Thread(target=warm_up, name="mpships-warmup", daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute and cache the default views of the RedoxThermoCSP app")
+    parser.add_argument("--all-materials", action="store_true", help="isographs of all materials")
+    parser.add_argument("--queue", default=None, help="name of a work queue whose workers compute the views")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    queue = work_queue(args.queue) if args.queue else None
+    raise SystemExit(1 if warm_up(queue=queue, all_materials=args.all_materials) else 0)
@@ -0,0 +1,160 @@
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future
+
+import redis
+
+from mpships.redis_store import redis_store
+
+logger = logging.getLogger(__name__)
+
+
+class single_flight:
+    """Identical concurrent calls in this process wait for the one call that is already running.
+
+    The first call with a key runs the function. Calls with the same key that start
+    before it has finished get its result (or its exception) instead of running the
+    function again. The result is shared, so callers must not modify it.
+    """
+    _calls = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def do(key, fun, *args, **kwargs):
+        with single_flight._lock:
+            future = single_flight._calls.get(key)
+            leader = future is None
+            if leader:
+                future = single_flight._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = fun(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with single_flight._lock:
+                del single_flight._calls[key]
+
+
+class result_cache:
+    """Cache the results of expensive functions (figures, MPContribs queries) in Redis.
+
+    Results are stored with `redis_store.save_as` under a key made of the name of the
+    function, a version (e.g. the version of the data the result was computed from)
+    and its arguments, so the cache is shared by all workers with the same Redis.
+    Entries expire after `ttl` seconds (environment variable
+    `MPSHIPS_RESULT_CACHE_TTL`, default one day). Results go through JSON (see
+    redis_store), so a cached figure is returned as a dict, which Dash accepts like
+    the figure itself. None is not cached, and nothing is cached while the version
+    is None (e.g. no data yet). If Redis is unavailable, the function is called
+    without the cache.
+
+    Identical calls that miss the cache at the same time are computed only once.
+    Within a worker this uses `single_flight`. Across workers it uses a lock in Redis
+    (`redis_store.lock`): the other workers wait up to `lock_timeout` seconds for
+    the lock and then read the result from the cache. Set the environment variable
+    `MPSHIPS_RESULT_CACHE_SHARED_LOCK=0` to only coalesce calls within a worker.
+    """
+    ttl = int(os.environ.get("MPSHIPS_RESULT_CACHE_TTL", 24 * 3600))
+    shared_lock = os.environ.get("MPSHIPS_RESULT_CACHE_SHARED_LOCK", "1") != "0"
+    lock_timeout = 120.0
+    prefix = "result_cache"
+
+    @staticmethod
+    def key(name, version, arguments):
+        serialized = json.dumps([version, arguments], sort_keys=True, default=str)
+        return f"{result_cache.prefix}_{name}_{hashlib.sha1(serialized.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def get(key):
+        try:
+            return redis_store.load_key(key)
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Result cache unavailable: {e!r}")
+            return None
+
+    @staticmethod
+    def set(key, value, ttl=None):
+        try:
+            redis_store.save_as(key, value, ex=ttl or result_cache.ttl)
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Result cache unavailable: {e!r}")
+
+    @staticmethod
+    def compute(key, fun, *args, ttl=None, **kwargs):
+        """
+        Result of fun(*args, **kwargs) from the cache, otherwise computed and cached for ttl seconds (default
+        result_cache.ttl)
+        Concurrent calls with the same key, in this worker and (with shared_lock) in other workers, compute it once
+        """
+        value = result_cache.get(key)
+        if value is not None:
+            return value
+        return single_flight.do(key, result_cache._compute_locked, key, ttl, fun, *args, **kwargs)
+
+    @staticmethod
+    def _compute_locked(key, ttl, fun, *args, **kwargs):
+        lock = None
+        if result_cache.shared_lock:
+            try:
+                lock = redis_store.lock(key, timeout=result_cache.lock_timeout)
+                if lock.acquire(blocking=True, blocking_timeout=result_cache.lock_timeout):
+                    # another worker may have computed it while this one was waiting for the lock
+                    value = result_cache.get(key)
+                    if value is not None:
+                        lock.release()
+                        return value
+                else:
+                    logger.warning(f"Timed out waiting for another worker to compute {key}")
+                    lock = None
+            except redis.exceptions.RedisError as e:
+                logger.warning(f"Result cache lock unavailable: {e!r}")
+                lock = None
+        try:
+            value = fun(*args, **kwargs)
+            if value is not None:
+                result_cache.set(key, value, ttl)
+            return value
+        finally:
+            if lock is not None:
+                try:
+                    lock.release()
+                except redis.exceptions.RedisError:
+                    pass  # the lock expires after lock_timeout
+
+    @staticmethod
+    def cached(name, version=None, ttl=None):
+        """
+        Decorator, cache the results of a function by its arguments (default arguments included)
+        e.g. @result_cache.cached("energy_analysis")
+
+        :param name:        name of the cached function in the keys
+        :param version:     function without arguments returning the version of the inputs, e.g. of the data
+        :param ttl:         seconds until the results expire, default result_cache.ttl
+        """
+        def decorator(fun):
+            signature = inspect.signature(fun)
+
+            @functools.wraps(fun)
+            def wrapper(*args, **kwargs):
+                current_version = version() if version else None
+                if version and current_version is None:
+                    return fun(*args, **kwargs)
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = result_cache.key(name, current_version, bound.arguments)
+                return result_cache.compute(key, fun, *args, ttl=ttl, **kwargs)
+
+            wrapper.uncached = fun
+            return wrapper
+        return decorator
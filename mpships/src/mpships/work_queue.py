@@ -0,0 +1,375 @@
+"""
+Work queue in Redis for batch precomputations that run on several nodes
+
+A batch job (e.g. the theoretical redox parameters of many compositions, see theo_pipeline) is submitted as tasks,
+each a call of an importable function with JSON arguments. Any number of worker processes connected to the same
+Redis (environment variable `REDIS_URL`, see redis_store) take the tasks from the queue:
+
+    python -m mpships.work_queue worker [--queue default] [--burst]
+    python -m mpships.work_queue progress <job id>
+
+Tasks are content-addressed, their id is a hash of the function and its arguments. Submitting a task that is already
+queued, running or done does nothing, so a job can be submitted again after an interruption and only the missing
+tasks are computed. The results are stored under the id of their task and are shared by all jobs.
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+import redis
+
+from mpships.redis_store import redis_store
+
+logger = logging.getLogger(__name__)
+
+# states of a task
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+class TaskFailed(RuntimeError):
+    """The task raised an exception in all of its attempts"""
+
+
+class work_queue:
+    """Queue of tasks in Redis, shared by all processes connected to the same Redis.
+
+    Keys (`prefix` is "work_queue"):
+
+    - `<prefix>_<name>_pending`: ids of the tasks waiting for a worker, taken from the right
+    - `<prefix>_<name>_running`: ids of the tasks taken by a worker. A worker holds a lease
+      (`<prefix>_lease_<id>`, `lease_timeout` seconds, renewed while the task runs), set in the same
+      transaction as the task is taken. Tasks of workers that died are put back into the queue when
+      their lease has expired, or fail after `max_attempts` (see requeue_stale).
+    - `<prefix>_task_<id>`: hash with the function, arguments, state, attempts and error of a task
+    - `<prefix>_job_<id>`: ids of the tasks of a job in the order they were submitted
+    - results with `redis_store.save_as` under `<prefix>_result_<id>`, without expiry
+
+    With FakeRedis (no `REDIS_URL`) the queue only works within one process, e.g. in the tests.
+    """
+    prefix = "work_queue"
+    lease_timeout = float(os.environ.get("MPSHIPS_WORK_QUEUE_LEASE", 300))
+    max_attempts = int(os.environ.get("MPSHIPS_WORK_QUEUE_MAX_ATTEMPTS", 3))
+
+    def __init__(self, name="default"):
+        self.name = name
+        self.pending_key = f"{self.prefix}_{name}_pending"
+        self.running_key = f"{self.prefix}_{name}_running"
+
+    @property
+    def r(self):
+        return redis_store.r
+
+    @staticmethod
+    def function_name(fun):
+        """"module:qualname" of a function, which the workers import"""
+        name = f"{fun.__module__}:{fun.__qualname__}"
+        if "<" in fun.__qualname__:
+            raise ValueError(f"{name} can not be imported by the workers")
+        return name
+
+    @staticmethod
+    def _import(function_name):
+        module, qualname = function_name.split(":")
+        fun = importlib.import_module(module)
+        for attr in qualname.split("."):
+            fun = getattr(fun, attr)
+        return fun
+
+    @staticmethod
+    def task_id(fun, args=(), kwargs=None):
+        """id of the call fun(*args, **kwargs), the same in all processes"""
+        serialized = json.dumps([work_queue.function_name(fun), list(args), kwargs or {}], sort_keys=True)
+        return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+    def _task_key(self, task_id):
+        return f"{self.prefix}_task_{task_id}"
+
+    def _result_key(self, task_id):
+        return f"{self.prefix}_result_{task_id}"
+
+    def _lease_key(self, task_id):
+        return f"{self.prefix}_lease_{task_id}"
+
+    def _job_key(self, job_id):
+        return f"{self.prefix}_job_{job_id}"
+
+    def submit(self, fun, calls, retry_failed=True):
+        """
+        Submits a job, one task per call of fun
+
+        :param fun:             function defined at the top level of a module (or a staticmethod of a class there)
+        :param calls:           arguments of the calls, tuples of positional arguments or (args, kwargs), JSON types
+        :param retry_failed:    queue tasks that failed in an earlier submission again
+        :return:                id of the job, the same for the same calls
+        """
+        function_name = self.function_name(fun)
+        task_ids = []
+        for call in calls:
+            args, kwargs = call if len(call) == 2 and isinstance(call[1], dict) else (call, {})
+            task_id = self.task_id(fun, args, kwargs)
+            task_ids.append(task_id)
+            fields = {"function": function_name, "args": json.dumps(list(args)), "kwargs": json.dumps(kwargs)}
+            self._enqueue(task_id, fields, retry_failed)
+
+        job_id = hashlib.sha1(json.dumps(task_ids).encode("utf-8")).hexdigest()
+        pipe = self.r.pipeline()
+        pipe.delete(self._job_key(job_id))
+        if task_ids:
+            pipe.rpush(self._job_key(job_id), *task_ids)
+        pipe.execute()
+        logger.info(f"Job {job_id} with {len(task_ids)} tasks of {function_name} submitted to {self.name}")
+        return job_id
+
+    def _transaction(self, watch, fun):
+        """
+        Runs fun(pipe) with the keys watched, fun queues the commands after pipe.multi() or returns without them
+        Tried again if a watched key was changed by another process, returns the return value of fun
+        """
+        with self.r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(*watch)
+                    value = fun(pipe)
+                    if pipe.explicit_transaction:
+                        pipe.execute()
+                    else:
+                        pipe.unwatch()
+                    return value
+                except redis.exceptions.WatchError:
+                    pipe.reset()
+
+    def _enqueue(self, task_id, fields, retry_failed):
+        """Creates a task and queues it in one transaction, or queues a task that failed again"""
+        task_key = self._task_key(task_id)
+
+        def enqueue(pipe):
+            state = pipe.hget(task_key, "state")
+            if state is None or (retry_failed and state == FAILED.encode()):
+                pipe.multi()
+                pipe.hset(task_key, mapping=dict(fields, state=PENDING, attempts=0))
+                pipe.lpush(self.pending_key, task_id)
+
+        self._transaction([task_key], enqueue)
+
+    def tasks(self, job_id):
+        """ids of the tasks of a job"""
+        return [task_id.decode() for task_id in self.r.lrange(self._job_key(job_id), 0, -1)]
+
+    def states(self, task_ids):
+        """state of each task, None for unknown tasks"""
+        pipe = self.r.pipeline()
+        for task_id in task_ids:
+            pipe.hget(self._task_key(task_id), "state")
+        return [state.decode() if state is not None else None for state in pipe.execute()]
+
+    def progress(self, job_id):
+        """number of tasks of a job in each state and in total, e.g. {"total": 10, "done": 4, "running": 2, ...}"""
+        states = self.states(self.tasks(job_id))
+        progress = {state: states.count(state) for state in (PENDING, RUNNING, DONE, FAILED)}
+        progress["total"] = len(states)
+        return progress
+
+    def result(self, task_id):
+        """result of a task that is done, raises TaskFailed for a task that failed and KeyError otherwise"""
+        state, error = self.r.hmget(self._task_key(task_id), "state", "error")
+        if state == FAILED.encode():
+            raise TaskFailed(error.decode())
+        if state != DONE.encode():
+            raise KeyError(f"Task {task_id} is not done")
+        return redis_store.load_key(self._result_key(task_id))
+
+    def results(self, job_id):
+        """results of the tasks of a job in order, raises TaskFailed if one has failed and KeyError if not done"""
+        return [self.result(task_id) for task_id in self.tasks(job_id)]
+
+    def as_completed(self, job_id, poll=1.0, timeout=None):
+        """
+        Ids of the tasks of a job that are done or failed, as they finish, until all have finished
+        Logs the progress, raises TimeoutError if they have not finished after timeout seconds
+        """
+        stop = None if timeout is None else time.monotonic() + timeout
+        todo = set(self.tasks(job_id))
+        total = len(todo)
+        while todo:
+            ids = sorted(todo)
+            finished = [task_id for task_id, state in zip(ids, self.states(ids)) if state in (DONE, FAILED)]
+            for task_id in finished:
+                todo.discard(task_id)
+                yield task_id
+            if finished:
+                logger.info(f"Job {job_id}: {total - len(todo)} of {total} tasks finished")
+            if not todo:
+                break
+            if stop is not None and time.monotonic() >= stop:
+                raise TimeoutError(f"{len(todo)} of {total} tasks of job {job_id} have not finished")
+            self.requeue_stale()
+            time.sleep(poll)
+
+    def requeue_stale(self):
+        """
+        Puts tasks whose worker has died (lease expired) back into the queue, returns their number
+        Tasks that have already been run max_attempts times fail instead, e.g. if they crash their worker.
+        """
+        requeued = 0
+        for task_id in self.r.lrange(self.running_key, 0, -1):
+            task_id = task_id.decode()
+            task_key, lease_key = self._task_key(task_id), self._lease_key(task_id)
+
+            def requeue(pipe):
+                # the lease is set in the same transaction as the task is moved to the running list (see _claim)
+                if pipe.exists(lease_key) or pipe.lpos(self.running_key, task_id) is None:
+                    return None
+                attempts = int(pipe.hget(task_key, "attempts") or 0)
+                pipe.multi()
+                pipe.lrem(self.running_key, 1, task_id)
+                if attempts >= self.max_attempts:
+                    pipe.hset(task_key, mapping={
+                        "state": FAILED, "error": f"The worker stopped responding in all {attempts} attempts"
+                    })
+                    return FAILED
+                pipe.hset(task_key, "state", PENDING)
+                pipe.rpush(self.pending_key, task_id)
+                return PENDING
+
+            state = self._transaction([self.running_key, lease_key, task_key], requeue)
+            if state == FAILED:
+                logger.error(f"Task {task_id} failed, its worker stopped responding in all attempts")
+            requeued += state == PENDING
+        if requeued:
+            logger.warning(f"{requeued} tasks of workers that stopped responding queued again in {self.name}")
+        return requeued
+
+    def _claim(self):
+        """
+        Takes the next task from the queue, (task id, token of the lease) or None if the queue is empty
+        Moving it to the running list, setting the lease and the state happen in one transaction.
+        """
+        token = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex}".encode()
+
+        def claim(pipe):
+            task_id = pipe.lindex(self.pending_key, -1)
+            if task_id is None:
+                return None
+            task_id = task_id.decode()
+            task_key = self._task_key(task_id)
+            state, attempts = pipe.hmget(task_key, "state", "attempts")
+            pipe.multi()
+            pipe.rpop(self.pending_key)
+            if state != PENDING.encode():
+                return False  # queued twice, e.g. by two processes that requeued it at the same time
+            pipe.lpush(self.running_key, task_id)
+            pipe.set(self._lease_key(task_id), token, px=int(self.lease_timeout * 1000))
+            pipe.hset(task_key, mapping={"state": RUNNING, "attempts": int(attempts) + 1})
+            return task_id
+
+        while True:
+            task_id = self._transaction([self.pending_key], claim)
+            if task_id is not False:
+                return None if task_id is None else (task_id, token)
+
+    def _renew_lease(self, lease_key, token, stop):
+        while not stop.wait(self.lease_timeout / 3):
+            if self.r.get(lease_key) == token:
+                self.r.pexpire(lease_key, int(self.lease_timeout * 1000))
+
+    def _finish(self, task_id, token, fields, requeue=False):
+        """Sets the fields of a task that has run and releases it, unless its lease was lost to another worker"""
+        task_key, lease_key = self._task_key(task_id), self._lease_key(task_id)
+
+        def finish(pipe):
+            held = pipe.get(lease_key) == token
+            if not held and fields["state"] != DONE:
+                return  # queued again by another process (see requeue_stale)
+            pipe.multi()
+            pipe.hset(task_key, mapping=fields)
+            if fields["state"] == DONE:
+                pipe.hdel(task_key, "error")
+            if held:
+                pipe.lrem(self.running_key, 1, task_id)
+                pipe.delete(lease_key)
+                if requeue:
+                    pipe.lpush(self.pending_key, task_id)
+
+        self._transaction([lease_key], finish)
+
+    def run_task(self, task_id, token):
+        """Runs a task claimed from the queue (see _claim), stores its result and updates its state"""
+        task_key = self._task_key(task_id)
+        function_name, args, kwargs, attempts = self.r.hmget(task_key, "function", "args", "kwargs", "attempts")
+        lease_key = self._lease_key(task_id)
+        stop = threading.Event()
+        threading.Thread(target=self._renew_lease, args=(lease_key, token, stop), daemon=True).start()
+        try:
+            fun = self._import(function_name.decode())
+            value = fun(*json.loads(args), **json.loads(kwargs))
+        except Exception as e:
+            stop.set()
+            if int(attempts) < self.max_attempts:
+                logger.warning(f"Task {task_id} failed, queued again: {e!r}")
+                self._finish(task_id, token, {"state": PENDING, "error": repr(e)}, requeue=True)
+            else:
+                logger.error(f"Task {task_id} failed {int(attempts)} times: {e!r}")
+                self._finish(task_id, token, {"state": FAILED, "error": repr(e)})
+            return False
+        else:
+            stop.set()
+            redis_store.save_as(self._result_key(task_id), value)
+            self._finish(task_id, token, {"state": DONE})
+            return True
+
+    def work(self, burst=False, max_tasks=None, poll=0.5):
+        """
+        Worker loop, takes the tasks from the queue one after the other
+
+        :param burst:       stop when the queue is empty instead of waiting for new tasks
+        :param max_tasks:   stop after this number of tasks
+        :param poll:        seconds to wait before looking for tasks again when the queue is empty
+        :return:            number of tasks run
+        """
+        n_tasks = 0
+        while max_tasks is None or n_tasks < max_tasks:
+            self.requeue_stale()
+            claimed = self._claim()
+            if claimed is None:
+                if burst:
+                    break
+                time.sleep(poll)
+                continue
+            self.run_task(*claimed)
+            n_tasks += 1
+        return n_tasks
+
+    def clear(self):
+        """Removes the queued tasks, and the states of all tasks and results (of all queues)"""
+        keys = [self.pending_key, self.running_key]
+        for pattern in ("task", "job", "lease"):
+            keys += self.r.keys(f"{self.prefix}_{pattern}_*")
+        keys += self.r.keys(f"_dash_aio_components_*_{self.prefix}_result_*")
+        if keys:
+            self.r.delete(*keys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Workers and progress of the batch precomputations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    worker = subparsers.add_parser("worker", help="run the tasks of a queue")
+    worker.add_argument("--queue", default="default", help="name of the queue")
+    worker.add_argument("--burst", action="store_true", help="stop when the queue is empty")
+    worker.add_argument("--max-tasks", type=int, default=None, help="stop after this number of tasks")
+    progress = subparsers.add_parser("progress", help="progress of a job")
+    progress.add_argument("job", help="id of the job")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "worker":
+        n_tasks = work_queue(args.queue).work(burst=args.burst, max_tasks=args.max_tasks)
+        print(f"{n_tasks} tasks run")
+    else:
+        print(json.dumps(work_queue().progress(args.job)))
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.contribs_query`."""
+
+
+import threading
+import time
+import unittest
+
+from mpships.contribs_query import query_all_contributions
+
+
+class FakeContribs:
+    """Stand-in for the MPContribs client with a fixed latency per request"""
+
+    def __init__(self, n, latency=0.0):
+        self.contributions = [{"data": {"id": i, "other": "x"}} for i in range(n)]
+        self.latency = latency
+        self.queries = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def get_totals(self, query=None):
+        return len(self.contributions), None
+
+    def query_contributions(self, query=None, fields=None):
+        with self._lock:
+            self.queries.append((query, fields))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.latency)
+        with self._lock:
+            self.active -= 1
+        start = (query["page"] - 1) * query["_limit"]
+        page = self.contributions[start:start + query["_limit"]]
+        return {"data": [{"data": {"id": c["data"]["id"]}} for c in page]}
+
+
+class TestQueryAllContributions(unittest.TestCase):
+    """Tests for the concurrent paginated queries."""
+
+    def test_ordered(self):
+        """Return all contributions in order."""
+        contribs = FakeContribs(1003)
+        resp = query_all_contributions(contribs, {"project": "p"}, ["data.id"], per_page=100)
+        self.assertEqual(resp["total_count"], 1003)
+        self.assertEqual([c["data"]["id"] for c in resp["data"]], list(range(1003)))
+        self.assertEqual(len(contribs.queries), 11)
+        for query, fields in contribs.queries:
+            self.assertEqual(query["project"], "p")
+            self.assertEqual(fields, ["data.id"])
+
+    def test_concurrent(self):
+        """Request the pages at the same time, with a bounded number of threads."""
+        contribs = FakeContribs(1000, latency=0.05)
+        start = time.perf_counter()
+        query_all_contributions(contribs, {"project": "p"}, ["data.id"], per_page=100, max_workers=5)
+        self.assertLess(time.perf_counter() - start, 10 * 0.05)
+        self.assertEqual(contribs.max_active, 5)
+
+    def test_empty(self):
+        contribs = FakeContribs(0)
+        self.assertEqual(query_all_contributions(contribs, {"project": "p"}, ["data.id"])["data"], [])
+        self.assertEqual(contribs.queries, [])
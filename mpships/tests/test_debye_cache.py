@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.redox_thermo_csp.debye_cache` and the Debye temperatures of `redox_utils`."""
+
+
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from pymatgen.core import Lattice, Structure
+
+from mpships.redox_thermo_csp import redox_utils
+from mpships.redox_thermo_csp.debye_cache import debye_cache
+
+CIF = Structure(
+    Lattice.cubic(3.9), ["Sr", "Ti", "O", "O", "O"],
+    [[0, 0, 0], [0.5, 0.5, 0.5], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5]],
+).to(fmt="cif")
+TENSOR = [[300, 100, 100, 0, 0, 0], [100, 300, 100, 0, 0, 0], [100, 100, 300, 0, 0, 0],
+          [0, 0, 0, 100, 0, 0], [0, 0, 0, 0, 100, 0], [0, 0, 0, 0, 0, 100]]
+
+
+class FakeMP:
+    """structures and elastic tensors of mp-1 to mp-9, mp-5 has no elastic data, counts the queries"""
+
+    def __init__(self):
+        self.queries = []
+
+    def with_deadline(self, deadline):
+        return self
+
+    def query(self, criteria, properties):
+        self.queries.append(criteria["task_id"]["$in"])
+        return [
+            {"task_id": mpid, "cif": CIF, "elasticity.elastic_tensor": None if mpid == "mp-5" else TENSOR}
+            for mpid in criteria["task_id"]["$in"]
+            if mpid != "mp-99"  # not in the response, e.g. deprecated
+        ]
+
+    def get_data(self, mpid):
+        self.queries.append([mpid])
+        return [{"cif": CIF, "elasticity": {"elastic_tensor": TENSOR}}]
+
+
+def add_temps(worker):
+    """adds 20 Debye temperatures one by one, in a process of its own"""
+    for i in range(20):
+        debye_cache.update({f"mp-{worker}-{i}": float(i)})
+
+
+class TestDebyeTemps(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.mp = FakeMP()
+        self.patches = [
+            mock.patch.object(debye_cache, "path", os.path.join(self.tmp_dir.name, "debye_temps.json")),
+            mock.patch.object(redox_utils, "get_mpr", lambda: self.mp),
+        ]
+        for patch in self.patches:
+            patch.start()
+        debye_cache.clear()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        debye_cache.clear()
+        self.tmp_dir.cleanup()
+
+    def test_get_debye_temp(self):
+        errors = np.geterr()
+        td = redox_utils.get_debye_temp("mp-1")
+        self.assertAlmostEqual(td, 639.45, places=1)
+        self.assertEqual(np.geterr(), errors)
+        debye_cache.clear()
+        self.assertEqual(redox_utils.get_debye_temp("mp-1"), td)  # from the file
+        self.assertEqual(self.mp.queries, [["mp-1"]])
+
+    def test_batch(self):
+        """Query many materials at once and compute them in parallel."""
+        mpids = [f"mp-{i}" for i in range(1, 10)]
+        temps = redox_utils.get_debye_temps(mpids + ["mp-1"], max_workers=2, batch_size=4)
+        self.assertEqual(list(temps), mpids)
+        self.assertIsNone(temps["mp-5"])
+        for mpid in mpids:
+            if mpid != "mp-5":
+                self.assertAlmostEqual(temps[mpid], 639.45, places=1)
+        self.assertEqual([len(q) for q in self.mp.queries], [4, 4, 1])
+
+        self.assertEqual(redox_utils.get_debye_temps(mpids), temps)
+        self.assertEqual(len(self.mp.queries), 3)
+        with self.assertRaises(ValueError):
+            redox_utils.get_debye_temp("mp-5")
+
+    def test_not_returned(self):
+        """Do not cache materials that are missing from the response, only those without elastic data."""
+        temps = redox_utils.get_debye_temps(["mp-5", "mp-99"])
+        self.assertEqual(temps, {"mp-5": None, "mp-99": None})
+        debye_cache.clear()
+        self.assertIsNone(debye_cache.get("mp-5", "missing"))
+        self.assertEqual(debye_cache.get("mp-99", "missing"), "missing")
+        redox_utils.get_debye_temps(["mp-5", "mp-99"])
+        self.assertEqual(self.mp.queries, [["mp-5", "mp-99"], ["mp-99"]])
+
+    def test_merge(self):
+        """Keep the values added to the file by other processes."""
+        debye_cache.update({"mp-1": 500.0})
+        with open(debye_cache.path) as f:
+            temps = json.load(f)
+        temps["mp-2"] = 600.0
+        with open(debye_cache.path, "w") as f:
+            json.dump(temps, f)
+        debye_cache.update({"mp-3": None})
+        debye_cache.clear()
+        self.assertEqual([debye_cache.get(f"mp-{i}", "missing") for i in range(1, 5)], [500.0, 600.0, None, "missing"])
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork", "the processes must inherit the path")
+    def test_processes(self):
+        """Keep the values added by processes that update the file at the same time."""
+        processes = [multiprocessing.Process(target=add_temps, args=(worker,)) for worker in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        with open(debye_cache.path) as f:
+            self.assertEqual(len(json.load(f)), 4 * 20)
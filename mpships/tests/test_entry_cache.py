@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.redox_thermo_csp.entry_cache`."""
+
+
+import itertools
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pymatgen.entries.computed_entries import ComputedEntry
+
+from mpships.redox_thermo_csp.entry_cache import entry_cache
+
+FORMULAS = ["O2", "O8", "SrO", "CaO", "FeO", "Fe2O3", "MnO2", "SrFeO3", "Sr8Fe8O24", "Sr8Fe8O20", "CaMnO3",
+            "Ca4Sr4Mn4Fe4O24", "Sr", "Fe"]
+
+
+class FakeMP:
+    """entries of all chemical systems in FORMULAS, counts the queries"""
+
+    def __init__(self):
+        self.entries = [ComputedEntry(f, -len(f), entry_id=f"mp-{i}") for i, f in enumerate(FORMULAS)]
+        self.queries = []
+
+    def get_entries_in_chemsys(self, elements):
+        self.queries.append(entry_cache.chemsys(elements))
+        return [e for e in self.entries if {el.symbol for el in e.composition.elements} <= set(elements)]
+
+
+class TestEntryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.mp = FakeMP()
+        self.patches = [
+            mock.patch.object(entry_cache, "directory", self.tmp_dir.name),
+            mock.patch.object(entry_cache, "_query", self.mp.get_entries_in_chemsys),
+        ]
+        for patch in self.patches:
+            patch.start()
+        entry_cache.clear()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        entry_cache.clear()
+        self.tmp_dir.cleanup()
+
+    def ids(self, entries):
+        return sorted(e.entry_id for e in entries)
+
+    def test_superset(self):
+        """Answer the subsystems of a solid solution from its chemical system with one query."""
+        entry_cache.get_entries(["Ca", "Sr", "Mn", "Fe", "O"])
+        for a, b in itertools.product(["Ca", "Sr"], ["Mn", "Fe"]):
+            self.assertEqual(
+                self.ids(entry_cache.get_entries([a, b, "O"])),
+                self.ids(self.mp.get_entries_in_chemsys([a, b, "O"])),
+            )
+        self.assertEqual(len(self.mp.queries), 1 + 4)  # the last 4 for the comparison above
+
+    def test_disk(self):
+        """Keep the entries across processes."""
+        entries = entry_cache.get_entries(["Sr", "Fe", "O"])
+        entry_cache.clear()
+        self.assertEqual(self.ids(entry_cache.get_entries(["Fe", "O", "Sr"])), self.ids(entries))
+        fe_o = self.ids(FakeMP().get_entries_in_chemsys(["Fe", "O"]))
+        self.assertEqual(self.ids(entry_cache.get_entries(["Fe", "O"])), fe_o)
+        self.assertEqual(self.mp.queries, ["Fe-O-Sr"])
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["Fe-O-Sr.json.gz"])
+
+    def test_disk_index(self):
+        """List the directory only once while it is unchanged, and not at all for the file of the exact system."""
+        for system in (["Sr", "Fe", "O"], ["Ca", "Mn", "O"]):
+            entry_cache.get_entries(system)
+        entry_cache.clear()
+        with mock.patch("os.listdir", wraps=os.listdir) as listdir:
+            entry_cache.get_entries(["Fe", "O"])
+            entry_cache.clear()
+            entry_cache.get_entries(["Mn", "O"])
+            entry_cache.clear()
+            self.assertEqual(listdir.call_count, 1)
+            entry_cache.get_entries(["Ca", "Sr", "O"])  # new file
+            entry_cache.clear()
+            entry_cache.get_entries(["Sr", "O"])
+            self.assertEqual(listdir.call_count, 2)
+        self.assertEqual(self.mp.queries, ["Fe-O-Sr", "Ca-Mn-O", "Ca-O-Sr"])
+
+    def test_max_age(self):
+        entry_cache.get_entries(["Sr", "Fe", "O"])
+        entry_cache.clear()
+        with mock.patch.object(entry_cache, "max_age", -1):
+            entry_cache.get_entries(["Sr", "Fe", "O"])
+        self.assertEqual(self.mp.queries, ["Fe-O-Sr", "Fe-O-Sr"])
+
+    def test_unwritable(self):
+        """Work without the files if the directory cannot be written."""
+        with mock.patch.object(entry_cache, "directory", os.path.join(self.tmp_dir.name, "file", "dir")):
+            open(os.path.join(self.tmp_dir.name, "file"), "w").close()
+            self.assertEqual(len(entry_cache.get_entries(["Sr", "O"])), 4)  # O2, O8, SrO, Sr
+        self.assertEqual(self.mp.queries, ["O-Sr"])
+
+
+class TestMostStable(unittest.TestCase):
+    """Tests for the lookups of the most stable entries used by redox_utils."""
+
+    FORMULAS = {
+        "O2": -5.0, "O8": -21.0, "Sr": -1.6, "Ca": -1.9, "Mn": -9.0, "Fe": -8.4,
+        "SrMnO3": -38.0, "Sr2Mn2O5": -67.0, "CaMnO3": -39.0, "Ca2Mn2O5": -68.0,
+        "SrFeO3": -34.0, "Sr2Fe2O5": -63.0, "CaFeO3": -35.0, "Ca2Fe2O5": -64.0,
+        "CaSrMnFeO6": -73.5, "CaSrMnFeO5": -66.0,
+    }
+
+    def setUp(self):
+        self.mp = FakeMP()
+        # a less stable polymorph of every compound, listed first
+        self.mp.entries = [ComputedEntry(f, e + 1, entry_id=f"mp-{i}-b") for i, (f, e) in enumerate(self.FORMULAS.items())]
+        self.mp.entries += [ComputedEntry(f, e, entry_id=f"mp-{i}") for i, (f, e) in enumerate(self.FORMULAS.items())]
+        self.patches = [
+            mock.patch.object(entry_cache, "directory", None),
+            mock.patch.object(entry_cache, "_query", self.mp.get_entries_in_chemsys),
+        ]
+        for patch in self.patches:
+            patch.start()
+        entry_cache.clear()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        entry_cache.clear()
+
+    def test_index(self):
+        elements = ["Sr", "Fe", "O"]
+        entries = self.mp.get_entries_in_chemsys(elements)
+        most_stable = entry_cache.get_most_stable(elements)
+        for formula in ["SrFeO3", "Sr8Fe8O24", "Sr32Fe32O80", "Fe", "O2"]:
+            reduced = entry_cache.reduced_formula(formula)
+            expected = min((e for e in entries if e.composition.reduced_formula == reduced), key=lambda e: e.energy_per_atom)
+            self.assertIs(most_stable[reduced], expected)
+        self.assertEqual(most_stable["O2"].composition.formula, "O8")
+        self.assertEqual(entry_cache.get_oxygen(elements).composition.formula, "O2")
+        self.assertEqual(entry_cache.get_oxygen(elements).entry_id, "mp-0")
+
+    def test_most_stable_entry(self):
+        """Answer the lookups of the endmembers from the chemical system of the solid solution."""
+        from mpships.redox_thermo_csp.redox_utils import most_stable_entry
+        entry_cache.get_entries(["Ca", "Sr", "Mn", "Fe", "O"])
+        self.assertEqual(most_stable_entry(["Sr", "Fe", "O"], "Sr8Fe8O24").entry_id, "mp-10")
+        self.assertEqual(most_stable_entry(["Ca", "Mn", "O"], "Ca32Mn32O80").entry_id, "mp-9")
+        with self.assertRaises(IndexError):
+            most_stable_entry(["Sr", "Fe", "O"], "Sr8Fe8O22")
+        self.assertEqual(self.mp.queries, ["Ca-Fe-Mn-O-Sr"])
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+"""Tests for the import time of the `mpships` package."""
+
+
+import json
+import subprocess
+import sys
+import unittest
+
+# seconds for `import mpships` in a fresh interpreter, without the interpreter start-up
+IMPORT_TIME_BUDGET = 0.2
+
+# dependencies of the app components, which must not be imported by `import mpships`
+HEAVY_MODULES = ["crystal_toolkit", "dash", "mp_api", "pymatgen", "altair", "dash_vega_components", "scipy"]
+
+
+def import_mpships():
+    """import mpships in a fresh interpreter, returns the import time and the imported modules"""
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import mpships\n"
+        "print(json.dumps([time.perf_counter() - start, sorted(sys.modules)]))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, text=True).stdout
+    return json.loads(output)
+
+
+class TestImportTime(unittest.TestCase):
+    """`import mpships` does not load the app components."""
+
+    def test_import_time_budget(self):
+        # best of three runs, to not fail on a busy machine
+        import_time = min(import_mpships()[0] for _ in range(3))
+        self.assertLess(import_time, IMPORT_TIME_BUDGET)
+
+    def test_no_heavy_imports(self):
+        modules = import_mpships()[1]
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_lazy_attributes(self):
+        import mpships
+
+        self.assertIn("RedoxThermoCSPAIO", dir(mpships))
+        with self.assertRaises(AttributeError):
+            mpships.NotAComponent
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.redox_thermo_csp.isograph_data`."""
+
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from mpships.redox_thermo_csp.isograph_data import isograph_data
+
+
+def contribution(i):
+    """contribution of a made-up material with the structure of the redox_thermo_csp project"""
+    return {"data": {
+        "phases": {"oxidized": {"composition": f"Sr{i}FeO3", "mpid": f"mp-{i}"},
+                   "reduced": {"composition": f"Sr{i}FeO2.5", "mpid": f"mp-{i + 100}"}},
+        "theoretical": {"composition": f"Sr{i}Fe1Ox", "tolerance": {"value": 0.9}, "active": {"value": 1.0},
+                        "ΔH": {"min": {"value": 80.0}, "max": {"value": 160.0}},
+                        "elastic": {"tensors": "True", "debye": {"brownmillerite": {"value": 450.0},
+                                                                 "perovskite": {"value": 500.0}}}},
+        "solution": "Dilute_Species", "availability": "Theoretical", "updated": "2018-07-20",
+    }}
+
+
+def dataset(n, version="v1"):
+    return {"fields": ["data.solution"], "data": [contribution(i) for i in range(n)], "version": version}
+
+
+class TestIsographData(unittest.TestCase):
+    """Tests for the lazy loading of the isograph contributions."""
+
+    def setUp(self):
+        isograph_data._dataset = None
+        isograph_data._loaded_at = None
+        isograph_data._refresh_thread = None
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_path = mock.patch.object(
+            isograph_data, "snapshot_path", os.path.join(self.tmp_dir.name, "snapshot.bin")
+        )
+        self.snapshot_path.start()
+
+    def tearDown(self):
+        thread = isograph_data._refresh_thread
+        if thread is not None:
+            thread.join()
+        self.snapshot_path.stop()
+        self.tmp_dir.cleanup()
+
+    def test_first_use(self):
+        """Download on first use and keep the copy."""
+        with mock.patch.object(isograph_data, "fetch", return_value=dataset(2)) as fetch:
+            self.assertEqual(len(isograph_data.table()), 2)
+            self.assertEqual(len(isograph_data.table()), 2)
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_stale_while_revalidate(self):
+        """Return the old copy while downloading a new one in the background."""
+        release = threading.Event()
+
+        def slow_fetch(version=None):
+            release.wait(5)
+            return dataset(3)
+
+        with mock.patch.object(isograph_data, "fetch", return_value=dataset(2)):
+            isograph_data.get()
+        with mock.patch.object(isograph_data, "fetch", side_effect=slow_fetch), \
+                mock.patch.object(isograph_data, "max_age", -1):
+            self.assertEqual(len(isograph_data.table()), 2)
+            release.set()
+            isograph_data._refresh_thread.join()
+        self.assertEqual(len(isograph_data.table()), 3)
+
+    def test_failed_refresh(self):
+        """Keep the last good copy if a download fails."""
+        with mock.patch.object(isograph_data, "fetch", return_value=dataset(2)):
+            isograph_data.get()
+        with mock.patch.object(isograph_data, "fetch", side_effect=ConnectionError):
+            self.assertFalse(isograph_data.refresh())
+        self.assertEqual(len(isograph_data.table()), 2)
+
+    def test_offline(self):
+        """Return an empty dataset without any copy and try again on the next use."""
+        with mock.patch.object(isograph_data, "fetch", side_effect=ConnectionError):
+            self.assertTrue(isograph_data.table().empty)
+        with mock.patch.object(isograph_data, "fetch", return_value=dataset(1)):
+            self.assertEqual(len(isograph_data.table()), 1)
+
+    def test_snapshot_round_trip(self):
+        isograph_data.save_snapshot(dataset(3))
+        snapshot = isograph_data.load_snapshot()
+        snapshot["data"] = list(snapshot["data"])
+        self.assertEqual(snapshot, dataset(3))
+        # decompressed in blocks that end within the contributions
+        isograph_data.save_snapshot(dataset(200))
+        with mock.patch.object(isograph_data._decompressed_lines, "__defaults__", (64,)):
+            self.assertEqual(list(isograph_data.load_snapshot()["data"]), dataset(200)["data"])
+
+    def test_snapshot_format_version(self):
+        """Ignore snapshots of other formats."""
+        isograph_data.save_snapshot(dataset(3))
+        with mock.patch.object(isograph_data, "FORMAT_VERSION", isograph_data.FORMAT_VERSION + 1):
+            self.assertIsNone(isograph_data.load_snapshot())
+
+    def test_start_from_snapshot(self):
+        """Use the snapshot without downloading at start, then only check the version."""
+        isograph_data.save_snapshot(dataset(3))
+        with mock.patch.object(isograph_data, "fetch", side_effect=ConnectionError) as fetch:
+            self.assertEqual(len(isograph_data.table()), 3)
+        fetch.assert_not_called()
+        with mock.patch.object(isograph_data, "fetch", return_value=None) as fetch:
+            self.assertTrue(isograph_data.refresh())
+        fetch.assert_called_once_with(version="v1")
+        self.assertEqual(len(isograph_data.table()), 3)
+
+    def test_new_version(self):
+        """Replace the copy and the snapshot if the version has changed."""
+        isograph_data.save_snapshot(dataset(3))
+        isograph_data.get()
+        with mock.patch.object(isograph_data, "fetch", return_value=dataset(4, version="v2")):
+            self.assertTrue(isograph_data.refresh())
+        self.assertEqual(len(isograph_data.table()), 4)
+        self.assertEqual(isograph_data.load_snapshot()["version"], "v2")
+
+    def test_table(self):
+        """Convert the contributions into a typed table."""
+        contributions = dataset(3)["data"]
+        del contributions[1]["data"]["phases"]["reduced"]["composition"]
+        table = isograph_data.to_table(contributions)
+        self.assertEqual(list(table.columns), [column for column, _, _ in isograph_data.COLUMNS])
+        self.assertEqual(str(table["Theoretical Composition"].dtype), "category")
+        self.assertEqual(str(table["Theoretical ΔH Max (kJ/mol)"].dtype), "float64")
+        self.assertEqual(list(table["Reduced Composition"]), ["Sr0FeO2.5", "-", "Sr2FeO2.5"])
+        self.assertEqual(table["Debye Temp Perovskite"].sum(), 1500.0)
+
+    def test_shared(self):
+        """Map the columns of the table written by another worker."""
+        with mock.patch.object(isograph_data, "shared_dir", os.path.join(self.tmp_dir.name, "shared")):
+            table = isograph_data.to_table(dataset(3)["data"])
+            isograph_data.save_shared({"fields": [], "version": "v1", "table": table})
+            shared = isograph_data.load_shared()
+            self.assertEqual(shared["table"].to_dict("records"), table.to_dict("records"))
+            self.assertEqual(list(shared["table"].dtypes), list(table.dtypes))
+            self.assertIsInstance(shared["table"]["Theoretical ΔH Min (kJ/mol)"].values, np.memmap)
+            with mock.patch.object(isograph_data, "fetch", side_effect=ConnectionError) as fetch:
+                self.assertEqual(len(isograph_data.table()), 3)
+            fetch.assert_not_called()
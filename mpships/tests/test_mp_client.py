@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.mp_client` against a local stand-in for the MP API."""
+
+
+import collections
+import json
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from mpships.mp_client import CircuitOpen, DeadlineExceeded, ResilientClient
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Answers GET requests after a delay, the delays of the next requests can be queued, /fail returns 500,
+    /missing returns 404"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.delay = 0.0
+        self.delays = collections.deque()
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+            delay = self.server.delays.popleft() if self.server.delays else self.server.delay
+        time.sleep(delay)
+        if self.path == "/fail":
+            self.send_error(500)
+            return
+        if self.path == "/missing":
+            self.send_error(404)
+            return
+        body = json.dumps({"path": self.path, "delay": delay}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LocalAPI:
+    """client of the stand-in server"""
+
+    def __init__(self, url):
+        self.url = url
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=10) as resp:
+            return json.loads(resp.read())
+
+
+class TestResilientClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api = LocalAPI(f"http://127.0.0.1:{self.server.server_address[1]}")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def client(self, **kwargs):
+        kwargs.setdefault("deadline", 0.3)
+        kwargs.setdefault("hedge_quantile", None)
+        return ResilientClient(self.api, **kwargs)
+
+    def timed(self, fun, *args):
+        start = time.perf_counter()
+        try:
+            return fun(*args), time.perf_counter() - start
+        except Exception as e:
+            return e, time.perf_counter() - start
+
+    def test_deadline(self):
+        self.server.delay = 2.0
+        result, seconds = self.timed(self.client().get, "/materials")
+        self.assertIsInstance(result, DeadlineExceeded)
+        self.assertLess(seconds, 0.6)
+
+    def test_cached_fallback(self):
+        """Return the most recent response of the same call if the API is slow."""
+        client = self.client()
+        self.assertEqual(client.get("/materials")["path"], "/materials")
+        self.server.delay = 2.0
+        result, seconds = self.timed(client.get, "/materials")
+        self.assertEqual(result["path"], "/materials")
+        self.assertLess(seconds, 0.6)
+        self.assertIsInstance(self.timed(client.get, "/other")[0], DeadlineExceeded)
+
+    def test_circuit_breaker(self):
+        """Stop calling the API after failures in a row."""
+        client = self.client(failure_threshold=2, reset_timeout=0.5)
+        for _ in range(2):
+            self.assertIsInstance(self.timed(client.get, "/fail")[0], Exception)
+        self.assertEqual(client.breaker.state, "open")
+        requests = self.server.requests
+        self.assertIsInstance(self.timed(client.get, "/materials")[0], CircuitOpen)
+        self.assertEqual(self.server.requests, requests)
+        time.sleep(0.5)
+        self.assertEqual(client.get("/materials")["path"], "/materials")  # trial call closes the circuit
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_client_errors(self):
+        """Errors of the call itself are raised and do not open the circuit."""
+        client = self.client(failure_threshold=2)
+        for _ in range(3):
+            with self.assertRaises(urllib.error.HTTPError):
+                client.get("/missing")
+        self.assertEqual(client.breaker.state, "closed")
+        self.assertEqual(client.breaker.failures, 0)
+
+    def test_hedging(self):
+        """Send a second request if the first one is slower than usual."""
+        client = self.client(deadline=3.0, hedge_quantile=0.9, hedge_min_samples=5, hedge_methods=["get"])
+        self.server.delay = 0.01
+        for _ in range(5):
+            client.get("/materials")
+        self.server.delays.extend([2.0, 0.0])
+        requests = self.server.requests
+        result, seconds = self.timed(client.get, "/materials")
+        self.assertEqual(result["delay"], 0.0)
+        self.assertLess(seconds, 1.0)
+        self.assertEqual(self.server.requests - requests, 2)
+
+    def test_hedging_opt_in(self):
+        """Only send the methods listed in hedge_methods a second time."""
+        client = self.client(deadline=3.0, hedge_quantile=0.9, hedge_min_samples=5, hedge_methods=["post"])
+        self.server.delay = 0.01
+        for _ in range(5):
+            client.get("/materials")
+        self.server.delays.extend([0.5, 0.0])
+        requests = self.server.requests
+        self.assertEqual(client.get("/materials")["delay"], 0.5)
+        self.assertEqual(self.server.requests - requests, 1)
+
+    def test_hedging_per_method(self):
+        """Hedge at the latencies of the method, not of the cheap calls of other methods."""
+        client = self.client(deadline=3.0, hedge_quantile=0.9, hedge_min_samples=5, hedge_methods=["get", "slow"])
+        self.server.delay = 0.01
+        for _ in range(5):
+            client.get("/materials")
+        self.assertIsNone(client._hedge_delay("LocalAPI.slow"))
+        self.assertIsNotNone(client._hedge_delay("LocalAPI.get"))
+
+    def test_degraded_latency_bounded(self):
+        """The latency of all calls is bounded by the deadline when the API is degraded."""
+        client = self.client(deadline=0.2, failure_threshold=100)
+        self.server.delays.extend([0.0, 1.0] * 10)
+        latencies = [self.timed(client.get, "/materials")[1] for _ in range(20)]
+        self.assertLess(max(latencies), 0.5)
+
+    def test_attributes(self):
+        """Wrap attributes of the client like the client itself."""
+        client = self.client()
+        self.assertEqual(client.url, self.api.url)
+        self.assertEqual(client.with_deadline(1.0).get("/x")["path"], "/x")
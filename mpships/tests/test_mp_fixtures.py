@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.mp_fixtures`, the local stand-in for the Materials Project and MPContribs APIs."""
+
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from pymatgen.core import Lattice, Structure
+from pymatgen.entries.computed_entries import ComputedEntry
+
+from mpships import mp_client, mp_fixtures
+from mpships.contribs_query import query_all_contributions
+from mpships.redox_thermo_csp import redox_utils
+from mpships.redox_thermo_csp.debye_cache import debye_cache
+from mpships.redox_thermo_csp.entry_cache import entry_cache
+from mpships.redox_thermo_csp.isograph_data import isograph_data
+
+CIF = Structure(
+    Lattice.cubic(3.9), ["Sr", "Ti", "O", "O", "O"],
+    [[0, 0, 0], [0.5, 0.5, 0.5], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5]],
+).to(fmt="cif")
+TENSOR = [[300, 100, 100, 0, 0, 0], [100, 300, 100, 0, 0, 0], [100, 100, 300, 0, 0, 0],
+          [0, 0, 0, 100, 0, 0], [0, 0, 0, 0, 100, 0], [0, 0, 0, 0, 0, 100]]
+
+
+def fixtures(n_contributions=250):
+    """entries of Sr-Fe-O, two materials, summary documents and the contributions of two projects"""
+    formulas = {"O2": -4.9, "Sr": -1.6, "Fe": -8.4, "SrO": -12.0, "Sr8Fe8O24": -272.0, "Sr32Fe32O80": -1009.6}
+    return {
+        "entries": [ComputedEntry(f, e, entry_id=f"mp-{i}") for i, (f, e) in enumerate(formulas.items())],
+        "materials": {
+            "mp-4": {"task_id": "mp-4", "cif": CIF, "elasticity": {"elastic_tensor": TENSOR}},
+            "mp-5": {"task_id": "mp-5", "cif": CIF, "elasticity": {"elastic_tensor": None}},
+        },
+        "summary": [
+            {"material_id": "mp-2", "chemsys": "Fe", "formula_pretty": "Fe"},
+            {"material_id": "mp-3", "chemsys": "O-Sr", "formula_pretty": "SrO"},
+        ],
+        "projects": {
+            "redox_thermo_csp": {
+                "project": {"name": "redox_thermo_csp", "columns": [
+                    {"path": "data.theoretical.composition"}, {"path": "data.phases.oxidized.mpid"},
+                ]},
+                "contributions": [
+                    {"data": {"theoretical": {"composition": f"Sr1Fe{i}Ox"}, "phases": {"oxidized": {"mpid": "mp-4"}},
+                              "other": i}}
+                    for i in range(n_contributions)
+                ],
+            },
+            "redox_thermo_csp_energy": {
+                "project": {"name": "redox_thermo_csp_energy", "columns": [{"path": "data.id"}]},
+                "contributions": [{"data": {"id": f"AS_{t}", "TOx": t}} for t in (500.0, 600.0, 600.0)],
+            },
+        },
+    }
+
+
+class TestFakeRester(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rester = mp_fixtures.FakeRester(fixtures(), page_size=100)
+        mp_fixtures.install(self.rester, hedge_quantile=None)
+        self.patches = [
+            mock.patch.object(entry_cache, "directory", None),
+            mock.patch.object(debye_cache, "path", os.path.join(self.tmp_dir.name, "debye_temps.json")),
+        ]
+        for patch in self.patches:
+            patch.start()
+        entry_cache.clear()
+        debye_cache.clear()
+
+    def tearDown(self):
+        mp_fixtures.uninstall()
+        for patch in self.patches:
+            patch.stop()
+        entry_cache.clear()
+        debye_cache.clear()
+        self.tmp_dir.cleanup()
+
+    def test_find_structures(self):
+        perovskite, perovskite_data, brownmillerite, brownmillerite_data = redox_utils.find_structures("Sr1Fe1Ox")
+        self.assertEqual((perovskite, brownmillerite), ("Sr8Fe8O24", "Sr32Fe32O80"))
+        self.assertEqual((perovskite_data.entry_id, brownmillerite_data.entry_id), ("mp-4", "mp-5"))
+        self.assertEqual(self.rester.calls, 1)
+
+    def test_debye_temps(self):
+        self.assertAlmostEqual(redox_utils.get_debye_temp("mp-4"), 639.45, places=1)
+        temps = redox_utils.get_debye_temps(["mp-4", "mp-5", "mp-6"])
+        self.assertEqual(temps["mp-5"], None)
+        self.assertEqual(temps["mp-6"], None)
+
+    def test_contributions(self):
+        mpr = redox_utils.get_mpr()
+        query = {"project": "redox_thermo_csp"}
+        self.assertEqual(mpr.contribs.get_totals(query=query), (250, 3))
+        resp = query_all_contributions(mpr.contribs, query, ["data.theoretical.composition"], per_page=100)
+        self.assertEqual([c["data"]["theoretical"]["composition"] for c in resp["data"]],
+                         [f"Sr1Fe{i}Ox" for i in range(250)])
+        # pages larger than the page size of the server are cut
+        with self.assertLogs("mpships.contribs_query", "WARNING"):
+            resp = query_all_contributions(mpr.contribs, query, ["data.other"], per_page=200)
+        self.assertEqual(len(resp["data"]), 200)
+
+        resp = mpr.contribs.query_contributions(
+            query={"project": "redox_thermo_csp_energy", "data__id__exact": "AS_600.0"}, fields=["data.TOx"]
+        )
+        self.assertEqual(resp["data"], [{"data": {"TOx": 600.0}}] * 2)
+
+    def test_isograph_data(self):
+        self.rester.contribs.page_size = None  # fetch requests pages of 500
+        dataset = isograph_data.fetch()
+        self.assertEqual(dataset["fields"], ["data.theoretical.composition", "data.phases.oxidized.mpid"])
+        self.assertEqual(len(dataset["data"]), 250)
+        self.assertIsNone(isograph_data.fetch(version=dataset["version"]))
+        table = isograph_data.to_table(dataset["data"])
+        self.assertEqual(table["Oxidized mp-id"].unique().tolist(), ["mp-4"])
+
+    def test_summary(self):
+        docs = mp_client.resilient_client("mp_api", None).materials.summary.search(chemsys="Sr-O")
+        self.assertEqual([doc.model_dump()["formula_pretty"] for doc in docs], ["SrO"])
+
+    def test_fixture_file(self):
+        """Use the fixtures from a file in new clients when MPSHIPS_MP_FIXTURES is set."""
+        path = os.path.join(self.tmp_dir.name, "fixtures.json.gz")
+        mp_fixtures.save_fixtures(fixtures(), path)
+        mp_fixtures.uninstall()
+
+        def factory():
+            raise AssertionError("the real client must not be created")
+
+        with mock.patch.object(mp_client, "FIXTURES", path):
+            mpr = mp_client.resilient_client("mp_web", factory)
+        self.assertEqual([e.entry_id for e in mpr.get_entries_in_chemsys(["Sr", "O"])], ["mp-0", "mp-1", "mp-3"])
+        self.assertEqual(mpr.get_data("mp-4")[0]["elasticity"]["elastic_tensor"], TENSOR)
+
+
+class TestFixtureServer(unittest.TestCase):
+
+    def test_http(self):
+        with mp_fixtures.FixtureServer(fixtures(), latency=0.05, page_size=50) as server:
+            client = mp_fixtures.HTTPRester(server.url)
+            entries = client.get_entries_in_chemsys(["Sr", "Fe", "O"])
+            self.assertEqual([e.entry_id for e in entries], [f"mp-{i}" for i in range(6)])
+            self.assertIsInstance(entries[0], ComputedEntry)
+            self.assertEqual(
+                client.query(criteria={"task_id": {"$in": ["mp-4", "mp-9"]}}, properties=["task_id", "cif"]),
+                [{"task_id": "mp-4", "cif": CIF}],
+            )
+            self.assertEqual(client.materials.summary.search(chemsys=["Fe"])[0].model_dump()["material_id"], "mp-2")
+            with self.assertRaises(RuntimeError):
+                client.contribs.get_project(name="unknown")
+
+            # 5 pages with a latency of 0.05 s each, requested at the same time
+            start = time.perf_counter()
+            resp = query_all_contributions(client.contribs, {"project": "redox_thermo_csp"}, ["data.other"],
+                                           per_page=50, max_workers=5)
+            self.assertLess(time.perf_counter() - start, 5 * 0.05)
+            self.assertEqual([c["data"]["other"] for c in resp["data"]], list(range(250)))
+            self.assertEqual(server.rester.calls, 4 + 1 + 5)  # the calls above, get_totals and the pages
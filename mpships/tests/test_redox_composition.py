@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.redox_thermo_csp.redox_composition` and the composition helpers of `redox_utils`."""
+
+
+import unittest
+
+import pandas as pd
+
+from mpships.redox_thermo_csp import redox_utils
+from mpships.redox_thermo_csp.redox_composition import A_SITE_CHARGES, SITES, ParsedComposition, parse_composition
+
+
+class TestParseComposition(unittest.TestCase):
+
+    def test_solid_solution(self):
+        parsed = parse_composition("Ca0.3Sr0.7Mn0.5Fe0.5Ox")
+        self.assertEqual(parsed.a_site, (("Ca", 0.3), ("Sr", 0.7)))
+        self.assertEqual(parsed.b_site, (("Mn", 0.5), ("Fe", 0.5)))
+        self.assertEqual(parsed.chemical_system, ("Ca", "Sr", "Mn", "Fe", "O"))
+        self.assertEqual(parsed.perovskite, "Ca2Sr5Mn4Fe4O24")
+        self.assertEqual(parsed.brownmillerite, "Ca9Sr22Mn16Fe16O80")
+
+    def test_stoichiometries_of_one(self):
+        for compstr in ["SrFeOx", "Sr1Fe1Ox"]:
+            parsed = parse_composition(compstr)
+            self.assertEqual(parsed.canonical, "Sr1Fe1Ox")
+            self.assertEqual(parsed.display, "SrFeOx")
+            self.assertEqual(parsed.sites, (("Sr", 1.0), None, ("Fe", 1.0), None))
+            self.assertEqual(parsed.perovskite, "Sr8Fe8O24")
+        self.assertEqual(redox_utils.add_comp_one("Sr0.5Ca0.5FeOx"), "Sr0.5Ca0.5Fe1Ox")
+        self.assertEqual(redox_utils.remove_comp_one("Sr0.5Ca0.5Fe1Ox"), "Sr0.5Ca0.5FeOx")
+
+    def test_sites(self):
+        """Lanthanoids on the A site, other species than alkali, alkaline earth and transition metals on none."""
+        self.assertEqual(parse_composition("La1Co1Ox").sites, (("La", 1.0), None, ("Co", 1.0), None))
+        self.assertEqual(parse_composition("Na0.5Bi0.5Ti1Ox").sites, (("Na", 0.5), None, ("Ti", 1.0), None))
+        self.assertEqual(parse_composition("Na0.5Bi0.5Ti1Ox").perovskite, "Na4Bi4Ti8O24")
+
+    def test_memoized(self):
+        parsed = parse_composition("Sr1Mn1Ox")
+        self.assertIs(parse_composition("Sr1Mn1Ox"), parsed)
+        with self.assertRaises(AttributeError):
+            parsed.canonical = "Ca1Mn1Ox"
+        with self.assertRaises(AttributeError):
+            parsed.other = None
+        self.assertIsInstance(parsed, ParsedComposition)
+
+    def test_split_comp(self):
+        """split_comp returns new lists, which callers may change without changing the parsed composition."""
+        am_1, am_2, tm_1, tm_2 = redox_utils.split_comp("Ca0.3Sr0.7Mn0.5Fe0.5Ox")
+        self.assertEqual([am_1, am_2, tm_1, tm_2], [["Ca", 0.3], ["Sr", 0.7], ["Mn", 0.5], ["Fe", 0.5]])
+        tm_1[0] = "Co"
+        self.assertEqual(redox_utils.split_comp("Ca0.3Sr0.7Mn0.5Fe0.5Ox")[2], ["Mn", 0.5])
+
+    def test_find_endmembers(self):
+        self.assertEqual(
+            redox_utils.find_endmembers("Ca0.3Sr0.7Mn0.5Fe0.5Ox"),
+            ("Ca1Mn1O", "Sr1Mn1O", "Ca1Fe1O", "Sr1Fe1O", 0.3, 0.7),
+        )
+        self.assertEqual(redox_utils.find_endmembers("Sr1Fe1Ox"), ("Sr1Fe1O", "Sr1Fe1O", "Sr1Fe1O", "Sr1Fe1O", 1.0, 0))
+
+
+class TestFindActive(unittest.TestCase):
+
+    COMPOSITIONS = [
+        "Sr1Fe1Ox", "Ca0.5Sr0.5Mn0.5Fe0.5Ox", "La1Co1Ox", "Sr1Co0.5Cu0.5Ox", "La1Ni0.5Ag0.5Ox", "K1Nb1Ox",
+        "Sr1Ti0.5Mn0.5Ox", "Sr1Mn0.5Ti0.5Ox", "Sr1Cu0.2Co0.8Ox", "Ce1Ti1Ox", "Sr1Zn1Ox", "La0.5Sr0.5Mn0.5Fe0.5Ox",
+        "Xx1Fe1Ox",
+    ]
+
+    def test_species_table(self):
+        self.assertEqual([SITES[s] for s in ["Sr", "K", "La", "Ce", "Fe", "Y"]], ["A", "A", "A", "A", "B", "B"])
+        self.assertNotIn("Bi", SITES)
+        self.assertEqual([A_SITE_CHARGES[s] for s in ["K", "Sr", "La", "Bi", "Ce"]], [1, 2, 3, 3, 4])
+
+    def test_find_active(self):
+        self.assertEqual(redox_utils.find_active(redox_utils.split_comp("Ca0.5Sr0.5Mn0.5Fe0.5Ox")), ("Fe", 0.5))
+        self.assertEqual(redox_utils.find_active(redox_utils.split_comp("Sr1Co0.5Cu0.5Ox")), ("Cu", 0.5))
+        with self.assertRaises(ValueError):
+            redox_utils.find_active(redox_utils.split_comp("Ce1Ti1Ox"))
+
+    def test_find_active_column(self):
+        """Same results as find_active for each composition."""
+        compstrs = pd.Series(self.COMPOSITIONS, index=range(10, 10 + len(self.COMPOSITIONS)))
+        active = redox_utils.find_active_column(compstrs)
+        self.assertEqual(list(active.index), list(compstrs.index))
+        for compstr, (_, row) in zip(compstrs, active.iterrows()):
+            try:
+                expected = redox_utils.find_active(redox_utils.split_comp(compstr))
+            except ValueError:
+                self.assertTrue(row.isna().all(), compstr)
+            else:
+                self.assertEqual((row["Active Species"], row["Active"]), expected, compstr)
+        self.assertEqual(active["Active Species"].notna().sum(), 9)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.redox_thermo_csp.redox_views`."""
+
+
+import unittest
+
+import numpy as np
+
+from mpships.redox_thermo_csp.redox_views import Isographs, adaptive_sampling, compare_isographs
+
+
+class TestAdaptiveSampling(unittest.TestCase):
+    """Tests for the adaptive sampling of the theoretical isographs."""
+
+    def test_budget(self):
+        """Never evaluate the function more often than the point budget."""
+        calls = []
+
+        def step(x):
+            calls.append(x)
+            return 0.5 / (1 + np.exp(-(x - 1000) / 20))
+
+        x, y = adaptive_sampling(step, 500, 1800, budget=25)
+        self.assertEqual(len(calls), 25)
+        self.assertEqual(len(x), len(y))
+        self.assertEqual(x, sorted(x))
+        self.assertEqual((x[0], x[-1]), (500, 1800))
+
+    def test_refine_steep_region(self):
+        """Most of the refined points are placed around the step."""
+        x, _ = adaptive_sampling(lambda x: 0.5 / (1 + np.exp(-(x - 1000) / 20)), 500, 1800, budget=25)
+        self.assertGreater(sum(900 < xv < 1100 for xv in x), 12)
+
+    def test_straight_line(self):
+        """Straight lines are not refined beyond the coarse grid."""
+        x, _ = adaptive_sampling(lambda x: 2 * x, 0, 1, budget=25, n_coarse=9)
+        self.assertEqual(len(x), 9)
+
+    def test_missing_values(self):
+        """Points without a solution are returned as None."""
+        x, y = adaptive_sampling(lambda x: None, 0, 1, budget=25, n_coarse=5)
+        self.assertEqual(y, [None] * 5)
+
+
+def material(name, fit_type_entr):
+    """isograph parameters of a made-up perovskite with experimental data"""
+    return {'dh_min': 80., 'dh_max': 160., 'act_mat': [[], 0.4], 'td_perov': 500., 'td_brownm': 450.,
+            'compstr_disp': name, 'compstr_exp': name, 'tens_avail': True, 'last_updated': 'n.a.',
+            'experimental_data_available': True, 'fit_type_entr': fit_type_entr,
+            'fit_param_enth': {'a': 200., 'b': 100., 'c': 0.1, 'd': 20.},
+            'fit_par_ent': {'a': -20., 'b': 0.4, 'c': 0.05},
+            'fit_param_fe': {'a': 231.06, 'b': -24.3, 'c': 0.84, 'd': 0.219},
+            'delta_0': 0.05, 'delta_min': 0.05, 'delta_max': 0.3}
+
+
+class TestCompareIsographs(unittest.TestCase):
+    """The vectorized comparison gives the same isographs as the calculation for one material."""
+
+    materials = [material("A", "Dilute_Species"), material("B", "Solid_Solution")]
+
+    def assert_same(self, vec, scalar):
+        vec = np.array([np.nan if v is None else v for v in vec], dtype=float)
+        scalar = np.array([np.nan if v is None else v for v in scalar], dtype=float)
+        np.testing.assert_allclose(vec, scalar, rtol=1e-6)
+
+    def check(self, plottype, iso, rng, delt=None):
+        isographs = Isographs("A", plottype, iso, rng, n_points=10, theo_budget=9)
+        payload, x_val = isographs.prepare_limits()
+        traces, _ = compare_isographs(plottype, self.materials, payload, x_val, delt=delt)
+        # theoretical, experimental fit and interpolation for each material
+        self.assertEqual(len(traces), 3 * len(self.materials) + (plottype == "ellingham"))
+        for m, pars in enumerate(self.materials):
+            if plottype in ("dH", "dS"):
+                single = isographs.enthalpy_entropy(pars, payload, x_val)
+            elif plottype == "ellingham":
+                single = isographs.ellingham(pars, payload, x_val, delt)
+            else:
+                single = isographs.isographs(pars, payload, x_val)
+            exp_fit, exp_interp = traces[3 * m + 1], traces[3 * m + 2]
+            if plottype != "ellingham":  # the single material plot compares T to the delta range
+                self.assert_same(exp_fit["y"], single[0]["y"])
+                self.assert_same(exp_interp["y"], single[1]["y"])
+            # the theoretical data are sampled adaptively for one material, compare at the first and last point
+            theo = traces[3 * m]["y"]
+            self.assert_same([theo[0], theo[-1]], [single[2]["y"][0], single[2]["y"][-1]])
+
+    def test_isotherm(self):
+        self.check("isotherm", 1000, [-5, 1])
+
+    def test_isobar(self):
+        self.check("isobar", 0, [700, 1400])
+
+    def test_isoredox(self):
+        self.check("isoredox", 0.3, [700, 1400])
+
+    def test_enthalpy_entropy(self):
+        self.check("dH", 500, None)
+        self.check("dS", 500, None)
+
+    def test_ellingham(self):
+        self.check("ellingham", 0, [400, 1500], delt=0.3)
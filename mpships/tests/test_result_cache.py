@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.result_cache`."""
+
+
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import redis
+
+from mpships.redis_store import redis_store
+from mpships.result_cache import result_cache, single_flight
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        redis_store.r.flushall()
+        self.calls = []
+        self.version = "v1"
+
+    def cached(self, version=True):
+        @result_cache.cached("test", version=(lambda: self.version) if version else None)
+        def compute(x, y=2):
+            self.calls.append((x, y))
+            return None if x is None else {"sum": x + y}
+        return compute
+
+    def test_cached(self):
+        """Compute once for the same arguments, passed in any way."""
+        compute = self.cached()
+        self.assertEqual(compute(1), {"sum": 3})
+        self.assertEqual(compute(1, y=2), {"sum": 3})
+        self.assertEqual(compute(x=1, y=2), {"sum": 3})
+        self.assertEqual(compute(1, 3), {"sum": 4})
+        self.assertEqual(self.calls, [(1, 2), (1, 3)])
+
+    def test_shared(self):
+        """Use the results of other instances of the function (other workers)."""
+        self.cached()(1)
+        self.assertEqual(self.cached()(1), {"sum": 3})
+        self.assertEqual(len(self.calls), 1)
+
+    def test_version(self):
+        compute = self.cached()
+        compute(1)
+        self.version = "v2"
+        compute(1)
+        self.version = None  # no data, no caching
+        compute(1)
+        compute(1)
+        self.assertEqual(len(self.calls), 4)
+
+    def test_none_not_cached(self):
+        compute = self.cached(version=False)
+        compute(None)
+        compute(None)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_redis_unavailable(self):
+        compute = self.cached()
+        with mock.patch.object(redis_store.r, "mget", side_effect=redis.exceptions.ConnectionError("down")), \
+                mock.patch.object(redis_store.r, "pipeline", side_effect=redis.exceptions.ConnectionError("down")):
+            self.assertEqual(compute(1), {"sum": 3})
+        self.assertEqual(len(self.calls), 1)
+
+    def test_expiry(self):
+        self.cached()(1)
+        keys = redis_store.r.keys(f"*{result_cache.prefix}_test_*")
+        self.assertEqual(len(keys), 2)
+        for key in keys:
+            self.assertLessEqual(redis_store.r.ttl(key), result_cache.ttl)
+            self.assertGreater(redis_store.r.ttl(key), 0)
+
+    def test_ttl(self):
+        @result_cache.cached("short", ttl=60)
+        def short(x):
+            return {"x": x}
+
+        short(1)
+        for key in redis_store.r.keys(f"*{result_cache.prefix}_short_*"):
+            self.assertLessEqual(redis_store.r.ttl(key), 60)
+            self.assertGreater(redis_store.r.ttl(key), 0)
+
+    def test_coalesced(self):
+        """Compute identical concurrent calls once."""
+        @result_cache.cached("slow")
+        def slow(x):
+            self.calls.append(x)
+            time.sleep(0.2)
+            return {"x": x}
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(slow, [1] * 8 + [2] * 8))
+        self.assertEqual(results, [{"x": 1}] * 8 + [{"x": 2}] * 8)
+        self.assertEqual(sorted(self.calls), [1, 2])
+
+    def test_shared_lock(self):
+        """Wait for another worker computing the same result instead of computing it again."""
+        compute = self.cached()
+        key = result_cache.key("test", self.version, {"x": 1, "y": 2})
+        lock = redis_store.lock(key, timeout=5)
+        self.assertTrue(lock.acquire(blocking=False))
+
+        def other_worker():
+            time.sleep(0.2)
+            result_cache.set(key, {"sum": "from another worker"})
+            lock.release()
+
+        threading.Thread(target=other_worker).start()
+        self.assertEqual(compute(1), {"sum": "from another worker"})
+        self.assertEqual(self.calls, [])
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_exception(self):
+        """Raise the exception of the running call in all waiting calls."""
+        calls = []
+
+        def fail():
+            calls.append(1)
+            time.sleep(0.2)
+            raise ValueError("failed")
+
+        def call(_):
+            try:
+                single_flight.do("fail", fail)
+            except ValueError as e:
+                return str(e)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.assertEqual(list(executor.map(call, range(4))), ["failed"] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(single_flight._calls, {})
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.redox_thermo_csp.theo_pipeline`."""
+
+
+import multiprocessing
+import os
+import re
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+from mpships.redox_thermo_csp import theo_pipeline
+from mpships.redox_thermo_csp.isograph_data import isograph_data
+
+# the fake functions run in the worker processes (forked), which record their calls as files here
+CALLS_DIR = tempfile.mkdtemp()
+
+
+def record_call(kind, arg):
+    with open(os.path.join(CALLS_DIR, f"{kind}_{arg}_{uuid.uuid4().hex}"), "w"):
+        pass
+
+
+def calls(kind):
+    return sorted(name.split("_")[1] for name in os.listdir(CALLS_DIR) if name.startswith(f"{kind}_"))
+
+
+def fake_split_comp(compstr):
+    """(am_1, am_2, tm_1, tm_2) as split_comp, for the elements in the compositions of the tests"""
+    species = [[el, float(x)] for el, x in re.findall(r"([A-Z][a-z]?)([\d.]+)", compstr.split("Ox")[0])]
+    a_site = [s for s in species if s[0] in ("Sr", "Ca", "La", "Xx")]
+    b_site = [s for s in species if s not in a_site]
+    return tuple((a_site + [None, None])[:2] + (b_site + [None, None])[:2])
+
+
+def fake_theo_parameters(compstr):
+    record_call("theo", compstr)
+    if compstr.startswith("Xx"):
+        raise ValueError("unknown species")
+    b_site = fake_split_comp(compstr)[2][0]
+    return {
+        "Formula": compstr.split("O")[0] + "O3",
+        "Oxidized mp-id": f"mp-{b_site}",
+        "Oxidized Composition": compstr.split("O")[0] + "O3",
+        "Reduced mp-id": f"mp-{b_site}-red",
+        "Reduced Composition": compstr.split("O")[0] + "O2.5",
+        "Theoretical Composition": compstr,
+        "Theoretical ΔH Min (kJ/mol)": 80.0,
+        "Theoretical ΔH Max (kJ/mol)": 160.0,
+        "Solution": "Dilute_Species",
+        "Availability": "Theoretical",
+        "Last Updated": "2026-10-19",
+        "Active": 1.0,
+    }
+
+
+def fake_debye_temps(mpids, max_workers=None, executor=None):
+    temps = {}
+    for mpid in mpids:
+        record_call("debye", mpid)
+        temps[mpid] = None if mpid == "mp-Co-red" else 400.0 + len(mpid)
+    return temps
+
+
+@unittest.skipUnless(multiprocessing.get_start_method() == "fork", "the workers must inherit the fake functions")
+class TestTheoPipeline(unittest.TestCase):
+
+    COMPOSITIONS = ["Sr1Fe1Ox", "Ca1Mn1Ox", "Sr1Fe1Ox", "Ca0.5Sr0.5Mn0.5Fe0.5Ox", "Xx1Fe1Ox", "La1Co1Ox", "Sr1Mn1Ox"]
+
+    def setUp(self):
+        for name in os.listdir(CALLS_DIR):
+            os.remove(os.path.join(CALLS_DIR, name))
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.queried = []
+        self.patches = [
+            mock.patch.object(theo_pipeline, "split_comp", fake_split_comp),
+            mock.patch.object(theo_pipeline, "theo_parameters", fake_theo_parameters),
+            mock.patch.object(theo_pipeline, "get_debye_temps", fake_debye_temps),
+            mock.patch.object(theo_pipeline.entry_cache, "get_entries", lambda system: self.queried.append(system)),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp_dir.cleanup()
+
+    def run_pipeline(self, compositions):
+        return theo_pipeline.run(compositions, self.tmp_dir.name, max_workers=2, chunk_size=2)
+
+    def test_run(self):
+        records, errors = self.run_pipeline(self.COMPOSITIONS)
+        self.assertEqual(
+            [r["data"]["theoretical"]["composition"] for r in records],
+            ["Sr1Fe1Ox", "Ca1Mn1Ox", "Ca0.5Sr0.5Mn0.5Fe0.5Ox", "La1Co1Ox", "Sr1Mn1Ox"],
+        )
+        self.assertEqual(list(errors), ["Xx1Fe1Ox"])
+        # each composition, chemical system and mp-id once
+        self.assertEqual(calls("theo"), sorted(set(self.COMPOSITIONS)))
+        self.assertEqual(calls("debye"), sorted(["mp-Fe", "mp-Fe-red", "mp-Mn", "mp-Mn-red", "mp-Co", "mp-Co-red"]))
+        self.assertCountEqual(
+            [theo_pipeline.entry_cache.chemsys(s) for s in self.queried], ["Ca-Fe-Mn-O-Sr", "Fe-O-Xx", "Co-La-O"]
+        )
+
+        table = isograph_data.to_table(records)
+        sr_fe = table[table["Theoretical Composition"] == "Sr1Fe1Ox"].iloc[0]
+        self.assertEqual(sr_fe["Oxidized mp-id"], "mp-Fe")
+        self.assertEqual(sr_fe["Debye Temp Perovskite"], 405.0)
+        self.assertEqual(sr_fe["Elastic Tensors"], "True")
+        la_co = table[table["Theoretical Composition"] == "La1Co1Ox"].iloc[0]
+        self.assertEqual(la_co["Elastic Tensors"], "False")
+        self.assertTrue(table["Theoretical ΔH Max (kJ/mol)"].eq(160.0).all())
+
+    def test_resume(self):
+        """Only compute new compositions and mp-ids and those that failed when run again."""
+        first, _ = self.run_pipeline(self.COMPOSITIONS[:3])
+        for name in os.listdir(CALLS_DIR):
+            os.remove(os.path.join(CALLS_DIR, name))
+        records, errors = self.run_pipeline(self.COMPOSITIONS)
+        self.assertEqual(records[:2], first)
+        self.assertEqual(calls("theo"), sorted(["Ca0.5Sr0.5Mn0.5Fe0.5Ox", "Xx1Fe1Ox", "La1Co1Ox", "Sr1Mn1Ox"]))
+        self.assertEqual(calls("debye"), ["mp-Co", "mp-Co-red"])
+        records, errors = self.run_pipeline(self.COMPOSITIONS)
+        self.assertEqual(calls("theo").count("Xx1Fe1Ox"), 2)
+        self.assertEqual(len(records), 5)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+"""Tests for the theoretical redox enthalpies of `mpships.redox_thermo_csp.redox_utils`."""
+
+
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from pymatgen.entries.computed_entries import ComputedEntry
+
+from mpships.redox_thermo_csp import redox_utils
+from mpships.redox_thermo_csp.entry_cache import entry_cache
+
+
+class FakeMP:
+    """entries of the Ca-Sr-Mn-Fe-O system, without Ca2Fe2O5"""
+
+    FORMULAS = {
+        "O2": -4.9, "O8": -21.0, "Sr": -1.6, "Ca": -1.9, "Mn": -9.0, "Fe": -8.4,
+        "SrMnO3": -38.0, "Sr2Mn2O5": -67.3, "CaMnO3": -39.0, "Ca2Mn2O5": -68.9,
+        "SrFeO3": -34.0, "Sr2Fe2O5": -63.1, "CaFeO3": -35.0,
+        "CaSrMnFeO6": -73.5, "CaSrMnFeO5": -66.0, "Sr2MnFeO6": -72.0, "Sr2MnFeO5": -65.2,
+    }
+
+    def __init__(self):
+        # a less stable polymorph of every compound
+        self.entries = [ComputedEntry(f, e + 0.5, entry_id=f"mp-{i}-b") for i, (f, e) in enumerate(self.FORMULAS.items())]
+        self.entries += [ComputedEntry(f, e, entry_id=f"mp-{i}") for i, (f, e) in enumerate(self.FORMULAS.items())]
+
+    def get_entries_in_chemsys(self, elements):
+        return [e for e in self.entries if {el.symbol for el in e.composition.elements} <= set(elements)]
+
+
+class TestTheoRedenthColumn(unittest.TestCase):
+
+    COMPOSITIONS = ["Sr1Fe1Ox", "Ca1Mn1Ox", "Sr1Mn1Ox", "Ca0.5Sr0.5Mn0.5Fe0.5Ox", "Sr1Mn0.5Fe0.5Ox", "Ca1Fe1Ox"]
+
+    def setUp(self):
+        self.patches = [
+            mock.patch.object(entry_cache, "directory", None),
+            mock.patch.object(entry_cache, "_query", FakeMP().get_entries_in_chemsys),
+        ]
+        for patch in self.patches:
+            patch.start()
+        entry_cache.clear()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        entry_cache.clear()
+
+    def test_find_theo_redenth(self):
+        """Same redox enthalpies as the reactions of find_theo_redenth."""
+        compstrs = pd.Series(self.COMPOSITIONS, index=range(10, 10 + len(self.COMPOSITIONS)))
+        red_enth = redox_utils.find_theo_redenth_column(compstrs)
+        self.assertEqual(list(red_enth.index), list(compstrs.index))
+        for compstr, value in zip(compstrs, red_enth):
+            if compstr == "Ca1Fe1Ox":
+                self.assertTrue(np.isnan(value))
+                with self.assertRaises(IndexError):
+                    redox_utils.find_theo_redenth(compstr)
+            else:
+                self.assertAlmostEqual(value, redox_utils.find_theo_redenth(compstr), delta=1e-6 * abs(value))
+
+    def test_energies(self):
+        energies = redox_utils.lowest_energies(["Sr1Fe1Ox", "Sr1Fe1Ox"])
+        self.assertEqual(list(energies.columns), ["perovskite", "brownmillerite", "O2"])
+        self.assertEqual(energies.iloc[0].tolist(), [-34.0 / 5, -63.1 / 9, -4.9 / 2])
+        self.assertEqual(energies.iloc[1].tolist(), energies.iloc[0].tolist())
+        # 1/2 (9 * -63.1 / 9) + 1/4 (2 * -4.9 / 2) - (-34.0) eV per 1/2 O
+        self.assertAlmostEqual(
+            redox_utils.find_theo_redenth_column([], energies=energies).iloc[0],
+            (-63.1 / 2 - 4.9 / 4 + 34.0) * 2 * redox_utils.EV_TO_J_MOL,
+        )
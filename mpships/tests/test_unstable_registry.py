@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.redox_thermo_csp.unstable_registry` and its use in `redox_utils`."""
+
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from mpships.redox_thermo_csp import redox_utils
+from mpships.redox_thermo_csp.unstable_registry import unstable_registry
+
+
+class TestUnstableRegistry(unittest.TestCase):
+
+    def setUp(self):
+        unstable_registry.clear()
+
+    def tearDown(self):
+        unstable_registry.clear()
+
+    def test_contains(self):
+        self.assertTrue(redox_utils.unstable_phases("Mg1Co1Ox"))
+        self.assertTrue(redox_utils.unstable_phases("MgCoO3"))
+        self.assertTrue(redox_utils.unstable_phases("K0.5Na0.5Mo1Ox"))
+        self.assertFalse(redox_utils.unstable_phases("Sr1Fe1Ox"))
+        # substrings of unstable phases, which the list as a string matched
+        self.assertFalse(redox_utils.unstable_phases("K0.5Mo1Ox"))
+        self.assertFalse(redox_utils.unstable_phases("Co1Ox"))
+
+    def test_add(self):
+        unstable_registry.add("Sr1Fe1Ox", "Ca0.5Sr0.5Mn1Ox")
+        self.assertTrue(unstable_registry.contains("SrFeOx"))
+        self.assertTrue(unstable_registry.contains("Mg1Co1Ox"))
+        unstable_registry.clear()
+        self.assertFalse(unstable_registry.contains("SrFeOx"))
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "unstable_phases.json")
+            with open(path, "w") as f:
+                json.dump(["Sr1Fe1O"], f)
+            with mock.patch.object(unstable_registry, "path", path):
+                self.assertTrue(unstable_registry.contains("Sr1Fe1Ox"))
+                self.assertFalse(unstable_registry.contains("Mg1Co1Ox"))
+
+    def test_flag(self):
+        compstrs = pd.Series(["Mg1Co1Ox", "Sr1Fe1Ox", None, "Mg1Co1Ox", "Na1V1Ox"], index=[3, 1, 4, 1, 5])
+        self.assertEqual(unstable_registry.flag(compstrs).tolist(), [True, False, False, True, True])
+        self.assertEqual(unstable_registry.flag([]).tolist(), [])
+
+
+class TestEnergyOnTheFly(unittest.TestCase):
+
+    @staticmethod
+    def row(compstr, unstable=False):
+        return {
+            "Chemical Energy": 50.0, "Sensible Energy": 20.0, "T_ox": 800.0, "T_red": 1200.0, "delta_1": 0.05,
+            "delta_2": 0.15, "g_prod_kg_red": 8.0, "l_prod_kg_red": 6.0, "mass_redox": 1.5, "mol_mass_ox": 200.0,
+            "mol_prod_mol_red": 0.05, "p_ox": 0.21, "p_red": 1e-5, "compstr": compstr, "prodstr": "O2",
+            "prodstr_alt": "O", "unstable": unstable,
+        }
+
+    def energies(self, rows, **kwargs):
+        result = redox_utils.energy_on_the_fly(
+            "Air Separation", [{"energy_analysis": rows}], pump_ener=0, w_feed=25, h_rec=0.5, h_rec_steam=0.5, **kwargs
+        )
+        return {compdisp: float(energy) for energy, *_, compdisp in result["kJ/mol redox material"]}
+
+    def test_unstable(self):
+        rows = [self.row("Sr1Fe1Ox"), self.row("Mg1Co1Ox"), self.row("Ca1Mn1Ox", unstable=True)]
+        energies = self.energies(rows)
+        self.assertEqual(energies["MgCoOx"], float("inf"))
+        self.assertEqual(energies["CaMnOx"], float("inf"))
+        self.assertLess(energies["SrFeOx"], float("inf"))
+        self.assertTrue(all(e < float("inf") for e in self.energies(rows, rem_unstable=False).values()))
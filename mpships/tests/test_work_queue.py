@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.work_queue`."""
+
+
+import collections
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from mpships.redis_store import redis_store
+from mpships.redox_thermo_csp import theo_pipeline
+from mpships.work_queue import TaskFailed, work_queue
+from tests.test_theo_pipeline import fake_debye_temps, fake_split_comp, fake_theo_parameters
+
+CALLS = collections.Counter()
+THEO_PARAMETERS_CHUNK = theo_pipeline._theo_parameters_chunk
+
+
+def square(x, offset=0):
+    CALLS[x] += 1
+    if x < 0:
+        raise ValueError("negative")
+    return x * x + offset
+
+
+def failing_chunk(compstrs):
+    """chunk of theo_pipeline that fails (e.g. a worker that runs out of memory) for La compositions"""
+    if any(compstr.startswith("La") for compstr in compstrs):
+        raise MemoryError("La")
+    return THEO_PARAMETERS_CHUNK(compstrs)
+
+
+class TestWorkQueue(unittest.TestCase):
+
+    def setUp(self):
+        redis_store.r.flushall()
+        CALLS.clear()
+        self.queue = work_queue("test")
+
+    def test_results(self):
+        job_id = self.queue.submit(square, [(1,), (2,), ((3,), {"offset": 1})])
+        self.assertEqual(self.queue.progress(job_id), {"pending": 3, "running": 0, "done": 0, "failed": 0, "total": 3})
+        self.assertEqual(self.queue.work(burst=True), 3)
+        self.assertEqual(self.queue.results(job_id), [1, 4, 10])
+        self.assertEqual(self.queue.progress(job_id)["done"], 3)
+        self.assertEqual(list(self.queue.as_completed(job_id, poll=0)), self.queue.tasks(job_id))
+
+    def test_idempotent(self):
+        """Tasks that are queued or done are not computed again, also as part of other jobs."""
+        job_id = self.queue.submit(square, [(1,), (2,), (2,)])
+        self.assertEqual(self.queue.submit(square, [(1,), (2,), (2,)]), job_id)
+        self.assertEqual(self.queue.work(burst=True), 2)
+        other = self.queue.submit(square, [(2,), (3,)])
+        self.assertEqual(self.queue.progress(other)["done"], 1)
+        self.assertEqual(self.queue.work(burst=True), 1)
+        self.assertEqual(self.queue.results(other), [4, 9])
+        self.assertEqual(CALLS, {1: 1, 2: 1, 3: 1})
+        with self.assertRaises(ValueError):
+            self.queue.submit(lambda x: x, [(1,)])
+
+    def test_failed(self):
+        job_id = self.queue.submit(square, [(-1,), (2,)])
+        with mock.patch.object(work_queue, "max_attempts", 2), self.assertLogs("mpships.work_queue", "WARNING"):
+            self.queue.work(burst=True)
+        self.assertEqual(CALLS[-1], 2)
+        self.assertEqual(self.queue.progress(job_id)["failed"], 1)
+        with self.assertRaisesRegex(TaskFailed, "negative"):
+            self.queue.results(job_id)
+        self.assertEqual(self.queue.result(self.queue.tasks(job_id)[1]), 4)
+        # tried again when submitted again
+        self.queue.submit(square, [(-1,), (2,)])
+        self.assertEqual(self.queue.progress(job_id)["pending"], 1)
+
+    def test_requeue_stale(self):
+        """Tasks of a worker that died are queued again when its lease has expired."""
+        job_id = self.queue.submit(square, [(1,)])
+        task_id = self.queue.r.lmove(self.queue.pending_key, self.queue.running_key, "RIGHT", "LEFT").decode()
+        self.queue.r.hset(f"work_queue_task_{task_id}", "state", "running")
+        self.queue.r.set(f"work_queue_lease_{task_id}", b"worker", px=100000)
+        self.assertEqual(self.queue.requeue_stale(), 0)
+        self.queue.r.delete(f"work_queue_lease_{task_id}")
+        with self.assertLogs("mpships.work_queue", "WARNING"):
+            self.assertEqual(self.queue.requeue_stale(), 1)
+        self.assertEqual(self.queue.work(burst=True), 1)
+        self.assertEqual(self.queue.results(job_id), [1])
+
+    def test_worker_died(self):
+        """Tasks that crash their worker fail after max_attempts."""
+        job_id = self.queue.submit(square, [(1,)])
+        for _ in range(work_queue.max_attempts):
+            task_id, _ = self.queue._claim()
+            # the lease is set with the claim, so the task is not queued again while the worker starts it
+            self.assertEqual(self.queue.requeue_stale(), 0)
+            self.queue.r.delete(f"work_queue_lease_{task_id}")
+            self.queue.requeue_stale()
+        self.assertEqual(self.queue.progress(job_id)["failed"], 1)
+        self.assertIsNone(self.queue._claim())
+        with self.assertRaisesRegex(TaskFailed, "stopped responding"):
+            self.queue.result(task_id)
+
+    def test_workers(self):
+        """Several workers compute each task once."""
+        job_id = self.queue.submit(square, [(x,) for x in range(40)])
+        workers = [threading.Thread(target=self.queue.work, kwargs={"burst": True}) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.queue.results(job_id), [x * x for x in range(40)])
+        self.assertEqual(set(CALLS.values()), {1})
+
+
+class TestTheoPipelineQueue(unittest.TestCase):
+
+    def setUp(self):
+        redis_store.r.flushall()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patches = [
+            mock.patch.object(theo_pipeline, "split_comp", fake_split_comp),
+            mock.patch.object(theo_pipeline, "theo_parameters", fake_theo_parameters),
+            mock.patch.object(theo_pipeline, "get_debye_temps", fake_debye_temps),
+            mock.patch.object(theo_pipeline.entry_cache, "get_entries", lambda system: None),
+            # the chunks are computed by the workers of the queue, so no process pool is started
+            mock.patch.object(theo_pipeline, "ProcessPoolExecutor", side_effect=AssertionError("process pool")),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp_dir.cleanup()
+
+    def run_pipeline(self, compositions):
+        queue = work_queue("theo")
+        stop = threading.Event()
+
+        def worker():
+            while not stop.is_set():
+                queue.work(burst=True)
+                stop.wait(0.01)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        try:
+            return theo_pipeline.run(compositions, self.tmp_dir.name, max_workers=1, chunk_size=1, queue=queue)
+        finally:
+            stop.set()
+            thread.join()
+
+    def test_run(self):
+        records, errors = self.run_pipeline(["Sr1Fe1Ox", "Ca1Mn1Ox", "Xx1Fe1Ox", "La1Co1Ox"])
+        self.assertEqual(
+            [r["data"]["theoretical"]["composition"] for r in records], ["Sr1Fe1Ox", "Ca1Mn1Ox", "La1Co1Ox"]
+        )
+        self.assertEqual(list(errors), ["Xx1Fe1Ox"])
+
+    def test_failed_chunk(self):
+        """Compositions of chunks that failed are errors, which are computed again in the next run."""
+        compositions = ["Sr1Fe1Ox", "La1Co1Ox"]
+        with mock.patch.object(theo_pipeline, "_theo_parameters_chunk", failing_chunk), \
+                mock.patch.object(work_queue, "max_attempts", 1), self.assertLogs("mpships", "WARNING"):
+            records, errors = self.run_pipeline(compositions[1:])
+            self.assertEqual((records, list(errors)), ([], ["La1Co1Ox"]))
+            self.assertIn("MemoryError", errors["La1Co1Ox"])
+            records, errors = self.run_pipeline(compositions)
+            self.assertEqual([r["data"]["theoretical"]["composition"] for r in records], ["Sr1Fe1Ox"])
+            self.assertEqual(list(errors), ["La1Co1Ox"])
+        records, errors = self.run_pipeline(compositions)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(errors, {})